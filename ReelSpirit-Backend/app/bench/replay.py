@@ -0,0 +1,219 @@
+"""
+Offline record/replay layer for the Graph API and a deterministic fake Gemini.
+
+Fixture format (one file per profile, <dir>/<username>.json):
+    {"username": "...", "pages": {"": <first page body>, "<after cursor>": <page body>, ...}}
+Page bodies are the raw Graph API business_discovery responses.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+import httpx
+
+from services.keyword_classifier import classify_caption
+
+_USERNAME_RE = re.compile(r"business_discovery\.username\(([^)]+)\)")
+_CURSOR_RE = re.compile(r"media\.after\(([^)]+)\)")
+
+# username -> {cursor ("" = ilk sayfa) -> yanıt gövdesi}
+Fixtures = Dict[str, Dict[str, dict]]
+
+def _request_key(request: httpx.Request):
+    fields = request.url.params.get("fields", "")
+    username = _USERNAME_RE.search(fields)
+    cursor = _CURSOR_RE.search(fields)
+    return (username.group(1) if username else ""), (cursor.group(1) if cursor else "")
+
+# --- KAYIT ---
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests to the real network and keeps every successful page body."""
+
+    def __init__(self, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.inner = inner or httpx.AsyncHTTPTransport(http2=True)
+        self.fixtures: Fixtures = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        # Ham (sıkıştırılmış olabilir) gövde; yeni Response content-encoding'i çözer
+        recorded = httpx.Response(
+            response.status_code, headers=response.headers, content=await response.aread(), request=request
+        )
+        if recorded.status_code == 200:
+            username, cursor = _request_key(request)
+            self.fixtures.setdefault(username, {})[cursor] = recorded.json()
+        return recorded
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+def save_fixtures(fixtures: Fixtures, directory: str):
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for username, pages in fixtures.items():
+        (path / f"{username}.json").write_text(
+            json.dumps({"username": username, "pages": pages}, ensure_ascii=False, indent=1),
+            encoding="utf-8"
+        )
+
+def load_fixtures(directory: str) -> Fixtures:
+    fixtures: Fixtures = {}
+    for file in sorted(Path(directory).glob("*.json")):
+        data = json.loads(file.read_text(encoding="utf-8"))
+        fixtures[data["username"]] = data["pages"]
+    return fixtures
+
+# --- OYNATMA ---
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves recorded pages by (username, after cursor) with an optional simulated latency.
+    Unknown profiles get the Graph API's "invalid user" error so the 404 path is exercised too.
+    """
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        username, cursor = _request_key(request)
+        page = self.fixtures.get(username, {}).get(cursor)
+        if page is None:
+            return httpx.Response(
+                400,
+                json={"error": {"message": f"Invalid user id: {username}", "type": "OAuthException", "code": 110}},
+                request=request
+            )
+        return httpx.Response(200, json=page, request=request)
+
+class MediaFixtureTransport(httpx.AsyncBaseTransport):
+    """
+    Serves media downloads from a local directory: the last path segment of the URL is the file name
+    (https://cdn.example/a/b/123.jpg -> <dir>/123.jpg). Missing files return 404.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0):
+        self.directory = Path(directory)
+        self.latency = latency
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = self.directory / Path(request.url.path).name
+        if not path.is_file():
+            return httpx.Response(404, request=request)
+        return httpx.Response(200, content=path.read_bytes(), request=request)
+
+_WORDS = (
+    "gin tonic", "negroni with 3cl gin", "old fashioned whiskey", "rakı balık", "şarap tadımı",
+    "espresso martini", "craft beer ipa", "vodka sour", "margarita tequila", "baileys coffee",
+    "sunset", "new outfit", "fashion week", "travel diaries", "street food", "concert night",
+    "recipe", "mix it", "cheers", "weekend"
+)
+
+def synthesize_fixtures(profiles: int, pages: int, per_page: int = 25, seed: int = 0) -> Fixtures:
+    """Deterministic synthetic profiles in the recorded format (newest page first)."""
+    rng = random.Random(seed)
+    fixtures: Fixtures = {}
+    start = datetime(2025, 1, 1)
+    for p in range(profiles):
+        username = f"bench_{seed}_{p}"
+        total = pages * per_page
+        posts = [
+            {
+                "id": f"{username}_{i}",
+                "caption": " ".join(rng.sample(_WORDS, 3)) + f" #{i}",
+                "media_type": "IMAGE",
+                "media_url": f"https://example.invalid/{username}/{i}.jpg",
+                "permalink": f"https://instagram.com/p/{username}_{i}",
+                "timestamp": (start - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S+0000")
+            }
+            for i in range(total)
+        ]
+        profile_pages = {}
+        for n in range(pages):
+            cursor = "" if n == 0 else f"c{n}"
+            paging = {"cursors": {"after": f"c{n + 1}"}} if n + 1 < pages else {}
+            profile_pages[cursor] = {
+                "business_discovery": {
+                    "media": {"data": posts[n * per_page:(n + 1) * per_page], "paging": paging}
+                },
+                "id": "0"
+            }
+        fixtures[username] = profile_pages
+    return fixtures
+
+# --- SAHTE GEMINI ---
+
+class FakeGemini:
+    """
+    Stands in for genai.Client: client.aio.models.generate_content(model, contents, config).
+    Latency, jitter, error and drop decisions are derived from a hash of the prompt,
+    so a run is reproducible regardless of task scheduling. item_latency adds time per
+    DATA item, as a real model's latency grows with the length of its answer.
+    Answers come from the keyword classifier; for image prompts it reads the image bytes
+    as text, so fixture "images" can be a JPEG header followed by words.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.3,
+        error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+        item_latency: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.item_latency = item_latency
+        self.calls = 0
+        self.errors = 0
+        self.image_calls = 0
+        self.aio = SimpleNamespace(models=self)
+
+    async def generate_content(self, model: str, contents, config=None):
+        self.calls += 1
+        images = {}
+        if isinstance(contents, list):
+            # [prompt, "proxy_id: X", image part, "proxy_id: Y", image part, ...]
+            self.image_calls += 1
+            for label, part in zip(contents[1::2], contents[2::2]):
+                images[label.split(": ", 1)[1]] = part.inline_data.data.decode("utf-8", "ignore")
+            contents = contents[0]
+        digest = hashlib.sha256(f"{self.seed}\x1f{contents}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+
+        items = json.loads(contents.split("DATA:\n", 1)[1])
+        latency = self.latency + self.item_latency * len(items)
+        await asyncio.sleep(max(0.0, latency * (1 + rng.uniform(-self.jitter, self.jitter))))
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            raise RuntimeError("Fake Gemini: 503 UNAVAILABLE")
+
+        answers = []
+        for item in items:
+            if rng.random() < self.drop_rate:
+                continue
+            result = classify_caption(images.get(item["proxy_id"], item["text"]))
+            answers.append({"proxy_id": item["proxy_id"], **result})
+
+        text = json.dumps(answers, ensure_ascii=False)
+        usage = SimpleNamespace(prompt_token_count=len(contents) // 4, candidates_token_count=len(text) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
@@ -0,0 +1,181 @@
+"""
+End-to-end throughput benchmark on top of bench.replay.
+
+Drives POST /analyze (first page, inline) for every profile through the ASGI app,
+then lets the in-process scan workers finish the remaining pages, exactly as in
+production. Import this module only after DATABASE_URL points at the target DB.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import event, func, select
+
+import database
+import models
+from config import settings
+from bench.replay import FakeGemini, Fixtures, ReplayTransport
+from services import ai_analyzer, instagram, rate_limit
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class QueryCounter:
+    """Counts statements sent to the DB by both the sync and the async engine."""
+
+    def __init__(self):
+        self.count = 0
+        self._engines = [database.get_engine(), database.get_async_engine().sync_engine]
+        for engine in self._engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def close(self):
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+def _job_states(usernames: List[str]) -> Dict[str, int]:
+    with database.SessionLocal() as db:
+        rows = db.execute(
+            select(models.ScanJob.status, func.count())
+            .where(models.ScanJob.username.in_(usernames))
+            .group_by(models.ScanJob.status)
+        ).all()
+    return dict(rows)
+
+def _job_durations(usernames: List[str]) -> List[float]:
+    with database.SessionLocal() as db:
+        rows = db.execute(
+            select(models.ScanJob.created_at, models.ScanJob.finished_at)
+            .where(models.ScanJob.username.in_(usernames), models.ScanJob.finished_at.isnot(None))
+        ).all()
+    return [(finished - created).total_seconds() for created, finished in rows if created]
+
+def _stored_posts(usernames: List[str]) -> int:
+    with database.SessionLocal() as db:
+        return db.execute(
+            select(func.count(models.InstagramPost.id))
+            .where(models.InstagramPost.username.in_(usernames))
+        ).scalar()
+
+async def run_benchmark(
+    fixtures: Fixtures,
+    gemini: FakeGemini,
+    graph_latency: float = 0.0,
+    concurrency: int = 8,
+    timeout: float = 600.0,
+    keep_rate_limits: bool = False
+) -> Dict[str, object]:
+    """Returns posts/sec, analyze_profile latency percentiles, scan durations and DB query counts."""
+    import main
+    import migrations
+
+    migrations.migrate()
+    usernames = list(fixtures)
+
+    # Kayıtlı sayfalar ve sahte model bedava; kovalar sadece istenirse ölçüme dahil
+    if not keep_rate_limits:
+        rate_limit.instagram_bucket.rate = 0
+        rate_limit.gemini_bucket.rate = 0
+    settings.JOB_POLL_INTERVAL = min(settings.JOB_POLL_INTERVAL, 0.05)
+
+    replay = ReplayTransport(fixtures, latency=graph_latency)
+    instagram.set_default_transport(replay)
+    ai_analyzer.set_genai_client(gemini)
+    counter = QueryCounter()
+
+    latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    try:
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+
+                async def analyze(username: str):
+                    nonlocal failures
+                    async with semaphore:
+                        started = time.perf_counter()
+                        response = await client.post("/analyze", json={"instagram_url": username})
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            failures += 1
+
+                wall_started = time.perf_counter()
+                await asyncio.gather(*(analyze(u) for u in usernames))
+                first_pages_seconds = time.perf_counter() - wall_started
+                first_page_queries = counter.count
+
+                # Kalan sayfalar worker'larda; aktif iş kalmayana kadar bekle
+                deadline = time.monotonic() + timeout
+                while time.monotonic() < deadline:
+                    states = await asyncio.to_thread(_job_states, usernames)
+                    if not states.get("queued") and not states.get("running"):
+                        break
+                    await asyncio.sleep(0.05)
+                wall_seconds = time.perf_counter() - wall_started
+                total_queries = counter.count
+    finally:
+        counter.close()
+        instagram.set_default_transport(None)
+        ai_analyzer.set_genai_client(None)
+
+    posts = await asyncio.to_thread(_stored_posts, usernames)
+    durations = await asyncio.to_thread(_job_durations, usernames)
+    states = await asyncio.to_thread(_job_states, usernames)
+
+    return {
+        "profiles": len(usernames),
+        "posts": posts,
+        "wall_seconds": round(wall_seconds, 3),
+        "posts_per_second": round(posts / wall_seconds, 1) if wall_seconds else 0.0,
+        "analyze_profile": {
+            "requests": len(latencies),
+            "failures": failures,
+            "p50_seconds": round(_percentile(latencies, 50), 3),
+            "p99_seconds": round(_percentile(latencies, 99), 3),
+            "all_first_pages_seconds": round(first_pages_seconds, 3)
+        },
+        "scan_jobs": {
+            **states,
+            "p50_seconds": round(_percentile(durations, 50), 3),
+            "p99_seconds": round(_percentile(durations, 99), 3)
+        },
+        "db_queries": {
+            "total": total_queries,
+            "first_pages": first_page_queries,
+            "per_post": round(total_queries / posts, 2) if posts else 0.0
+        },
+        "upstream_calls": {
+            "graph_api": replay.requests,
+            "gemini": gemini.calls,
+            "gemini_errors": gemini.errors
+        }
+    }
+
+def format_report(report: Dict[str, object], label: Optional[str] = None) -> str:
+    analyze = report["analyze_profile"]
+    jobs = report["scan_jobs"]
+    queries = report["db_queries"]
+    calls = report["upstream_calls"]
+    lines = [
+        f"== {label or 'benchmark'} ==",
+        f"profiles={report['profiles']} posts={report['posts']} wall={report['wall_seconds']}s "
+        f"throughput={report['posts_per_second']} posts/s",
+        f"analyze_profile: p50={analyze['p50_seconds']}s p99={analyze['p99_seconds']}s "
+        f"failures={analyze['failures']}",
+        f"scan jobs: p50={jobs['p50_seconds']}s p99={jobs['p99_seconds']}s "
+        f"completed={jobs.get('completed', 0)} error={jobs.get('error', 0)}",
+        f"db queries: total={queries['total']} first_pages={queries['first_pages']} "
+        f"per_post={queries['per_post']}",
+        f"upstream: graph={calls['graph_api']} gemini={calls['gemini']} gemini_errors={calls['gemini_errors']}"
+    ]
+    return "\n".join(lines)
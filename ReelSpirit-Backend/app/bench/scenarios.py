@@ -0,0 +1,905 @@
+"""
+Focused micro-benchmarks, one per optimisation, on top of bench.replay.
+
+    python manage.py scenario <name> [--size N] [--json]
+
+Each scenario gets a fresh temporary SQLite database (DATABASE_URL is set by
+manage.py before this module is imported) and returns a flat report dict.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import database
+import migrations
+import models
+from bench.runner import QueryCounter
+
+Scenario = Callable[[Optional[int]], Dict[str, object]]
+SCENARIOS: Dict[str, Scenario] = {}
+
+def scenario(name: str):
+    def register(fn: Scenario) -> Scenario:
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+def _reset_db():
+    """Empties every table of the scenario database (schema and label lookup rows are kept)."""
+    migrations.migrate()
+    # Etiket tabloları migration'ların seed verisi; post satırları bunlara id ile bağlanır
+    keep = {model.__table__ for model in models.LABEL_TABLES}
+    with database.get_engine().begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            if table not in keep:
+                conn.execute(table.delete())
+
+def synthetic_posts(count: int, username: str = "bench_user", offset: int = 0) -> List[dict]:
+    """Analyzed Graph API items as they reach save_posts_to_db."""
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "id": f"{username}_{i}",
+            "caption": f"negroni with 3cl gin #{i}",
+            "media_type": "VIDEO",
+            "media_url": f"https://example.invalid/{username}/{i}.jpg",
+            "permalink": f"https://instagram.com/p/{username}_{i}",
+            "timestamp": (start - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            "ai_category": "Gastronomy",
+            "ai_summary": "Gin cocktail recipe.",
+            "drink_category": "Gin Cocktail"
+        }
+        for i in range(offset, offset + count)
+    ]
+
+# --- user-001: post_store ---
+
+def legacy_save_posts(db, final_data: list, username: str) -> int:
+    """The pre-bulk save_posts_to_db: one SELECT per item, then ORM inserts (reference only)."""
+    from utils import parse_timestamp
+
+    saved = 0
+    for item in final_data:
+        insta_id = str(item.get("id", ""))
+        exists = db.query(models.InstagramPost).filter(models.InstagramPost.instagram_id == insta_id).first()
+        if not exists:
+            db.add(models.InstagramPost(
+                instagram_id=insta_id,
+                permalink=item.get("permalink"),
+                username=username,
+                caption=item.get("caption"),
+                media_type=item.get("media_type"),
+                media_url=item.get("media_url"),
+                post_timestamp=parse_timestamp(item.get("timestamp")),
+                ai_category=item.get("ai_category", "General"),
+                ai_summary=item.get("ai_summary", ""),
+                drink_category=item.get("drink_category", "Other")
+            ))
+            saved += 1
+    if saved:
+        db.commit()
+    return saved
+
+def _timed_save(save, rows: List[dict]) -> Dict[str, float]:
+    counter = QueryCounter()
+    try:
+        with database.SessionLocal() as db:
+            started = time.perf_counter()
+            save(db, rows, "bench_user")
+            seconds = time.perf_counter() - started
+    finally:
+        counter.close()
+    return {"seconds": round(seconds, 4), "queries": counter.count}
+
+@scenario("store")
+def store_scenario(size: Optional[int]) -> Dict[str, object]:
+    """Legacy per-post loop vs bulk upsert, for a first save and a re-save of the same rows."""
+    from services import post_store
+
+    report: Dict[str, object] = {}
+    for rows_count in ([size] if size else [25, 1_000, 50_000]):
+        rows = synthetic_posts(rows_count)
+        for label, save in (("legacy", legacy_save_posts), ("bulk", post_store.save_posts_to_db)):
+            _reset_db()
+            first = _timed_save(save, rows)
+            again = _timed_save(save, rows)
+            report[f"{rows_count}.{label}.insert_seconds"] = first["seconds"]
+            report[f"{rows_count}.{label}.insert_queries"] = first["queries"]
+            report[f"{rows_count}.{label}.resave_seconds"] = again["seconds"]
+            report[f"{rows_count}.{label}.resave_queries"] = again["queries"]
+        report[f"{rows_count}.speedup"] = round(
+            report[f"{rows_count}.legacy.insert_seconds"] / max(report[f"{rows_count}.bulk.insert_seconds"], 1e-9), 1
+        )
+    return report
+
+# --- user-002: Graph API istemcisi ---
+
+def _self_signed_cert(directory: str):
+    """localhost certificate for the local TLS server (cert file, key file, SSL context that trusts it)."""
+    import datetime as dt
+    import os
+    import ssl
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = dt.datetime.now(dt.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - dt.timedelta(days=1)).not_valid_after(now + dt.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_file, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_file, key_file, ssl.create_default_context(cafile=cert_file)
+
+def _serve_in_thread(app, **options):
+    """Starts uvicorn on 127.0.0.1 in a daemon thread; returns (server, port)."""
+    import socket
+    import threading
+
+    import uvicorn
+
+    sock = socket.socket()
+    # Accept edilen soketlere geçer; yoksa küçük yanıtlar Nagle + gecikmeli ACK ile ~40ms bekler
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", **options))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, sock.getsockname()[1]
+
+def _serve_fixtures_over_tls(fixtures, cert_file: str, key_file: str):
+    """Serves replayed Graph API pages with TLS; returns (server, port)."""
+    import json
+    from urllib.parse import parse_qs
+
+    from bench.replay import _CURSOR_RE, _USERNAME_RE
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        fields = parse_qs(scope["query_string"].decode()).get("fields", [""])[0]
+        username = _USERNAME_RE.search(fields)
+        cursor = _CURSOR_RE.search(fields)
+        page = fixtures.get(username.group(1) if username else "", {}).get(cursor.group(1) if cursor else "")
+        body = json.dumps(page or {"error": {"message": "Invalid user", "code": 110}}).encode()
+        await send({"type": "http.response.start", "status": 200 if page else 400,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    return _serve_in_thread(app, ssl_certfile=cert_file, ssl_keyfile=key_file)
+
+@scenario("graph")
+def graph_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    Per-page latency against a local TLS server: a new AsyncClient per page (the old
+    fetch_instagram_page) vs the shared pooled client. Localhost has no network RTT,
+    so the saving shown is the TCP+TLS setup cost alone; over the internet add ~1-2 RTTs per page.
+    """
+    import asyncio
+    import tempfile
+
+    import httpx
+
+    from bench.replay import synthesize_fixtures
+    from config import settings
+    from services import instagram, rate_limit
+
+    pages = size or 200
+    fixtures = synthesize_fixtures(1, pages, seed=2)
+    username = next(iter(fixtures))
+    cert_file, key_file, ssl_context = _self_signed_cert(tempfile.mkdtemp(prefix="reelspirit-tls-"))
+    server, port = _serve_fixtures_over_tls(fixtures, cert_file, key_file)
+    base_url = f"https://localhost:{port}"
+    rate_limit.instagram_bucket.rate = 0
+
+    async def walk(fetch) -> List[float]:
+        latencies, cursor = [], None
+        for _ in range(pages):
+            started = time.perf_counter()
+            posts, cursor = await fetch(cursor)
+            latencies.append(time.perf_counter() - started)
+            assert posts, "local server returned no posts"
+            if not cursor:
+                break
+        return latencies
+
+    async def legacy_fetch(cursor):
+        # Eski davranış: her sayfa için yeni istemci = yeni TCP + TLS el sıkışması
+        fields = f"media.after({cursor}){{id}}" if cursor else "media{id}"
+        async with httpx.AsyncClient(verify=ssl_context) as client:
+            response = await client.get(
+                f"{base_url}/{settings.API_VERSION}/0",
+                params={"fields": f"business_discovery.username({username}){{{fields}}}"}
+            )
+        media = response.json()["business_discovery"]["media"]
+        return media["data"], media.get("paging", {}).get("cursors", {}).get("after")
+
+    async def shared_fetch(cursor):
+        return await instagram.fetch_instagram_page(username, cursor)
+
+    async def run():
+        legacy = await walk(legacy_fetch)
+        instagram.GRAPH_API_BASE = base_url
+        await instagram.start_client(httpx.AsyncHTTPTransport(verify=ssl_context, http2=settings.HTTP2_ENABLED))
+        try:
+            shared = await walk(shared_fetch)
+        finally:
+            await instagram.close_client()
+        return legacy, shared
+
+    original_base = instagram.GRAPH_API_BASE
+    try:
+        legacy, shared = asyncio.run(run())
+    finally:
+        instagram.GRAPH_API_BASE = original_base
+        server.should_exit = True
+
+    def ms(values: List[float], pct: float) -> float:
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        "pages": len(shared),
+        "new_client_per_page.p50_ms": ms(legacy, 50),
+        "new_client_per_page.p99_ms": ms(legacy, 99),
+        "shared_client.p50_ms": ms(shared, 50),
+        "shared_client.p99_ms": ms(shared, 99),
+        "saved_per_page_ms": round(ms(legacy, 50) - ms(shared, 50), 2)
+    }
+
+# --- user-005: token bütçeli batch motoru ---
+
+def _long_caption_pages(pages: int, per_page: int = 25, seed: int = 5) -> List[List[dict]]:
+    """Graph API pages whose captions run from a few words up to the 1000-char clean_caption cap."""
+    import random
+
+    from bench.replay import _WORDS
+
+    rng = random.Random(seed)
+    result = []
+    for n in range(pages):
+        page = []
+        for i in range(per_page):
+            words = []
+            target = rng.choice((40, 200, 600, 1000))
+            while len(" ".join(words)) < target:
+                words.append(rng.choice(_WORDS))
+            page.append({"id": f"batch_{n}_{i}", "caption": " ".join(words)[:1000]})
+        result.append(page)
+    return result
+
+@scenario("batching")
+def batching_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    Posts/sec of the model tier against FakeGemini, page after page as the scan pipeline does.
+    single_prompt is the old behaviour (the whole page in one prompt, drops become 'Unprocessed');
+    the budgeted runs pack by GEMINI_BATCH_TOKEN_BUDGET, run batches concurrently and re-submit drops.
+    The stub answers in 0.3s + 20ms per item, so a shorter answer returns sooner.
+    """
+    import asyncio
+    import logging
+
+    from bench.replay import FakeGemini
+    from config import settings
+    from services import ai_analyzer, rate_limit
+
+    # Her yeniden gönderim bir uyarı yazar; rapor okunabilir kalsın
+    ai_analyzer.logger.setLevel(logging.ERROR)
+    pages = _long_caption_pages(size or 40)
+    texts = [[ai_analyzer.clean_caption(post["caption"]) for post in page] for page in pages]
+    posts = sum(len(page) for page in pages)
+    rate_limit.gemini_bucket.rate = 0
+    settings.GEMINI_BREAKER_ENABLED = False
+
+    runs = (
+        ("single_prompt", 10**9, 10**6, 0),
+        ("budgeted.6000", 6000, settings.GEMINI_BATCH_MAX_ITEMS, settings.GEMINI_MAX_RESUBMITS),
+        ("budgeted.2000", 2000, settings.GEMINI_BATCH_MAX_ITEMS, settings.GEMINI_MAX_RESUBMITS)
+    )
+    report: Dict[str, object] = {"posts": posts}
+    for label, budget, max_items, resubmits in runs:
+        settings.GEMINI_BATCH_TOKEN_BUDGET = budget
+        settings.GEMINI_BATCH_MAX_ITEMS = max_items
+        settings.GEMINI_MAX_RESUBMITS = resubmits
+        gemini = FakeGemini(latency=0.3, jitter=0.2, drop_rate=0.03, item_latency=0.02)
+        ai_analyzer.set_genai_client(gemini)
+        ai_analyzer._gemini_semaphore = None
+
+        async def run() -> int:
+            unanswered = 0
+            for page, page_texts in zip(pages, texts):
+                _, missing = await ai_analyzer._analyze_with_model(page, page_texts)
+                unanswered += len(missing)
+            return unanswered
+
+        started = time.perf_counter()
+        unanswered = asyncio.run(run())
+        seconds = time.perf_counter() - started
+        report[f"{label}.posts_per_second"] = round(posts / seconds, 1)
+        report[f"{label}.model_calls"] = gemini.calls
+        report[f"{label}.unanswered"] = unanswered
+    ai_analyzer.set_genai_client(None)
+    return report
+
+# --- user-009: polling vs SSE ---
+
+def _drive_scans(usernames: List[str], seconds: float, steps: int) -> float:
+    """
+    Plays scans of another worker process: progress rows in scan_jobs, then 'completed'.
+    Uses its own engine so QueryCounter only sees the server's queries. Returns completion time.
+    """
+    from sqlalchemy import create_engine, update
+    from config import settings
+
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        for step in range(1, steps + 1):
+            time.sleep(seconds / steps)
+            with engine.begin() as conn:
+                conn.execute(
+                    update(models.ScanJob)
+                    .where(models.ScanJob.username.in_(usernames))
+                    .values(
+                        status="completed" if step == steps else "running",
+                        pages_done=step, posts_done=step * 25
+                    )
+                )
+        return time.perf_counter()
+    finally:
+        engine.dispose()
+
+@scenario("sse")
+def sse_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    Load test of progress delivery: `size` clients (default 300) watch 10 scans that take 10s,
+    over real HTTP. Polling clients call /analyze/status every 2s until 'completed';
+    streaming clients hold one /analyze/stream connection. Reports requests, server DB
+    queries, bytes received and how late clients learn that their scan completed.
+    """
+    import asyncio
+    import random
+    import threading
+
+    import httpx
+
+    from bench.runner import _percentile
+    from config import settings
+    from main import create_app
+
+    rng = random.Random(9)
+    clients = size or 300
+    usernames = [f"sse_{n}" for n in range(10)]
+    scan_seconds, steps, poll_interval = 10.0, 10, 2.0
+    settings.EVENTS_POLL_INTERVAL = 1.0
+
+    async def poller(client: httpx.AsyncClient, username: str, stats: dict) -> float:
+        # Kullanıcılar aynı anda sormaz: ilk sorgu aralığın içinde rastgele bir anda
+        await asyncio.sleep(rng.uniform(0, poll_interval))
+        while True:
+            started = time.perf_counter()
+            response = await client.get(f"/analyze/status/{username}")
+            stats["request_seconds"].append(time.perf_counter() - started)
+            stats["requests"] += 1
+            stats["bytes"] += len(response.content)
+            if response.json()["status"] == "completed":
+                return time.perf_counter()
+            await asyncio.sleep(poll_interval)
+
+    async def streamer(client: httpx.AsyncClient, username: str, stats: dict) -> float:
+        stats["requests"] += 1
+        async with client.stream("GET", f"/analyze/stream/{username}") as response:
+            async for line in response.aiter_lines():
+                stats["bytes"] += len(line) + 1
+                if line == "event: completed":
+                    return time.perf_counter()
+        raise RuntimeError("stream closed before completion")
+
+    report: Dict[str, object] = {"clients": clients, "scans": len(usernames), "poll_interval_seconds": poll_interval}
+    for label, watch in (("polling", poller), ("sse", streamer)):
+        _reset_db()
+        with database.SessionLocal() as db:
+            db.add_all(models.ScanJob(username=u, status="running", mode="full") for u in usernames)
+            db.commit()
+        server, port = _serve_in_thread(create_app(), lifespan="off", backlog=clients * 2, timeout_keep_alive=60)
+        counter = QueryCounter()
+        stats = {"requests": 0, "bytes": 0, "request_seconds": []}
+        finished: Dict[str, float] = {}
+
+        def drive():
+            finished["at"] = _drive_scans(usernames, scan_seconds, steps)
+
+        async def run() -> List[float]:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                driver = threading.Thread(target=drive)
+                driver.start()
+                done = await asyncio.gather(*(
+                    watch(client, usernames[n % len(usernames)], stats) for n in range(clients)
+                ))
+                await asyncio.to_thread(driver.join)
+            return [at - finished["at"] for at in done]
+
+        try:
+            lags = asyncio.run(run())
+        finally:
+            counter.close()
+            server.should_exit = True
+        report[f"{label}.requests"] = stats["requests"]
+        report[f"{label}.db_queries"] = counter.count
+        report[f"{label}.bytes_received"] = stats["bytes"]
+        report[f"{label}.completion_lag_p50_s"] = round(_percentile(lags, 50), 2)
+        report[f"{label}.completion_lag_p99_s"] = round(_percentile(lags, 99), 2)
+        if stats["request_seconds"]:
+            report[f"{label}.request_p50_ms"] = round(_percentile(stats["request_seconds"], 50) * 1000, 1)
+            report[f"{label}.request_p99_ms"] = round(_percentile(stats["request_seconds"], 99) * 1000, 1)
+    return report
+
+# --- user-012: anahtar kelime sınıflandırıcısı ---
+
+_LEGACY_DRINK_KEYWORDS = {
+    "Whiskey": ["viski", "whiskey", "whisky", "bourbon", "scotch", "jack daniels", "jameson"],
+    "Gin": ["cin", "gin", "tanqueray", "gordon", "hendricks", "beefeater"],
+    "Rum": ["rom", "rum", "bacardi", "havana club", "captain morgan"],
+    "Vodka": ["votka", "vodka", "absolut", "smirnoff", "grey goose"],
+    "Tequila": ["tekila", "tequila", "patron", "olmeca"],
+    "Beer": ["bira", "beer", "lager", "ale", "ipa", "stout"],
+    "Wine": ["şarap", "wine", "merlot", "cabernet", "chardonnay"],
+    "Raki": ["rakı", "raki", "yeni rakı"],
+    "Liqueur": ["likör", "liqueur", "baileys", "kahlua", "jagermeister", "cointreau"],
+    "Coffee Cocktail": ["espresso martini", "irish coffee"]
+}
+
+def legacy_drink_category(caption: Optional[str]) -> str:
+    """The pre-matcher create_fallback_analysis rule: substring checks on str.lower() (reference only)."""
+    caption = (caption or "").lower()
+    detected = [cat for cat, keys in _LEGACY_DRINK_KEYWORDS.items() if any(k in caption for k in keys)]
+    is_cocktail = any(ind in caption for ind in ["cocktail", "kokteyl", "mix", "recipe", "tarif", "cl", "oz"])
+    if "Coffee Cocktail" in detected:
+        return "Coffee Cocktail"
+    if len(detected) == 1:
+        return f"{detected[0]} Cocktail" if is_cocktail else detected[0]
+    if len(detected) > 1:
+        if "Liqueur" in detected and len(detected) == 2:
+            return f"{[d for d in detected if d != 'Liqueur'][0]} Cocktail"
+        return "Mixed Cocktail"
+    return "Other"
+
+# Etiketli yüzey biçimleri: büyük/küçük harf, Türkçe ekler ve İ/ı farkları bilerek karışık
+_SPIRIT_FORMS = {
+    "Whiskey": ["whisky", "Whiskey", "bourbon", "VİSKİ", "viskili", "Jameson"],
+    "Gin": ["gin", "GIN", "Tanqueray", "cin"],
+    "Rum": ["rum", "Bacardi", "Havana Club"],
+    "Vodka": ["vodka", "VOTKA", "votkalı", "Smirnoff"],
+    "Tequila": ["tequila", "tekilalı", "Olmeca"],
+    "Beer": ["beer", "beers", "IPA", "bira", "Biralar", "stout"],
+    "Wine": ["wine", "ŞARAP", "şarabı", "merlot"],
+    "Raki": ["rakı", "RAKI", "Rakının", "Yeni Rakı", "rakılı"],
+    "Liqueur": ["likör", "Baileys", "Kahlua"]
+}
+_COCKTAIL_WORDS = ["cocktail", "kokteyl", "kokteyli", "recipe", "tarifi", "4 cl", "2oz", "mix"]
+# Eski alt dize eşleşmesini yanıltan, içki içermeyen kelimeler
+_CONFUSERS = [
+    "big sale", "yoga class", "original design", "pale sky", "begin again", "login now", "romantic dinner",
+    "ginger tea", "cinema night", "patronum", "rakip takım kazandı", "rakibi yendik", "rakım 2000m",
+    "classic look", "ozone", "mixtape", "role model", "ipad setup", "bale", "scale"
+]
+_FILLER = ["sunset", "weekend", "friends", "city lights", "new outfit", "travel diaries", "street food",
+           "concert night", "cheers", "good vibes", "istanbul", "summer", "family time"]
+
+def labelled_captions(count: int, seed: int = 12) -> List[Tuple[str, str]]:
+    """(caption, expected drink_category) pairs; a quarter are drink-free confusers."""
+    import random
+
+    rng = random.Random(seed)
+    spirits = list(_SPIRIT_FORMS)
+    corpus = []
+    for _ in range(count):
+        filler = rng.sample(_FILLER, 2)
+        roll = rng.random()
+        if roll < 0.25:
+            words, label = filler + rng.sample(_CONFUSERS, 2), "Other"
+        elif roll < 0.3:
+            words, label = filler + [rng.choice(["espresso martini", "Irish Coffee"])], "Coffee Cocktail"
+        elif roll < 0.35:
+            a, b = rng.sample([s for s in spirits if s != "Liqueur"], 2)
+            words, label = filler + [rng.choice(_SPIRIT_FORMS[a]), rng.choice(_SPIRIT_FORMS[b])], "Mixed Cocktail"
+        else:
+            spirit = rng.choice(spirits)
+            words, label = filler + [rng.choice(_SPIRIT_FORMS[spirit])], spirit
+            if rng.random() < 0.4:
+                words.append(rng.choice(_COCKTAIL_WORDS))
+                label = f"{spirit} Cocktail"
+        rng.shuffle(words)
+        corpus.append((" ".join(words), label))
+    return corpus
+
+@scenario("classifier")
+def classifier_scenario(size: Optional[int]) -> Dict[str, object]:
+    """drink_category accuracy and captions/sec of the legacy substring rule vs the precompiled matcher."""
+    from services.keyword_classifier import classify_captions
+
+    corpus = labelled_captions(size or 100_000)
+    captions = [caption for caption, _ in corpus]
+    expected = [label for _, label in corpus]
+    report: Dict[str, object] = {"captions": len(corpus)}
+
+    runs = (
+        ("legacy", lambda: [legacy_drink_category(c) for c in captions]),
+        ("matcher", lambda: [r["drink_category"] for r in classify_captions(captions)])
+    )
+    for label, classify in runs:
+        started = time.perf_counter()
+        predicted = classify()
+        seconds = time.perf_counter() - started
+        correct = sum(p == e for p, e in zip(predicted, expected))
+        false_drinks = sum(p != "Other" and e == "Other" for p, e in zip(predicted, expected))
+        report[f"{label}.captions_per_second"] = round(len(corpus) / seconds)
+        report[f"{label}.accuracy"] = round(correct / len(corpus), 4)
+        report[f"{label}.false_drink_on_confusers"] = false_drinks
+    return report
+
+# --- user-014: async sürücü ---
+
+@scenario("read_paths")
+def read_paths_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    /posts?limit=100 and /stats under 50 concurrent clients, `size` requests each (default 2000),
+    on both session paths of the async endpoints: "async" (asyncpg/aiosqlite AsyncSession) and
+    "threaded" (sync driver in worker threads, database.ThreadedSession). The response cache
+    is off so every request reaches the DB. Pass --database-url to run it against Postgres.
+    """
+    import asyncio
+
+    import httpx
+
+    from bench.runner import _percentile
+    from config import settings
+    from main import create_app
+    from services import post_store
+
+    requests, concurrency = size or 2000, 50
+    settings.RESPONSE_CACHE_ENABLED = False
+    _reset_db()
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, synthetic_posts(1000), "bench_user")
+    paths = {"posts": "/posts/bench_user?limit=100", "stats": "/stats/bench_user"}
+
+    async def load(client: httpx.AsyncClient, path: str) -> Tuple[float, List[float]]:
+        latencies: List[float] = []
+        queue = iter(range(requests))
+
+        async def client_loop():
+            for _ in queue:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path}: HTTP {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies
+
+    report: Dict[str, object] = {
+        "dialect": database.get_engine().dialect.name, "requests": requests, "concurrency": concurrency,
+        "default_path": "async" if database.uses_async_driver() else "threaded"
+    }
+    for label, use_async in (("async", True), ("threaded", False)):
+        settings.DB_ASYNC_DRIVER = use_async
+
+        async def run():
+            transport = httpx.ASGITransport(app=create_app())
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, path in paths.items():
+                    # Isınma: bağlantı havuzu ve sorgu derleme önbelleği dolsun
+                    await asyncio.gather(*(client.get(path) for _ in range(concurrency)))
+                    seconds, latencies = await load(client, path)
+                    report[f"{label}.{name}.req_per_s"] = round(requests / seconds, 1)
+                    report[f"{label}.{name}.p50_ms"] = round(_percentile(latencies, 50) * 1000, 1)
+                    report[f"{label}.{name}.p99_ms"] = round(_percentile(latencies, 99) * 1000, 1)
+            await database.dispose_async_engine()
+
+        asyncio.run(run())
+        database.dispose_engine()
+    settings.DB_ASYNC_DRIVER = None
+    for name in paths:
+        report[f"{name}.threaded_vs_async"] = round(
+            report[f"threaded.{name}.req_per_s"] / report[f"async.{name}.req_per_s"], 2
+        )
+    return report
+
+# --- user-025: etiket id'leri ---
+
+# 0005 öncesi düzen: etiketler her satırda metin olarak (karşılaştırma için aynı satırlardan kopyalanır)
+_LEGACY_LABEL_TABLE = "bench_legacy_label_posts"
+_LEGACY_LABEL_DDL = (
+    f"CREATE TABLE {_LEGACY_LABEL_TABLE} ("
+    "id INTEGER PRIMARY KEY, permalink TEXT, instagram_id VARCHAR(100) NOT NULL UNIQUE, "
+    "username VARCHAR(100) NOT NULL, caption TEXT, media_type VARCHAR(50), media_url TEXT, "
+    "post_timestamp TIMESTAMP, ai_category VARCHAR(100), ai_summary TEXT, "
+    "drink_category VARCHAR(100), created_at TIMESTAMP)"
+)
+_LEGACY_LABEL_INDEXES = (
+    f"CREATE INDEX ix_legacy_username_ts ON {_LEGACY_LABEL_TABLE} (username, post_timestamp DESC, id DESC)",
+    f"CREATE INDEX ix_legacy_drink_category ON {_LEGACY_LABEL_TABLE} (drink_category)",
+)
+
+def _seed_labelled_rows(count: int, users: int, chunk: int = 50_000):
+    """Like seed_export_rows, spread over users and over every drink / AI label."""
+    from services import categories
+
+    table = models.InstagramPost.__table__
+    drinks, topics = categories.DRINK_CATEGORIES, categories.AI_CATEGORIES
+    start = datetime(2025, 1, 1)
+    with database.get_engine().begin() as conn:
+        for offset in range(0, count, chunk):
+            conn.execute(table.insert(), [
+                {
+                    "instagram_id": f"bench_{i}",
+                    "username": f"bench_user_{i % users}",
+                    "caption": f"negroni with 3cl gin #{i}",
+                    "media_type": "VIDEO",
+                    "media_url": f"https://example.invalid/{i}.jpg",
+                    "permalink": f"https://instagram.com/p/bench_{i}",
+                    "post_timestamp": start - timedelta(minutes=i),
+                    "ai_category": topics[i % len(topics)],
+                    "ai_summary": "Gin cocktail recipe.",
+                    "drink_category": drinks[(i // 7) % len(drinks)]
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ])
+
+def _relation_bytes(conn, names: List[str]) -> Dict[str, Optional[int]]:
+    """On-disk size of each table / index (SQLite dbstat, PostgreSQL pg_relation_size)."""
+    from sqlalchemy import text
+
+    if conn.dialect.name == "postgresql":
+        return {
+            name: conn.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}).scalar()
+            for name in names
+        }
+    try:
+        rows = dict(conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    except Exception:
+        # dbstat olmadan derlenmiş SQLite: boyut raporlanamaz
+        return {name: None for name in names}
+    return {name: rows.get(name) for name in names}
+
+def _mb(size: Optional[int]) -> Optional[float]:
+    return None if size is None else round(size / 2 ** 20, 1)
+
+@scenario("label_storage")
+def label_storage_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    size posts (default 5M) over 50 users, stored with small-int label ids (migration 0005)
+    and copied into the old text-label layout. Reports bytes per row, the size of the
+    username and drink_category indexes, the per-user GROUP BY behind a stats rebuild on
+    both layouts, and /stats latency (served from user_category_stats, cache off).
+    """
+    import asyncio
+
+    import httpx
+    from sqlalchemy import text
+
+    from bench.runner import _percentile
+    from config import settings
+    from main import create_app
+    from services import category_stats
+
+    rows, users = size or 5_000_000, 50
+    settings.RESPONSE_CACHE_ENABLED = False
+    _reset_db()
+    started = time.perf_counter()
+    _seed_labelled_rows(rows, users)
+    report: Dict[str, object] = {
+        "dialect": database.get_engine().dialect.name, "rows": rows, "users": users,
+        "seed_seconds": round(time.perf_counter() - started, 1)
+    }
+
+    with database.get_engine().begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {_LEGACY_LABEL_TABLE}"))
+        conn.execute(text(_LEGACY_LABEL_DDL))
+        conn.execute(text(
+            f"INSERT INTO {_LEGACY_LABEL_TABLE} "
+            "SELECT p.id, p.permalink, p.instagram_id, p.username, p.caption, m.name, p.media_url, "
+            "p.post_timestamp, a.name, p.ai_summary, d.name, p.created_at FROM instagram_posts p "
+            "LEFT JOIN media_types m ON m.id = p.media_type_id "
+            "LEFT JOIN ai_categories a ON a.id = p.ai_category_id "
+            "LEFT JOIN drink_categories d ON d.id = p.drink_category_id"
+        ))
+        for ddl in _LEGACY_LABEL_INDEXES:
+            conn.execute(text(ddl))
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ANALYZE instagram_posts; ANALYZE {_LEGACY_LABEL_TABLE}"))
+        else:
+            conn.execute(text("ANALYZE"))
+    if database.get_engine().dialect.name == "sqlite":
+        # Yükleme sırasında büyüyen indeksler ile sonradan kurulanlar aynı doluluğa gelsin
+        with database.get_engine().connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    layouts = {
+        "ids": ("instagram_posts", "ix_instagram_posts_username_ts", "ix_instagram_posts_drink_category_id",
+                "drink_category_id"),
+        "text": (_LEGACY_LABEL_TABLE, "ix_legacy_username_ts", "ix_legacy_drink_category", "drink_category"),
+    }
+    with database.get_engine().connect() as conn:
+        for label, (table, username_index, drink_index, drink_column) in layouts.items():
+            sizes = _relation_bytes(conn, [table, username_index, drink_index])
+            if sizes[table] is not None:
+                report[f"{label}.bytes_per_row"] = round(sizes[table] / rows, 1)
+            report[f"{label}.table_mb"] = _mb(sizes[table])
+            report[f"{label}.username_index_mb"] = _mb(sizes[username_index])
+            report[f"{label}.drink_index_mb"] = _mb(sizes[drink_index])
+
+            # Tek kullanıcının kategori dağılımı (stats rebuild'in ana sorgusu)
+            query = text(f"SELECT {drink_column}, count(*) FROM {table} WHERE username = :u GROUP BY {drink_column}")
+            timings = []
+            for user in range(5):
+                started = time.perf_counter()
+                conn.execute(query, {"u": f"bench_user_{user}"}).all()
+                timings.append(time.perf_counter() - started)
+            report[f"{label}.group_by_ms"] = round(_percentile(timings, 50) * 1000, 1)
+
+    with database.get_engine().begin() as conn:
+        conn.execute(text(f"DROP TABLE {_LEGACY_LABEL_TABLE}"))
+
+    started = time.perf_counter()
+    with database.SessionLocal() as db:
+        category_stats.rebuild(db)
+    report["stats_rebuild_seconds"] = round(time.perf_counter() - started, 1)
+
+    async def stats_latency() -> List[float]:
+        latencies = []
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i in range(200):
+                started = time.perf_counter()
+                response = await client.get(f"/stats/bench_user_{i % users}")
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or response.json()["total_posts"] != rows // users:
+                    raise RuntimeError(f"/stats: HTTP {response.status_code}")
+        await database.dispose_async_engine()
+        return latencies
+
+    latencies = asyncio.run(stats_latency())
+    report["stats.p50_ms"] = round(_percentile(latencies, 50) * 1000, 2)
+    report["stats.p99_ms"] = round(_percentile(latencies, 99) * 1000, 2)
+    return report
+
+# --- user-019: /export akışı ---
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux /proc; elsewhere the peak from getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            import os
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def seed_export_rows(count: int, username: str = "bench_user", chunk: int = 50_000):
+    """Inserts count posts straight into instagram_posts (no stats or search index)."""
+    table = models.InstagramPost.__table__
+    start = datetime(2025, 1, 1)
+    with database.get_engine().begin() as conn:
+        for offset in range(0, count, chunk):
+            conn.execute(table.insert(), [
+                {
+                    "instagram_id": f"{username}_{i}",
+                    "username": username,
+                    "caption": f"negroni with 3cl gin #{i}",
+                    "media_type": "VIDEO",
+                    "media_url": f"https://example.invalid/{username}/{i}.jpg",
+                    "permalink": f"https://instagram.com/p/{username}_{i}",
+                    "post_timestamp": start - timedelta(minutes=i),
+                    "ai_category": "Gastronomy",
+                    "ai_summary": "Gin cocktail recipe.",
+                    "drink_category": "Gin Cocktail"
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ])
+
+async def drain_export(app, path: str, accept_encoding: str = "") -> Dict[str, object]:
+    """
+    Calls the ASGI app directly and discards the body as it streams, sampling RSS per
+    chunk; nothing is buffered on the client side, so the growth is the server's.
+    """
+    import asyncio
+    import zlib
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80), "root_path": ""
+    }
+    baseline = _rss_bytes()
+    state = {"status": None, "encoding": None, "bytes": 0, "lines": 0, "peak": baseline}
+    decoder = zlib.decompressobj(31)
+    requested, done = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # İstemci yanıt bitene kadar bağlı kalır
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+            state["encoding"] = dict(message["headers"]).get(b"content-encoding", b"").decode() or None
+            return
+        body = message.get("body", b"")
+        state["bytes"] += len(body)
+        text = decoder.decompress(body) if state["encoding"] == "gzip" else body
+        state["lines"] += text.count(b"\n")
+        state["peak"] = max(state["peak"], _rss_bytes())
+        if not message.get("more_body", False):
+            done.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return {
+        "status": state["status"],
+        "encoding": state["encoding"],
+        "lines": state["lines"],
+        "body_mb": round(state["bytes"] / 2 ** 20, 1),
+        "seconds": round(time.perf_counter() - started, 2),
+        "rss_growth_mb": round((state["peak"] - baseline) / 2 ** 20, 1)
+    }
+
+@scenario("export")
+def export_scenario(size: Optional[int]) -> Dict[str, object]:
+    """
+    Streams /export/{username} over size rows (default 1M) as NDJSON and gzip'd CSV.
+    rss_growth_mb is the peak resident growth during the stream; it must stay flat
+    (one EXPORT_BATCH_SIZE batch plus a flush buffer) whatever the row count.
+    """
+    import asyncio
+    import gc
+
+    from main import create_app
+
+    rows = size or 1_000_000
+    _reset_db()
+    started = time.perf_counter()
+    seed_export_rows(rows)
+    report: Dict[str, object] = {"rows": rows, "seed_seconds": round(time.perf_counter() - started, 1)}
+
+    app = create_app()
+    runs = (
+        ("ndjson", "/export/bench_user?format=ndjson", ""),
+        ("csv_gzip", "/export/bench_user?format=csv", "gzip, deflate"),
+    )
+
+    async def run():
+        for label, path, accept_encoding in runs:
+            gc.collect()
+            result = await drain_export(app, path, accept_encoding)
+            for key, value in result.items():
+                report[f"{label}.{key}"] = value
+        await database.dispose_async_engine()
+
+    asyncio.run(run())
+    return report
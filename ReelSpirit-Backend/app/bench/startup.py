@@ -0,0 +1,65 @@
+"""
+Cold-start benchmark: every run is a fresh interpreter that imports the app, runs the
+lifespan startup and serves its first requests, as a newly scaled-up worker would.
+Import this module only after DATABASE_URL points at the target DB.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Alt süreçte çalışan ölçüm; perf_counter interpreter açıldıktan sonra başlar
+_PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def probe():
+    import httpx
+    timings = {"import": imported - started}
+    app = main.create_app()
+    t = time.perf_counter()
+    async with main.lifespan(app):
+        timings["lifespan"] = time.perf_counter() - t
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+            t = time.perf_counter()
+            assert (await client.get("/")).status_code == 200
+            timings["first_request"] = time.perf_counter() - t
+            t = time.perf_counter()
+            assert (await client.get("/posts/startup_probe")).status_code == 200
+            timings["first_db_request"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - started
+    print(json.dumps(timings))
+
+asyncio.run(probe())
+"""
+
+STAGES = ("import", "lifespan", "first_request", "first_db_request", "total")
+
+def _run_once(app_dir: str) -> Dict[str, float]:
+    env = dict(os.environ, SCAN_WORKERS_ENABLED="false", LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=app_dir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_startup_benchmark(runs: int = 5) -> Dict[str, Dict[str, float]]:
+    """Median and max milliseconds per stage over `runs` fresh processes."""
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples: List[Dict[str, float]] = [_run_once(app_dir) for _ in range(max(1, runs))]
+    return {
+        stage: {
+            "median_ms": round(statistics.median(s[stage] for s in samples) * 1000, 1),
+            "max_ms": round(max(s[stage] for s in samples) * 1000, 1)
+        }
+        for stage in STAGES
+    }
+
+def format_startup_report(report: Dict[str, Dict[str, float]], runs: int) -> str:
+    lines = [f"== cold start ({runs} runs) =="]
+    for stage in STAGES:
+        lines.append(f"{stage:>17}: median={report[stage]['median_ms']}ms max={report[stage]['max_ms']}ms")
+    return "\n".join(lines)
@@ -1,21 +1,163 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    # Veritabanı
-    DATABASE_URL: str
-    
+    # Veritabanı (Docker'da docker-compose verir; yerelde varsayılan SQLite dosyası)
+    DATABASE_URL: str = "sqlite:///./reelspirit.db"
+    # Async endpointler için; boşsa DATABASE_URL'den türetilir (asyncpg / aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Async endpointler async sürücü mü kullansın? Boş = otomatik: SQLite'ta (ASYNC_DATABASE_URL
+    # yoksa) senkron sürücü worker thread'inde çalışır, aiosqlite orada daha yavaş
+    DB_ASYNC_DRIVER: Optional[bool] = None
+    # Bağlantı havuzu (SQLite'ta sadece pre-ping kullanılır)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Şema `python manage.py migrate` ile kurulur; True ise uygulama açılışta da çalıştırır (yerel geliştirme)
+    DB_AUTO_MIGRATE: bool = False
+    # Veriden eklenen etiketler açılışta okunur; tanınmayan bir id en fazla bu aralıkla tabloyu yeniden okutur
+    EXTRA_LABEL_REFRESH_SECONDS: float = 60.0
+
     # Instagram API
-    INSTAGRAM_BUSINESS_ID: str
-    ACCESS_TOKEN: str
+    # Boş bırakılabilir: uygulama import edilir, gerçek çağrılar hata döner (replay/benchmark için)
+    INSTAGRAM_BUSINESS_ID: str = ""
+    ACCESS_TOKEN: str = ""
     
     # Google Gemini API
-    GOOGLE_API_KEY: str
+    GOOGLE_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-2.0-flash-exp"
+    # Aynı anda en fazla kaç Gemini isteği ve her biri için zaman aşımı (saniye)
+    GEMINI_MAX_CONCURRENCY: int = 4
+    GEMINI_TIMEOUT: float = 60.0
+    # Tek istekte gönderilecek tahmini token bütçesi ve öğe sınırı
+    GEMINI_BATCH_TOKEN_BUDGET: int = 6000
+    GEMINI_BATCH_MAX_ITEMS: int = 50
+    # Modelin atladığı öğeler en fazla kaç kez yeniden gönderilir
+    GEMINI_MAX_RESUBMITS: int = 2
+    # Devre kesici: son N çağrıda hata/yavaşlık oranı eşiği aşarsa Gemini atlanır
+    GEMINI_BREAKER_ENABLED: bool = True
+    GEMINI_BREAKER_WINDOW: int = 20
+    GEMINI_BREAKER_MIN_CALLS: int = 5
+    GEMINI_BREAKER_FAILURE_RATE: float = 0.5
+    GEMINI_BREAKER_SLOW_CALL_SECONDS: float = 30.0
+    GEMINI_BREAKER_SLOW_CALL_RATE: float = 0.8
+    GEMINI_BREAKER_OPEN_SECONDS: float = 30.0
+    GEMINI_BREAKER_HALF_OPEN_PROBES: int = 1
+    # Bu süre içinde sonucu gelmeyen yarım açık deneme kayıp sayılır (GEMINI_TIMEOUT'tan uzun olmalı)
+    GEMINI_BREAKER_PROBE_TIMEOUT: float = 120.0
+    # Anahtar kelime sınıflandırıcısının güveni bu eşiği geçerse post LLM'e gitmez (boş = kapalı)
+    LOCAL_CONFIDENCE_THRESHOLD: Optional[float] = None
+
+    # AI sonuç önbelleği (caption hash -> sınıflandırma)
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_TTL_DAYS: int = 30
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 100000
+    # Okunan kaydın last_used_at'i en fazla bu sıklıkta yazılır (LRU için saat hassasiyeti yeterli)
+    ANALYSIS_CACHE_TOUCH_SECONDS: int = 3600
+
+    # Görsel analiz katmanı: metinden sınıflanamayan (kısa/boş caption + "Other") postların
+    # küçük resimleri indirilip modele gönderilir. İndirmeler diskte instagram_id ile önbelleklenir.
+    MEDIA_ANALYSIS_ENABLED: bool = False
+    MEDIA_MIN_CAPTION_CHARS: int = 20
+    MEDIA_BATCH_MAX_ITEMS: int = 8
+    MEDIA_CACHE_DIR: str = "media_cache"
+    MEDIA_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    MEDIA_MAX_FILE_BYTES: int = 5 * 1024 * 1024
+    MEDIA_DOWNLOAD_CONCURRENCY: int = 8
+    MEDIA_DOWNLOAD_TIMEOUT: float = 15.0
     
     # Uygulama Ayarları
     API_VERSION: str = "v24.0"
     LOG_LEVEL: str = "INFO"
 
+    # Gözlemlenebilirlik: /metrics her zaman açık; OpenTelemetry span'leri opsiyonel
+    # (opentelemetry-sdk + otlp exporter kurulu olmalı, hedef OTEL_EXPORTER_OTLP_ENDPOINT)
+    OTEL_ENABLED: bool = False
+    OTEL_SERVICE_NAME: str = "reelspirit-api"
+
+    # Graph API HTTP İstemcisi (paylaşılan bağlantı havuzu)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+
+    # Graph API tekrar deneme / rate limit
+    GRAPH_MAX_RETRIES: int = 3
+    GRAPH_BACKOFF_BASE: float = 1.0
+    GRAPH_BACKOFF_MAX: float = 60.0
+    # Kullanım bu yüzdeyi aşınca sayfalar arasında bekleme başlar
+    GRAPH_USAGE_THROTTLE_PERCENT: float = 75.0
+
+    # Upstream başına süreç genelinde token bucket (0 = sınırsız)
+    INSTAGRAM_REQUESTS_PER_SECOND: float = 3.0
+    INSTAGRAM_REQUEST_BURST: float = 10.0
+    GEMINI_REQUESTS_PER_SECOND: float = 2.0
+    GEMINI_REQUEST_BURST: float = 4.0
+
+    # Derin tarama pipeline'ı (fetch -> analiz -> kayıt)
+    # Analiz aşamasına önceden çekilip bekletilebilecek sayfa sayısı
+    SCAN_PREFETCH_PAGES: int = 2
+    SCAN_ANALYZE_WORKERS: int = 2
+    SCAN_PERSIST_QUEUE_SIZE: int = 4
+    SCAN_PERSIST_WORKERS: int = 1
+
+    # Kalıcı tarama iş kuyruğu
+    # API'yi sadece istek karşılamak için çalıştıran instance'larda kapatılabilir
+    SCAN_WORKERS_ENABLED: bool = True
+    SCAN_WORKER_CONCURRENCY: int = 1
+    JOB_POLL_INTERVAL: float = 2.0
+    JOB_HEARTBEAT_SECONDS: float = 30.0
+    # Bu süre boyunca heartbeat atmayan 'running' iş sahipsiz sayılır ve yeniden kuyruğa alınır
+    JOB_STALE_SECONDS: float = 300.0
+    # Adil sıralama: bir iş bu kadar sayfadan sonra kuyruğun sonuna döner (0 = bölme yok)
+    SCAN_SLICE_PAGES: int = 5
+    # POST /analyze/batch tek istekte kabul edilen en fazla profil
+    BATCH_MAX_PROFILES: int = 500
+
+    # Arka plan yenileme zamanlayıcısı: izlenen kullanıcılar en bayat ve en çok okunan önce
+    # olmak üzere artımlı taranır. Bütçe tüm worker'lar için ortaktır (son 1 saatteki artımlı işler).
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INTERVAL_SECONDS: float = 300.0
+    SCHEDULER_MIN_STALENESS_HOURS: float = 6.0
+    SCHEDULER_REFRESHES_PER_HOUR: int = 60
+    # Kuyrukta bu kadar aktif iş varsa yenileme eklenmez (kullanıcı istekleri önce)
+    SCHEDULER_MAX_ACTIVE_JOBS: int = 10
+
+    # Tarama ilerleme akışı (SSE)
+    EVENTS_POLL_INTERVAL: float = 1.0
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    EVENTS_QUEUE_SIZE: int = 100
+
+    # /posts sayfalama
+    POSTS_PAGE_SIZE: int = 100
+    POSTS_MAX_PAGE_SIZE: int = 500
+    # /export akışında DB'den tek seferde okunan satır (yield_per)
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # /search sayfa boyutu ve facet başına dönen en fazla değer
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    SEARCH_FACET_LIMIT: int = 20
+
+    # /posts ve /stats yanıt önbelleği (ETag + 304). Varsayılan süreç içi LRU; sürüm
+    # sync_state.data_version'dan okunur, başka süreçlerin yazdıkları en geç
+    # RESPONSE_CACHE_VERSION_TTL_SECONDS içinde görünür. İsteğe bağlı paylaşılan Redis (redis://...)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_VERSION_TTL_SECONDS: float = 1.0
+    RESPONSE_CACHE_URL: Optional[str] = None
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+
+    # Kayıt Ayarları
+    # Mevcut postların AI alanları yeniden analizde güncellensin mi?
+    # "never" | "unprocessed" | "always"
+    AI_REFRESH_POLICY: str = "unprocessed"
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -1,20 +1,264 @@
-from sqlalchemy import create_engine
+import asyncio
+import hashlib
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from config import settings
 
-# Config dosyasından URL'i al
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+# Senkron sürücü -> async karşılığı
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite"
+}
+
+def to_async_url(url: str) -> str:
+    """postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite:// (others unchanged)."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str) -> dict:
+    """
+    Pool settings from config. SQLite is a local file without a server-side
+    connection limit, so only pre-ping applies there.
+    """
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE
+        )
+    return options
 
 Base = declarative_base()
 
+# --- SENKRON ENGINE ---
+# Import sırasında bağlantı/sürücü yüklenmez; ilk kullanımda DATABASE_URL'den oluşturulur
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+# Worker thread'leri aynı anda ilk session'ı açabilir
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = settings.DATABASE_URL
+                engine = create_engine(url, **engine_options(url))
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+def SessionLocal() -> Session:
+    get_engine()
+    return _session_factory()
+
 def get_db():
     """It provides a secure database session for dependency injection."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- ASYNC ENGINE (asyncpg / aiosqlite) ---
+# Sürücü sadece ilk kullanımda yüklenir; senkron yollar (worker thread'leri, manage.py) etkilenmez
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def uses_async_driver() -> bool:
+    """
+    Whether async endpoints talk to the DB through asyncpg/aiosqlite (DB_ASYNC_DRIVER).
+    Unset: yes, except on SQLite without ASYNC_DATABASE_URL, where aiosqlite's helper
+    thread is slower than the sync driver in a worker thread (manage.py scenario read_paths).
+    """
+    if settings.DB_ASYNC_DRIVER is not None:
+        return settings.DB_ASYNC_DRIVER
+    if settings.ASYNC_DATABASE_URL:
+        return True
+    return make_url(settings.DATABASE_URL).get_backend_name() != "sqlite"
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, **engine_options(url))
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+# Olay döngüsü başına bir kapı: havuz kapasitesinden fazla ThreadedSession aynı anda bağlantı tutamaz
+_connection_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _connection_gate() -> asyncio.Semaphore:
+    """
+    Sessions wait for a free connection here, on the event loop, instead of inside a worker
+    thread: threads blocked on the pool would starve the holders that need a thread to finish.
+    """
+    loop = asyncio.get_running_loop()
+    gate = _connection_gates.get(loop)
+    if gate is None:
+        pool = get_engine().pool
+        overflow = getattr(pool, "_max_overflow", 0)
+        capacity = pool.size() + overflow if hasattr(pool, "size") and overflow >= 0 else 1_000_000
+        gate = _connection_gates[loop] = asyncio.Semaphore(max(1, capacity))
+    return gate
+
+class ThreadedSession:
+    """
+    The subset of AsyncSession the routers use (execute, stream, run_sync, commit, close),
+    backed by a sync Session whose calls run in worker threads. Results are buffered in
+    the thread, so fetching rows never touches the DB from the event loop. The first call
+    takes a connection slot (_connection_gate) that close() gives back.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+        self._gate: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "ThreadedSession":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, fn: Callable[..., Any], *args, **kwargs):
+        if self._gate is None:
+            gate = _connection_gate()
+            await gate.acquire()
+            self._gate = gate
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def _execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # ORM sonuçları her zaman satır döner; DML CursorResult (rowcount) olduğu gibi kalır
+        return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await self._run(self._execute, statement, params, **kwargs)
+
+    async def stream(self, statement, params=None):
+        """
+        Like AsyncSession.stream: rows arrive in batches of the statement's yield_per
+        (default 1000), one thread hop per batch rather than per row.
+        """
+        batch_size = statement.get_execution_options().get("yield_per") or 1000
+        result = await self._run(
+            self.sync_session.execute, statement, params, execution_options={"stream_results": True}
+        )
+
+        async def rows():
+            try:
+                while True:
+                    batch = await asyncio.to_thread(result.fetchmany, batch_size)
+                    if not batch:
+                        return
+                    for row in batch:
+                        yield row
+            finally:
+                await asyncio.to_thread(result.close)
+
+        return rows()
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs):
+        return await self._run(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self):
+        await self._run(self.sync_session.commit)
+
+    async def close(self):
+        try:
+            await asyncio.to_thread(self.sync_session.close)
+        finally:
+            if self._gate is not None:
+                self._gate.release()
+                self._gate = None
+
+def AsyncSessionLocal():
+    """AsyncSession on the async driver, or a ThreadedSession over the sync engine (uses_async_driver)."""
+    if not uses_async_driver():
+        return ThreadedSession(SessionLocal())
+    get_async_engine()
+    return _async_session_factory()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Async session for async endpoints; queries never block the event loop."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dispose_engine():
+    global _engine, _session_factory
+    if _engine is not None:
+        _engine.dispose()
+        _engine = _session_factory = None
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session_factory = None
+
+# --- ADVISORY LOCK (worker'lar arası) ---
+
+def advisory_lock_id(key: str) -> int:
+    """Stable signed 64-bit id for pg_advisory_lock (the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+@asynccontextmanager
+async def advisory_lock(key: str):
+    """
+    Holds a PostgreSQL session-level advisory lock on a dedicated connection, so commits
+    made by other sessions inside the block do not release it.
+    Other databases (SQLite: one process) have no cross-worker lock; the block just runs.
+    """
+    engine = get_async_engine()
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+
+    lock_id = advisory_lock_id(key)
+    async with engine.connect() as conn:
+        await conn.execute(select(func.pg_advisory_lock(lock_id)))
+        await conn.commit()
+        try:
+            yield
+        finally:
+            await conn.execute(select(func.pg_advisory_unlock(lock_id)))
+            await conn.commit()
+
+@asynccontextmanager
+async def try_advisory_lock(key: str):
+    """
+    Non-blocking variant: yields True if this process got the lock, False if another holds it.
+    Without PostgreSQL it always yields True.
+    """
+    engine = get_async_engine()
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    lock_id = advisory_lock_id(key)
+    async with engine.connect() as conn:
+        acquired = bool((await conn.execute(select(func.pg_try_advisory_lock(lock_id)))).scalar())
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(select(func.pg_advisory_unlock(lock_id)))
+                await conn.commit()
@@ -1,39 +1,109 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import models
 import database
+import models
+from config import settings
 
 # Routerları import et
-from routers import analysis, posts
+from routers import analysis, export, posts, search
+from services import instagram, job_queue, media_cache, scheduler, telemetry
 from utils import setup_logger
 
 logger = setup_logger("Main")
 
-app = FastAPI(
-    title="ReelSpirit API",
-    version="2.1.0",
-    description="Modular & Async Instagram Analyzer"
-)
-
-# CORS Ayarları
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:4200", 
-        "http://192.168.1.113:4200"  # <- Bunu ekle
-    ], # Frontend adresi
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Veritabanı tablolarını oluştur
-models.Base.metadata.create_all(bind=database.engine)
-
-# Router'ları sisteme dahil et
-app.include_router(analysis.router)
-app.include_router(posts.router)
-
-@app.get("/")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the scan workers and the refresh scheduler on startup and closes shared clients on shutdown.
+    Nothing here connects to Graph API or Gemini, and the schema is managed by
+    `python manage.py migrate`. The only database read is the data-added labels.
+    """
+    missing = [name for name in ("INSTAGRAM_BUSINESS_ID", "ACCESS_TOKEN", "GOOGLE_API_KEY") if not getattr(settings, name)]
+    if missing:
+        logger.warning(f"Eksik ayarlar: {', '.join(missing)}. Instagram/Gemini çağrıları başarısız olacak.")
+    if settings.DB_AUTO_MIGRATE:
+        # Yerel geliştirme kolaylığı; üretimde migrate ayrı bir adımdır
+        import migrations
+        await asyncio.to_thread(migrations.migrate)
+    # Veriden eklenen etiketler burada okunur; istek sırasında sync engine olay döngüsünü bloklamasın
+    for model in models.LABEL_TABLES:
+        await asyncio.to_thread(model.vocabulary.load_extra)
+    telemetry.setup_tracing()
+    # Graph API istemcisi ilk istekte açılır (TLS bağlamı ~0.2s); kapanışta burada kapatılır
+    workers = job_queue.start_workers()
+    # İzlenen kullanıcılar arka planda yenilenir; ilk tur SCHEDULER_INTERVAL_SECONDS sonra
+    refresher = scheduler.start_scheduler()
+    yield
+    await scheduler.stop_scheduler(refresher)
+    await job_queue.stop_workers(workers)
+    await instagram.close_client()
+    await media_cache.close_cache()
+    await database.dispose_async_engine()
+    database.dispose_engine()
+    telemetry.shutdown_tracing()
+
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency; the route template keeps label cardinality low (/posts/{username})."""
+    started = time.perf_counter()
+    status = 500
+    telemetry.HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        telemetry.HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        telemetry.HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - started)
+
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = telemetry.render_metrics()
+    return Response(content=body, media_type=content_type)
+
 def health_check():
     return {"status": "active", "system": "Reels Analyzer Modular API"}
+
+def create_app() -> FastAPI:
+    """
+    App factory: builds routes and middleware only (no I/O).
+    uvicorn main:app uses the module-level instance; `uvicorn --factory main:create_app` builds a fresh one.
+    """
+    app = FastAPI(
+        title="ReelSpirit API",
+        version="2.1.0",
+        description="Modular & Async Instagram Analyzer",
+        lifespan=lifespan
+    )
+
+    # CORS Ayarları
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:4200",
+            "http://192.168.1.113:4200"  # <- Bunu ekle
+        ], # Frontend adresi
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Sayfalama ve önbellek başlıkları frontend'den okunabilsin
+        expose_headers=["X-Next-Cursor", "Link", "ETag"],
+    )
+    app.middleware("http")(record_request_metrics)
+
+    # Router'ları sisteme dahil et
+    app.include_router(analysis.router)
+    app.include_router(posts.router)
+    app.include_router(export.router)
+    app.include_router(search.router)
+
+    app.get("/metrics", include_in_schema=False)(metrics)
+    app.get("/")(health_check)
+    return app
+
+app = create_app()
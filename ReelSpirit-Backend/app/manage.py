@@ -0,0 +1,234 @@
+"""
+Yönetim komutları.
+Kullanım (app klasörü içinden):
+    python manage.py migrate [--status]
+    python manage.py rebuild-stats [--username USER]
+    python manage.py rebuild-search
+    python manage.py legacy-labels [--drop]
+    python manage.py record --username USER [--username USER2 ...] [--pages N] --out DIR
+    python manage.py bench [--fixtures DIR | --profiles N --pages N] [--gemini-latency S] ...
+    python manage.py bench-startup [--runs N]
+    python manage.py scenario NAME [--size N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+# bench/scenarios.py'deki kayıt adları (modül DATABASE_URL ayarlanmadan import edilmez)
+SCENARIO_NAMES = ("store", "graph", "batching", "sse", "classifier", "read_paths", "export", "label_storage")
+
+def migrate(args):
+    import database
+    import migrations
+
+    if args.status:
+        with database.get_engine().connect() as conn:
+            todo = migrations.pending(conn)
+            conn.commit()
+        print(f"Pending migrations: {', '.join(todo) if todo else 'none'}")
+        return
+    applied = migrations.migrate()
+    print(f"Applied migrations: {', '.join(applied) if applied else 'none (up to date)'}")
+
+def rebuild_stats(args):
+    import database
+    from services import category_stats
+
+    with database.SessionLocal() as db:
+        written = category_stats.rebuild(db, args.username)
+    print(f"user_category_stats rebuilt: {written} rows.")
+
+def rebuild_search(args):
+    import database
+    from services import search_index
+
+    with database.SessionLocal() as db:
+        indexed = search_index.rebuild(db)
+    print(f"Search index rebuilt: {indexed} posts.")
+
+def legacy_labels(args):
+    """Shows how migration 0005 mapped the old category texts; --drop removes the archived columns."""
+    import database
+    import migrations
+
+    with database.get_engine().begin() as conn:
+        report = migrations.legacy_label_report(conn)
+        if not report:
+            print("No *_legacy columns (nothing archived or already dropped).")
+            return
+        if args.drop:
+            dropped = migrations.drop_legacy_label_columns(conn)
+            print(f"Dropped: {', '.join(dropped)}")
+            return
+
+    for key, rows in report.items():
+        print(f"== {key} ==")
+        for old, label, count in rows:
+            print(f"{old!r:40} -> {label!r:25} {count}")
+
+def record(args):
+    """Walks real profiles through the Graph API and saves every page as a replay fixture."""
+    from bench.replay import RecordingTransport, save_fixtures
+    from services import instagram
+
+    async def run():
+        transport = RecordingTransport()
+        instagram.set_default_transport(transport)
+        await instagram.start_client()
+        try:
+            for username in args.username:
+                cursor = None
+                for _ in range(args.pages):
+                    posts, cursor = await instagram.fetch_instagram_page(username, cursor)
+                    if not cursor:
+                        break
+        finally:
+            await instagram.close_client()
+        return transport.fixtures
+
+    fixtures = asyncio.run(run())
+    save_fixtures(fixtures, args.out)
+    print(f"Recorded {sum(len(p) for p in fixtures.values())} pages of {len(fixtures)} profiles to {args.out}.")
+
+def bench(args):
+    """Offline end-to-end benchmark: replayed Graph API + fake Gemini, fresh DB by default."""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="reelspirit-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    # Ayarlar ilk import'ta okunur; DATABASE_URL'den sonra yüklenmeli
+    from config import settings
+    from bench.replay import FakeGemini, load_fixtures, synthesize_fixtures
+    from bench.runner import format_report, run_benchmark
+
+    settings.ANALYSIS_CACHE_ENABLED = args.cache
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = synthesize_fixtures(args.profiles, args.pages, args.per_page, seed=args.seed)
+
+    gemini = FakeGemini(
+        latency=args.gemini_latency,
+        jitter=args.gemini_jitter,
+        error_rate=args.gemini_error_rate,
+        drop_rate=args.gemini_drop_rate,
+        seed=args.seed
+    )
+    report = asyncio.run(run_benchmark(
+        fixtures,
+        gemini,
+        graph_latency=args.graph_latency,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        keep_rate_limits=args.keep_rate_limits
+    ))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, label=f"{os.environ['DATABASE_URL'].split(':')[0]} / seed {args.seed}"))
+
+def bench_startup(args):
+    """Cold start of a fresh worker: import, lifespan and first requests, against a migrated DB."""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="reelspirit-startup-"), "startup.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+    import migrations
+    from bench.startup import format_startup_report, run_startup_benchmark
+
+    migrations.migrate()
+    report = run_startup_benchmark(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_startup_report(report, args.runs))
+
+def scenario(args):
+    """Runs one focused micro-benchmark from bench/scenarios.py on a fresh temporary DB."""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="reelspirit-scenario-"), "scenario.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from bench.scenarios import SCENARIOS
+
+    report = SCENARIOS[args.name](args.size)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"== scenario {args.name} ==")
+        for key, value in report.items():
+            print(f"{key}: {value}")
+
+def main():
+    parser = argparse.ArgumentParser(description="ReelSpirit management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--status", action="store_true", help="Only list pending migrations")
+    migrate_parser.set_defaults(func=migrate)
+
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute per-user category stats from instagram_posts")
+    stats_parser.add_argument("--username", help="Only rebuild this user (default: all users)")
+    stats_parser.set_defaults(func=rebuild_stats)
+
+    search_parser = subparsers.add_parser("rebuild-search", help="Rebuild the full-text search index from instagram_posts")
+    search_parser.set_defaults(func=rebuild_search)
+
+    labels_parser = subparsers.add_parser("legacy-labels", help="Review the old category texts kept by migration 0005")
+    labels_parser.add_argument("--drop", action="store_true", help="Drop the archived *_legacy columns")
+    labels_parser.set_defaults(func=legacy_labels)
+
+    record_parser = subparsers.add_parser("record", help="Record Graph API pages of real profiles as replay fixtures")
+    record_parser.add_argument("--username", action="append", required=True, help="Profile to record (repeatable)")
+    record_parser.add_argument("--pages", type=int, default=10, help="Max pages per profile")
+    record_parser.add_argument("--out", required=True, help="Fixture directory")
+    record_parser.set_defaults(func=record)
+
+    bench_parser = subparsers.add_parser("bench", help="Offline fetch -> analyze -> save throughput benchmark")
+    bench_parser.add_argument("--fixtures", help="Recorded fixture directory (default: synthetic profiles)")
+    bench_parser.add_argument("--profiles", type=int, default=20, help="Synthetic profiles")
+    bench_parser.add_argument("--pages", type=int, default=8, help="Pages per synthetic profile")
+    bench_parser.add_argument("--per-page", type=int, default=25, help="Posts per synthetic page")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--gemini-latency", type=float, default=0.5, help="Mean fake Gemini latency (s)")
+    bench_parser.add_argument("--gemini-jitter", type=float, default=0.3, help="Relative latency jitter")
+    bench_parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    bench_parser.add_argument("--gemini-drop-rate", type=float, default=0.0, help="Share of items the fake model omits")
+    bench_parser.add_argument("--graph-latency", type=float, default=0.05, help="Replayed Graph API latency (s)")
+    bench_parser.add_argument("--concurrency", type=int, default=8, help="Concurrent POST /analyze requests")
+    bench_parser.add_argument("--timeout", type=float, default=600.0)
+    bench_parser.add_argument("--database-url", help="Target DB (default: fresh temporary SQLite file)")
+    bench_parser.add_argument("--cache", action="store_true", help="Keep the Gemini result cache enabled")
+    bench_parser.add_argument("--keep-rate-limits", action="store_true", help="Apply the upstream token buckets")
+    bench_parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    bench_parser.set_defaults(func=bench)
+
+    startup_parser = subparsers.add_parser("bench-startup", help="Cold-start time: import + lifespan + first requests")
+    startup_parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    startup_parser.add_argument("--database-url", help="Target DB (default: fresh temporary SQLite file)")
+    startup_parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    startup_parser.set_defaults(func=bench_startup)
+
+    scenario_parser = subparsers.add_parser("scenario", help="Focused micro-benchmark (see bench/scenarios.py)")
+    scenario_parser.add_argument("name", choices=SCENARIO_NAMES)
+    scenario_parser.add_argument("--size", type=int, help="Scenario size (rows, clients, captions...; default: scenario's own)")
+    scenario_parser.add_argument("--database-url", help="Target DB (default: fresh temporary SQLite file)")
+    scenario_parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    scenario_parser.set_defaults(func=scenario)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Hand-rolled schema migrations (no Alembic).
+
+Each migration is a (version, description, function) entry in MIGRATIONS and runs once;
+applied versions are recorded in schema_migrations. Migrations must be idempotent
+(checkfirst / "IF NOT EXISTS"), because databases created by the old startup-time
+create_all already contain part of the schema.
+
+Run explicitly before starting the API:
+    python manage.py migrate
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, case, column, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import database
+import models
+from services import categories, category_stats
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Kayıt tablosu uygulama modellerinden ayrı tutulur (Base.metadata'ya girmez)
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", String(50), primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+# Aynı anda iki worker migrate çalıştırırsa biri bekler (PostgreSQL)
+_LOCK_KEY = "reelspirit:migrations"
+
+# 0005'te id'ye taşınan metin kolonları (eski halleri <ad>_legacy olarak saklanır)
+LEGACY_LABEL_COLUMNS = ("drink_category", "ai_category", "media_type")
+
+def _create_tables(conn: Connection):
+    # Yeni veritabanında tüm tablolar (ve indeksleri) oluşur; mevcut tablolar atlanır
+    models.Base.metadata.create_all(bind=conn, checkfirst=True)
+
+def _create_missing_indexes(conn: Connection):
+    # create_all var olan tabloya sonradan eklenen indeksleri oluşturmaz
+    tables = (models.InstagramPost.__table__, models.ScanJob.__table__)
+
+    def index_names():
+        inspector = inspect(conn)
+        return {ix["name"] for table in tables for ix in inspector.get_indexes(table.name)}
+
+    before = index_names()
+    for table in tables:
+        for index in table.indexes:
+            if index.name not in before:
+                # ddl_if ile başka bir dialect'e ait indeksler (ör. GIN) burada atlanır
+                index.create(bind=conn, checkfirst=True)
+    for name in sorted(index_names() - before):
+        logger.info(f"Index oluşturuldu: {name}")
+
+def _sqlite_search_table(conn: Connection):
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": models.SQLITE_FTS_TABLE}
+    ).first() is not None
+    if exists:
+        return
+    conn.execute(text(models.SQLITE_FTS_DDL))
+    # Arama öncesinden kalan postlar indekse alınır
+    conn.execute(text(
+        f"INSERT INTO {models.SQLITE_FTS_TABLE} (rowid, caption, ai_summary) "
+        f"SELECT id, coalesce(caption, ''), coalesce(ai_summary, '') FROM instagram_posts"
+    ))
+
+def _add_missing_columns(conn: Connection, table, names):
+    """ALTER TABLE ... ADD COLUMN for model columns (by key) the existing table lacks."""
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for key in names:
+        column = table.c[key]
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+        for fk in column.foreign_keys:
+            ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg.text}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        logger.info(f"Kolon eklendi: {table.name}.{column.name}")
+
+def _sync_state_watchlist(conn: Connection):
+    _add_missing_columns(
+        conn, models.SyncState.__table__, ("watched", "views_since_sync", "last_viewed_at")
+    )
+
+def _seed_labels(conn: Connection):
+    for model in models.LABEL_TABLES:
+        model.__table__.create(bind=conn, checkfirst=True)
+        known = set(conn.execute(select(model.id)).scalars())
+        rows = [row for row in model.vocabulary.rows() if row["id"] not in known]
+        if rows:
+            conn.execute(model.__table__.insert(), rows)
+
+def _add_extra_label(conn: Connection, model, raw: str) -> str:
+    """Adds an old value that matches no label as a new row of model's lookup table."""
+    label = raw.strip()[:100]
+    last = conn.execute(select(func.max(model.id))).scalar() or 0
+    label_id = max(last + 1, categories.EXTRA_LABEL_ID_START)
+    conn.execute(model.__table__.insert().values(id=label_id, name=label))
+    model.vocabulary.add_extra(label_id, label)
+    return label
+
+def _category_label_ids(conn: Connection):
+    """
+    Moves drink_category / ai_category / media_type from text columns to small-int label ids.
+    The distinct old values are canonicalized in Python and written back in one UPDATE pass.
+    Old values that match no label become new label rows instead of falling back to the
+    default, and the text columns are kept as <name>_legacy for review
+    (python manage.py legacy-labels [--drop]).
+    """
+    _seed_labels(conn)
+    table = models.InstagramPost.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    legacy = [key for key in LEGACY_LABEL_COLUMNS if key in existing]
+    if not legacy:
+        # Yeni veritabanı: tablo 0001'de id kolonlarıyla oluştu
+        return
+
+    _add_missing_columns(conn, table, legacy)
+    label_models = {model.vocabulary.name: model for model in models.LABEL_TABLES}
+    values = {}
+    for key in legacy:
+        old = column(key)
+        target = table.c[key]
+        vocabulary = target.type.vocabulary
+        mapping = {}
+        added = 0
+        for raw in conn.execute(select(old).select_from(table).where(old.isnot(None)).distinct()).scalars():
+            label = vocabulary.lookup(raw)
+            if label is None and raw.strip():
+                label = _add_extra_label(conn, label_models[vocabulary.name], raw)
+                added += 1
+            label = label or vocabulary.default
+            if label is not None:
+                mapping[raw] = vocabulary.ids[label]
+        if mapping:
+            values[target] = case(mapping, value=old)
+        logger.info(
+            f"{key}: {len(mapping)} farklı değer -> {len(set(mapping.values()))} etiket "
+            f"({added} yeni etiket)"
+        )
+    if values:
+        conn.execute(table.update().values(values))
+
+    for key in legacy:
+        # Metin kolonu silinmez; eşleme gözden geçirilene kadar <ad>_legacy olarak kalır
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table.name}_{key}"))
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME COLUMN {key} TO {key}_legacy"))
+    _create_missing_indexes(conn)
+
+    # Birleşen kategoriler (ör. "Whisky Cocktail" + "Whiskey Cocktail") istatistiklerde de birleşir
+    with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+        category_stats.rebuild(db, bump_versions=False)
+
+def legacy_label_report(conn: Connection) -> Dict[str, List[Tuple[str, Optional[str], int]]]:
+    """(old text, label it was mapped to, posts) per archived *_legacy column."""
+    table = models.InstagramPost.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    report = {}
+    for key in LEGACY_LABEL_COLUMNS:
+        if f"{key}_legacy" not in existing:
+            continue
+        old = column(f"{key}_legacy")
+        rows = conn.execute(
+            select(old, table.c[key], func.count()).select_from(table)
+            .group_by(old, table.c[key]).order_by(func.count().desc())
+        ).all()
+        report[key] = [tuple(row) for row in rows]
+    return report
+
+def drop_legacy_label_columns(conn: Connection) -> List[str]:
+    """Drops the *_legacy text columns kept by migration 0005."""
+    table = models.InstagramPost.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    dropped = [f"{key}_legacy" for key in LEGACY_LABEL_COLUMNS if f"{key}_legacy" in existing]
+    for name in dropped:
+        conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN {name}"))
+        logger.info(f"Kolon silindi: {table.name}.{name}")
+    return dropped
+
+def _keyset_index_nulls_last(conn: Connection):
+    """
+    PostgreSQL: rebuilds ix_instagram_posts_username_ts as (post_timestamp DESC NULLS LAST),
+    the order /posts and /export use; the old DESC (= NULLS FIRST) index could not serve it.
+    SQLite already sorts NULLs last under DESC, so its index stays.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("DROP INDEX IF EXISTS ix_instagram_posts_username_ts"))
+    for index in models.InstagramPost.__table__.indexes:
+        if index.name == "ix_instagram_posts_username_ts":
+            index.create(bind=conn)
+
+def _sync_state_data_version(conn: Connection):
+    _add_missing_columns(conn, models.SyncState.__table__, ("data_version",))
+
+def _scan_job_origin(conn: Connection):
+    _add_missing_columns(conn, models.ScanJob.__table__, ("origin",))
+
+MIGRATIONS: List[Tuple[str, str, Callable[[Connection], None]]] = [
+    ("0001", "create tables", _create_tables),
+    ("0002", "indexes added after the initial schema", _create_missing_indexes),
+    ("0003", "sqlite full-text search table", _sqlite_search_table),
+    ("0004", "refresh watchlist columns on sync_state", _sync_state_watchlist),
+    ("0005", "small-int category label ids on instagram_posts", _category_label_ids),
+    ("0006", "keyset index with NULLS LAST on PostgreSQL", _keyset_index_nulls_last),
+    ("0007", "response cache data_version on sync_state", _sync_state_data_version),
+    ("0008", "origin column on scan_jobs", _scan_job_origin),
+]
+
+def applied_versions(conn: Connection) -> set:
+    schema_migrations.create(bind=conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def pending(conn: Connection) -> List[str]:
+    done = applied_versions(conn)
+    return [version for version, _, _ in MIGRATIONS if version not in done]
+
+def migrate(engine=None) -> List[str]:
+    """Applies pending migrations in order, each in its own transaction. Returns the applied versions."""
+    engine = engine or database.get_engine()
+    applied = []
+    with engine.connect() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            conn.execute(select(func.pg_advisory_lock(database.advisory_lock_id(_LOCK_KEY))))
+            conn.commit()
+        try:
+            with conn.begin():
+                done = applied_versions(conn)
+            for version, description, apply in MIGRATIONS:
+                if version in done:
+                    continue
+                with conn.begin():
+                    apply(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=version, description=description, applied_at=datetime.utcnow()
+                    ))
+                logger.info(f"Migration {version} uygulandı: {description}")
+                applied.append(version)
+        finally:
+            if is_postgres:
+                conn.execute(select(func.pg_advisory_unlock(database.advisory_lock_id(_LOCK_KEY))))
+                conn.commit()
+    return applied
@@ -1,5 +1,96 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
+import functools
+from typing import Dict
+
+from sqlalchemy import (
+    DDL, Boolean, Column, ForeignKey, Integer, SmallInteger, String, Text, DateTime, Index,
+    event, func, inspect, literal_column, select, text
+)
+from sqlalchemy.types import TypeDecorator
 from database import Base
+from services import categories
+
+# --- SINIFLANDIRMA ETİKETLERİ ---
+# Kategoriler satırda metin yerine küçük tamsayı id olarak tutulur (2 bayt, tamsayı karşılaştırma).
+# Python tarafında değerler yine metindir: Post.drink_category == "Gin" sorgusu id ile çalışır.
+UNKNOWN_LABEL_ID = -1
+
+class LabelType(TypeDecorator):
+    """Stores a label of a categories.Vocabulary as its small-int id."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, vocabulary: categories.Vocabulary):
+        super().__init__()
+        self.vocabulary = vocabulary
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        label = self.vocabulary.lookup(value)
+        # Tanınmayan filtre değeri hiçbir satırla eşleşmez (varsayılana düşmez)
+        return self.vocabulary.ids[label] if label else UNKNOWN_LABEL_ID
+
+    def process_result_value(self, value, dialect):
+        return self.vocabulary.label(value)
+
+def _columns_exist(ddl, target, bind, **kw) -> bool:
+    """ddl_if guard: create the index only if the live table already has its columns."""
+    if bind is None:
+        return True
+    existing = {column["name"] for column in inspect(bind).get_columns(target.table.name)}
+    return all(column.name in existing for column in target.columns)
+
+def _extra_label_rows(model) -> Dict[int, str]:
+    """
+    Labels added from data by migration 0005 (ids from categories.EXTRA_LABEL_ID_START).
+    Blocking read on the sync engine: loaded at startup from a thread (main.lifespan).
+    """
+    import database
+
+    with database.get_engine().connect() as conn:
+        rows = conn.execute(
+            select(model.id, model.name).where(model.id >= categories.EXTRA_LABEL_ID_START)
+        ).all()
+    return dict(rows)
+
+class _LabelRow:
+    """Lookup table (id, name) of a vocabulary; rows are seeded by the migrations."""
+    id = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String(100), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}(id={self.id}, name={self.name})>"
+
+class DrinkCategory(_LabelRow, Base):
+    __tablename__ = "drink_categories"
+    vocabulary = categories.DRINK
+
+class AiCategory(_LabelRow, Base):
+    __tablename__ = "ai_categories"
+    vocabulary = categories.AI
+
+class MediaType(_LabelRow, Base):
+    __tablename__ = "media_types"
+    vocabulary = categories.MEDIA
+
+LABEL_TABLES = (DrinkCategory, AiCategory, MediaType)
+
+for _model in LABEL_TABLES:
+    _model.vocabulary.loader = functools.partial(_extra_label_rows, _model)
+
+# --- ARAMA İFADESİ ---
+# PostgreSQL: caption + ai_summary üzerinde ifade tabanlı GIN indeksi (yazma sırasında DB günceller).
+# Her iki tarafta da kök bulma var (english / porter): "cocktails" -> "cocktail".
+# Sorgular aynı ifadeyi (bind parametresiz) kullanmalı, aksi halde indeks seçilmez.
+SEARCH_TS_CONFIG = "english"
+
+def search_document(caption, ai_summary):
+    """to_tsvector(caption || ' ' || ai_summary), shared by the GIN index and the search query."""
+    return func.to_tsvector(
+        text(f"'{SEARCH_TS_CONFIG}'::regconfig"),
+        func.coalesce(caption, literal_column("''")).concat(literal_column("' '"))
+        .concat(func.coalesce(ai_summary, literal_column("''")))
+    )
 
 class InstagramPost(Base):
     __tablename__ = "instagram_posts"
@@ -9,16 +100,167 @@ class InstagramPost(Base):
     instagram_id = Column(String(100), unique=True, nullable=False)
     username = Column(String(100), nullable=False, index=True)
     caption = Column(Text)
-    media_type = Column(String(50))
+    media_type = Column(
+        "media_type_id", LabelType(categories.MEDIA), ForeignKey("media_types.id"), key="media_type"
+    )
     media_url = Column(Text)
     post_timestamp = Column(DateTime)
     
     # AI Analiz Sonuçları
-    ai_category = Column(String(100), default="General")
+    ai_category = Column(
+        "ai_category_id", LabelType(categories.AI), ForeignKey("ai_categories.id"),
+        key="ai_category", default="General"
+    )
     ai_summary = Column(Text)
-    drink_category = Column(String(100), index=True, default="Not Specified")
+    drink_category = Column(
+        "drink_category_id", LabelType(categories.DRINK), ForeignKey("drink_categories.id"),
+        key="drink_category", default="Not Specified"
+    )
     
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        # /posts keyset sayfalaması: ORDER BY post_timestamp DESC NULLS LAST, id DESC ile aynı sıra.
+        # PostgreSQL'de DESC varsayılanı NULLS FIRST'tür; SQLite'ta NULL en küçüktür ve
+        # DESC zaten NULLS LAST demektir (SQLite indekste NULLS LAST yazımını kabul etmez).
+        Index(
+            "ix_instagram_posts_username_ts", username, post_timestamp.desc().nullslast(), id.desc()
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_instagram_posts_username_ts", username, post_timestamp.desc(), id.desc()
+        ).ddl_if(callable_=lambda ddl, target, bind, dialect, **kw: dialect.name != "postgresql"),
+        # 0005'ten önceki tablolarda drink_category_id kolonu yoktur; indeks 0005'te oluşur
+        Index("ix_instagram_posts_drink_category_id", drink_category).ddl_if(callable_=_columns_exist),
+        # /search: tam metin GIN indeksi (sadece PostgreSQL; SQLite'ta FTS5 tablosu kullanılır)
+        Index(
+            "ix_instagram_posts_search", search_document(caption, ai_summary), postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    def __repr__(self):
+        return f"<Post(id={self.instagram_id}, user={self.username})>"
+
+# --- ARAMA İNDEKSİ ---
+# SQLite: FTS5 tablosu, rowid = instagram_posts.id; kayıt yolunda güncellenir (services/search_index.py)
+SQLITE_FTS_TABLE = "instagram_posts_fts"
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+    "USING fts5(caption, ai_summary, tokenize='porter unicode61 remove_diacritics 2')"
+)
+event.listen(InstagramPost.__table__, "after_create", DDL(SQLITE_FTS_DDL).execute_if(dialect="sqlite"))
+
+class UserCategoryStat(Base):
+    """Per-user post counts by drink_category, ai_category and month; maintained on write."""
+    __tablename__ = "user_category_stats"
+
+    username = Column(String(100), primary_key=True)
+    # drink_category | ai_category | month
+    dimension = Column(String(20), primary_key=True)
+    # Kategori adı veya "YYYY-MM"
+    bucket = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserCategoryStat(user={self.username}, {self.dimension}={self.bucket}, count={self.count})>"
+
+class AnalysisCache(Base):
+    """Gemini classification results keyed by caption hash, prompt version and model."""
+    __tablename__ = "analysis_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    prompt_version = Column(String(16), nullable=False, index=True)
+    model_name = Column(String(100), nullable=False)
+
+    ai_category = Column(String(100))
+    ai_summary = Column(Text)
+    drink_category = Column(String(100))
+
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AnalysisCache(key={self.cache_key[:12]}, model={self.model_name})>"
+
+
+class ScanJob(Base):
+    """Durable deep-scan job; claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED."""
+    __tablename__ = "scan_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String(100), nullable=False, index=True)
+    # queued | running | completed | error
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    # full: cursor'dan sona kadar | incremental: en yeni sayfadan bilinen posta kadar
+    mode = Column(String(20), nullable=False, default="full")
+    # İşi kim açtı: api | batch | scheduler (zamanlayıcı bütçesi sadece kendi işlerini sayar)
+    origin = Column(String(20), nullable=False, default="api", server_default=text("'api'"))
+
+    # Sıradaki sayfanın cursor'u; çökmeden sonra tarama buradan devam eder
+    cursor = Column(Text)
+    pages_done = Column(Integer, nullable=False, default=0)
+    posts_done = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+
+    worker_id = Column(String(100))
+    attempts = Column(Integer, nullable=False, default=0)
+    heartbeat_at = Column(DateTime)
+
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # Aynı kullanıcı için aynı anda tek aktif iş
+        Index(
+            "uq_scan_jobs_active_username", "username", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
+    def __repr__(self):
+        return f"<ScanJob(id={self.id}, user={self.username}, status={self.status})>"
+
+
+class ScanBatch(Base):
+    """A list of profiles submitted together through POST /analyze/batch."""
+    __tablename__ = "scan_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<ScanBatch(id={self.id}, total={self.total})>"
+
+
+class ScanBatchItem(Base):
+    """One profile of a batch and the scan job that serves it (may be shared with other requests)."""
+    __tablename__ = "scan_batch_items"
+
+    batch_id = Column(Integer, ForeignKey("scan_batches.id", ondelete="CASCADE"), primary_key=True)
+    username = Column(String(100), primary_key=True)
+    job_id = Column(Integer, ForeignKey("scan_jobs.id"), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ScanBatchItem(batch={self.batch_id}, user={self.username}, job={self.job_id})>"
+
+
+class SyncState(Base):
+    """Per-username high-water mark used by incremental re-scans, and the refresh watchlist."""
+    __tablename__ = "sync_state"
+
+    username = Column(String(100), primary_key=True)
+    newest_instagram_id = Column(String(100))
+    newest_timestamp = Column(DateTime)
+    last_synced_at = Column(DateTime)
+
+    # Zamanlayıcı: izlenen kullanıcılar bayatlık ve talep sırasıyla yenilenir
+    watched = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    # Son senkronizasyondan beri okuma sayısı (mark_synced sıfırlar)
+    views_since_sync = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    last_viewed_at = Column(DateTime)
+    # /posts ve /stats yanıtlarının sürümü: kayıtla aynı transaction'da artar (response_cache)
+    data_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
     def __repr__(self):
-        return f"<Post(id={self.instagram_id}, user={self.username})>"
\ No newline at end of file
+        return f"<SyncState(user={self.username}, newest={self.newest_timestamp})>"
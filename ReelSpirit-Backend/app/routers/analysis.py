@@ -1,15 +1,21 @@
-import asyncio
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
 
 # Proje içi importlar
 import database
 import models
 import schemas
+from config import settings
 from utils import extract_username, setup_logger
 from services.instagram import fetch_instagram_page
-from services.ai_analyzer import analyze_instagram_posts, merge_analysis_with_posts
+from services.ai_analyzer import analyze_instagram_posts, merge_analysis_with_posts, analysis_metrics
+from services.post_store import save_posts_to_db
+from services import job_queue, rate_limit, scheduler, sync_state, telemetry
+from services.events import broker, format_sse
+from services.single_flight import SingleFlight
 
 # Router Tanımlaması
 router = APIRouter(
@@ -19,103 +25,138 @@ router = APIRouter(
 
 logger = setup_logger("Router-Analysis")
 
-# --- GLOBAL DURUM TAKİBİ ---
-# Hangi kullanıcının işlemi ne durumda? (processing, completed, error)
-scan_status: Dict[str, str] = {}
-
-# --- YARDIMCI FONKSİYONLAR ---
-
-def save_posts_to_db(db: Session, final_data: list, username: str):
-    """
-    Analiz edilmiş verileri veritabanına kaydeder (Upsert logic).
-    """
-    saved_count = 0
-    for item in final_data:
-        insta_id = str(item.get('id', ''))
-        
-        # Mükerrer kayıt kontrolü
-        exists = db.query(models.InstagramPost).filter(
-            models.InstagramPost.instagram_id == insta_id
-        ).first()
-        
-        if not exists:
-            new_post = models.InstagramPost(
-                instagram_id=insta_id,
-                permalink=item.get('permalink'),
-                username=username,
-                caption=item.get('caption'),
-                media_type=item.get('media_type'),
-                media_url=item.get('media_url'),
-                post_timestamp=item.get('timestamp'),
-                # AI alanları
-                ai_category=item.get('ai_category', 'General'),
-                ai_summary=item.get('ai_summary', ''),
-                # Varsayılan değer 'Other' olarak güncellendi
-                drink_category=item.get('drink_category', 'Other')
-            )
-            db.add(new_post)
-            saved_count += 1
-    
-    if saved_count > 0:
-        db.commit()
-        logger.info(f"DB: {username} için {saved_count} yeni post kaydedildi.")
-    return saved_count
-
-async def process_remaining_posts_task(username: str, initial_cursor: str):
-    """
-    Arka planda çalışan asenkron görev.
-    Diğer sayfaları tarar ve durumu günceller.
-    """
-    # 1. Durumu 'processing' yap
-    scan_status[username] = "processing"
-    logger.info(f"[BG-TASK] {username} için derinlemesine tarama başladı.")
-    
-    current_cursor = initial_cursor
-    
-    with database.SessionLocal() as db:
-        try:
-            while current_cursor:
-                # Instagram'dan çek
-                posts, next_cursor = await fetch_instagram_page(username, current_cursor)
-                if not posts:
-                    break
-                
-                # AI Analizi
-                ai_results = analyze_instagram_posts(posts)
-                final_data = merge_analysis_with_posts(posts, ai_results)
-                
-                # DB Kayıt
-                save_posts_to_db(db, final_data, username)
-                
-                current_cursor = next_cursor
-                
-                # Rate limit koruması
-                await asyncio.sleep(2)
-                
-        except Exception as e:
-            logger.error(f"[BG-TASK ERROR] {username} hatası: {e}")
-            scan_status[username] = "error"
-        finally:
-            logger.info(f"[BG-TASK] {username} scan completed.")
-            # 2. İşlem bitince durumu 'completed' yap
-            scan_status[username] = "completed"
+# Aynı kullanıcı için eşzamanlı ilk analizler bu süreçte tek bir işte birleşir
+analyze_flight = SingleFlight("analyze")
+
+# --- DURUM EŞLEMESİ ---
+# Frontend üç durum bekler: processing, completed, error
+STATUS_MAP = {
+    "queued": "processing",
+    "running": "processing",
+    "completed": "completed",
+    "error": "error"
+}
 
 # --- ENDPOINTLER ---
 
 @router.get("/status/{username}")
-async def get_scan_status(username: str):
+async def get_scan_status(username: str, db: AsyncSession = Depends(database.get_async_db)):
     """
     Frontend'in sürekli sorduğu (polling) durum endpointi.
     URL: /analyze/status/{username}
+    Durum scan_jobs tablosundan okunur; hangi worker'a düştüğü önemli değildir.
+    """
+    job = await db.run_sync(job_queue.get_latest_job, username)
+    if job is None:
+        has_posts = (await db.execute(
+            select(models.InstagramPost.id).where(models.InstagramPost.username == username).limit(1)
+        )).first() is not None
+        return {"status": "completed" if has_posts else "unknown"}
+
+    return {
+        "status": STATUS_MAP.get(job.status, job.status),
+        "pages_done": job.pages_done,
+        "posts_done": job.posts_done
+    }
+
+@router.get("/breaker")
+def get_breaker_metrics():
+    """
+    Gemini devre kesicisinin durumu, postların hangi katmandan sonuç aldığı,
+    upstream token bucket'larının doluluğu ve birleştirilen analiz istekleri.
+    URL: /analyze/breaker
+    """
+    return {**analysis_metrics(), "rate_limits": rate_limit.snapshot(), "analyze_flight": analyze_flight.snapshot()}
+
+@router.post("/batch", status_code=202)
+async def analyze_batch(
+    request: schemas.BatchAnalysisRequest,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    POST /analyze/batch
+    Çok sayıda profili tek seferde kuyruğa alır ve batch id döner.
+    Profiller dilim dilim (SCAN_SLICE_PAGES) sırayla taranır; büyük bir profil
+    diğerlerini bekletmez. Instagram ve Gemini çağrıları ortak token bucket'lardan geçer.
+    """
+    usernames = [u for u in (extract_username(p) for p in request.usernames) if u]
+    if not usernames:
+        raise HTTPException(status_code=400, detail="No valid usernames")
+    if len(usernames) > settings.BATCH_MAX_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_PROFILES} profiles per batch"
+        )
+
+    batch = await db.run_sync(job_queue.create_batch, usernames)
+    return await db.run_sync(job_queue.get_batch_progress, batch.id)
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Batch'in toplu ilerlemesi (kuyrukta / çalışıyor / bitti / hata) ve profil bazında durum.
+    URL: /analyze/batch/{batch_id}
+    """
+    progress = await db.run_sync(job_queue.get_batch_progress, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+@router.get("/watchlist")
+async def get_watchlist(db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Arka planda yenilenen kullanıcılar, yenilenme sırasıyla (bayatlık x okunma).
+    URL: /analyze/watchlist
+    """
+    return {
+        "budget_remaining": await db.run_sync(scheduler.remaining_budget),
+        "creators": await db.run_sync(scheduler.get_watchlist)
+    }
+
+@router.post("/watchlist")
+async def add_to_watchlist(
+    request: schemas.WatchlistRequest,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    POST /analyze/watchlist
+    Kullanıcıları izleme listesine ekler. Analiz edilen her kullanıcı zaten listededir;
+    hiç taranmamış olanlar bir sonraki turda ilk sırada taranır.
     """
-    status = scan_status.get(username, "unknown")
-    return {"status": status}
+    usernames = [u for u in (extract_username(p) for p in request.usernames) if u]
+    if not usernames:
+        raise HTTPException(status_code=400, detail="No valid usernames")
+    return {"added": await db.run_sync(scheduler.watch, usernames)}
+
+@router.delete("/watchlist/{username}")
+async def remove_from_watchlist(username: str, db: AsyncSession = Depends(database.get_async_db)):
+    """Kullanıcıyı arka plan yenilemesinden çıkarır (verileri silinmez)."""
+    if not await db.run_sync(scheduler.unwatch, username):
+        raise HTTPException(status_code=404, detail="Not on the watchlist")
+    return {"removed": username}
+
+@router.get("/stream/{username}")
+async def stream_scan_events(username: str):
+    """
+    Polling yerine Server-Sent Events ile ilerleme akışı.
+    URL: /analyze/stream/{username}
+    Olaylar: page_fetched, posts_analyzed, posts_saved, progress, completed, error
+    Aynı kullanıcıyı izleyen tüm bağlantılar tek bir kaynaktan beslenir.
+    """
+    async def event_source():
+        async for event in broker.subscribe(username):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("", response_model=List[schemas.PostResponse])
 async def analyze_profile(
-    request: schemas.AnalysisRequest, 
-    background_tasks: BackgroundTasks, 
-    db: Session = Depends(database.get_db)
+    request: schemas.AnalysisRequest,
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     POST /analyze
@@ -127,45 +168,77 @@ async def analyze_profile(
 
     # 1. DB Kontrolü (Cache)
     # Eğer işlem daha önce tamamlanmışsa ve veri varsa direkt dön
-    existing_posts = db.query(models.InstagramPost).filter(
-        models.InstagramPost.username == username
-    ).order_by(models.InstagramPost.post_timestamp.desc()).limit(50).all()
-
-    # Eğer veri varsa ve şu an bir tarama işlemi yoksa cache'den dön
-    # (Eğer tarama devam ediyorsa completed demiyoruz, kullanıcı beklesin istiyoruz)
-    if existing_posts and scan_status.get(username) != "processing":
-        logger.info(f"{username} verileri veritabanından getirildi.")
-        # Durumu completed olarak işaretle ki frontend hemen durabilsin
-        scan_status[username] = "completed" 
+    existing_posts = (await db.execute(
+        select(models.InstagramPost)
+        .where(models.InstagramPost.username == username)
+        .order_by(models.InstagramPost.post_timestamp.desc().nullslast(), models.InstagramPost.id.desc())
+        .limit(50)
+    )).scalars().all()
+
+    # Veri varsa cache'den dön. Tarama devam ediyorsa status endpoint'i
+    # 'processing' döner ve frontend beklemeye devam eder.
+    if existing_posts:
+        if request.refresh:
+            # Sadece son senkronizasyondan sonraki postlar çekilir ve analiz edilir
+            await db.run_sync(job_queue.enqueue_scan, username, None, mode="incremental")
+            logger.info(f"{username} için artımlı tarama istendi.")
+        else:
+            logger.info(f"{username} verileri veritabanından getirildi.")
         return existing_posts
 
-    # 2. Canlı Analiz Başlatılıyor
-    logger.info(f"{username} için yeni analiz başlatılıyor...")
-    
-    # Durumu 'processing' olarak işaretle
-    scan_status[username] = "processing"
-
-    raw_posts, next_cursor = await fetch_instagram_page(username)
-    
-    if not raw_posts:
-        # Hata durumunda statüyü temizle veya error yap
-        scan_status[username] = "error"
-        raise HTTPException(status_code=404, detail="Profile not found or no posts.")
-
-    # İlk sayfa analizi
-    ai_results = analyze_instagram_posts(raw_posts)
-    final_data = merge_analysis_with_posts(raw_posts, ai_results)
-    
-    save_posts_to_db(db, final_data, username)
-
-    # 3. Kalan Sayfalar İçin Arka Plan Görevi
-    if next_cursor:
-        background_tasks.add_task(process_remaining_posts_task, username, next_cursor)
-    else:
-        # Eğer başka sayfa yoksa işlem hemen bitmiştir
-        scan_status[username] = "completed"
-    
-    # İlk 25 postu dön
-    return db.query(models.InstagramPost).filter(
-        models.InstagramPost.username == username
-    ).order_by(models.InstagramPost.post_timestamp.desc()).all()
\ No newline at end of file
+    # 2. Canlı Analiz: aynı kullanıcı için eşzamanlı istekler tek bir işi bekler.
+    # Beklerken bağlantı tutulmasın diye isteğin session'ı havuza geri verilir.
+    await db.close()
+    return await analyze_flight.do(username, lambda: _analyze_first_page(username))
+
+async def _latest_posts(db: AsyncSession, username: str, limit: int) -> List[schemas.PostResponse]:
+    posts = (await db.execute(
+        select(models.InstagramPost)
+        .where(models.InstagramPost.username == username)
+        .order_by(models.InstagramPost.post_timestamp.desc().nullslast(), models.InstagramPost.id.desc())
+        .limit(limit)
+    )).scalars().all()
+    return [schemas.PostResponse.model_validate(post) for post in posts]
+
+async def _analyze_first_page(username: str) -> List[schemas.PostResponse]:
+    """
+    Fetches, analyzes and saves the first page, then queues the rest.
+    Shared by every request that joined the same flight, so it opens its own session
+    instead of using the (possibly already closed) session of the first request.
+    """
+    # Diğer worker'lar aynı kullanıcıyı işliyorsa bitmesi beklenir.
+    # Fetch ve model çağrısı saniyeler sürer; bu sırada havuzdan bağlantı tutulmaz,
+    # yalnızca kısa okuma ve kayıt için oturum açılır.
+    async with database.advisory_lock(f"analyze:{username}"):
+        async with database.AsyncSessionLocal() as db:
+            existing_posts = await _latest_posts(db, username, 25)
+        if existing_posts:
+            logger.info(f"{username} başka bir worker tarafından analiz edildi; kayıtlar dönülüyor.")
+            return existing_posts
+
+        logger.info(f"{username} için yeni analiz başlatılıyor...")
+
+        # Aşamalar (fetch / analiz / kayıt) ayrı span olarak izlenir
+        with telemetry.span("analyze_profile", username=username):
+            raw_posts, next_cursor = await fetch_instagram_page(username)
+
+            if not raw_posts:
+                raise HTTPException(status_code=404, detail="Profile not found or no posts.")
+
+            # İlk sayfa analizi
+            with telemetry.span("analyze_profile.analyze", posts=len(raw_posts)):
+                ai_results = await analyze_instagram_posts(raw_posts)
+                final_data = merge_analysis_with_posts(raw_posts, ai_results)
+
+            async with database.AsyncSessionLocal() as db:
+                # Senkron kayıt servisi async sürücü üzerinde çalışır (event loop bloklanmaz)
+                await db.run_sync(save_posts_to_db, final_data, username)
+
+                # 3. Kalan Sayfalar İçin Kalıcı Tarama İşi (herhangi bir worker alabilir)
+                if next_cursor:
+                    await db.run_sync(job_queue.enqueue_scan, username, next_cursor)
+                else:
+                    await db.run_sync(sync_state.mark_synced, username)
+
+                # İlk 25 postu dön (geri kalanı /posts üzerinden sayfa sayfa alınır)
+                return await _latest_posts(db, username, 25)
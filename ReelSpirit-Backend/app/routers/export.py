@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+# Proje içi importlar
+import database
+import models
+from config import settings
+from utils import setup_logger, parse_timestamp
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+logger = setup_logger("Router-Export")
+
+EXPORT_FIELDS = (
+    "instagram_id", "username", "caption", "media_type", "media_url", "permalink",
+    "post_timestamp", "ai_category", "ai_summary", "drink_category"
+)
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Yanıta yazılmadan önce biriktirilen en fazla byte
+_FLUSH_BYTES = 64 * 1024
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    True if the Accept-Encoding header allows gzip with a non-zero q-value.
+    'gzip;q=0' refuses it; '*' covers gzip unless gzip is listed explicitly.
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in weights:
+            return weights[coding] > 0
+    return False
+
+def _build_query(
+    username: Optional[str],
+    drink_category: Optional[str],
+    ai_category: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime]
+):
+    Post = models.InstagramPost
+    query = select(*(getattr(Post, f) for f in EXPORT_FIELDS))
+    if username:
+        # (username, post_timestamp DESC, id DESC) indeksi sırayı hazır verir
+        query = query.where(Post.username == username).order_by(
+            Post.post_timestamp.desc().nullslast(), Post.id.desc()
+        )
+    else:
+        query = query.order_by(Post.id)
+
+    if drink_category:
+        query = query.where(Post.drink_category == drink_category)
+    if ai_category:
+        query = query.where(Post.ai_category == ai_category)
+    if since:
+        query = query.where(Post.post_timestamp >= since)
+    if until:
+        query = query.where(Post.post_timestamp < until)
+
+    # Sunucu tarafı cursor: satırlar EXPORT_BATCH_SIZE'lık parçalar halinde gelir
+    return query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+def _encode_ndjson(row) -> str:
+    record = dict(zip(EXPORT_FIELDS, row))
+    if record["post_timestamp"] is not None:
+        record["post_timestamp"] = record["post_timestamp"].isoformat()
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+async def _stream_rows(query, fmt: str) -> AsyncIterator[str]:
+    """Yields text chunks of about _FLUSH_BYTES; only one DB batch is held in memory."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    exported = 0
+    # Yanıt akarken dependency'nin session'ı kapanmış olur; akış kendi session'ını açar
+    async with database.AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for row in result:
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(_encode_ndjson(row))
+            exported += 1
+
+            if buffer.tell() >= _FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+    logger.info(f"Export tamamlandı: {exported} satır ({fmt}).")
+
+async def _encode(chunks: AsyncIterator[str], compress: bool) -> AsyncIterator[bytes]:
+    if not compress:
+        async for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+
+    # wbits=31 -> gzip başlığı; akış boyunca tek bir compressor
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _export_response(
+    request: Request,
+    username: Optional[str],
+    fmt: str,
+    drink_category: Optional[str],
+    ai_category: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> StreamingResponse:
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    if since and until and parse_timestamp(since) >= parse_timestamp(until):
+        raise HTTPException(status_code=400, detail="'since' must be earlier than 'until'")
+
+    # Zaman dilimli girişler DB'deki naive UTC değerlerle karşılaştırılabilsin
+    query = _build_query(username, drink_category, ai_category, parse_timestamp(since), parse_timestamp(until))
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
+
+    filename = f"{username or 'all-users'}-posts.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        _encode(_stream_rows(query, fmt), compress),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers
+    )
+
+@router.get("")
+async def export_all_posts(
+    request: Request,
+    format: str = Query("ndjson"),
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Tüm kullanıcıların postlarını NDJSON veya CSV olarak akıtır.
+    URL: /export?format=csv&drink_category=Gin&since=2024-01-01
+    Accept-Encoding: gzip gönderilirse yanıt sıkıştırılarak akar.
+    """
+    return _export_response(request, None, format, drink_category, ai_category, since, until)
+
+@router.get("/{username}")
+async def export_user_posts(
+    username: str,
+    request: Request,
+    format: str = Query("ndjson"),
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Bir kullanıcının tüm analiz edilmiş postlarını (yeniden eskiye) akıtır.
+    Satırlar sunucu tarafı cursor ile parça parça okunur; bellek kullanımı satır sayısından bağımsızdır.
+    """
+    return _export_response(request, username, format, drink_category, ai_category, since, until)
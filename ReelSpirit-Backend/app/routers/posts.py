@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+import base64
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from typing import List, Optional
 
 # Proje içi importlar
 import database
 import models
 import schemas
+from config import settings
+from services import category_stats, response_cache, scheduler
 from utils import setup_logger
 
 # Router Tanımlaması
@@ -17,52 +21,171 @@ router = APIRouter(
 
 logger = setup_logger("Router-Posts")
 
-@router.get("/posts/{username}", response_model=List[schemas.PostResponse])
-def get_user_posts(username: str, db: Session = Depends(database.get_db)):
+# --- SAYFALAMA YARDIMCILARI ---
+
+# Projeksiyonda istenebilecek alanlar (PostResponse ile aynı)
+POST_FIELDS = list(schemas.PostResponse.model_fields)
+
+def _encode_cursor(post_timestamp: Optional[datetime], row_id: int) -> str:
+    """Opaque keyset cursor: base64("<timestamp|null>|<id>")."""
+    ts = post_timestamp.isoformat() if post_timestamp else "null"
+    return base64.urlsafe_b64encode(f"{ts}|{row_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        ts, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return (None if ts == "null" else datetime.fromisoformat(ts)), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return POST_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in POST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def _page_query(
+    username: str,
+    selected: List[str],
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None
+):
+    """Base /posts SELECT: the requested columns plus id and timestamp for the cursor."""
+    Post = models.InstagramPost
+    # ORM nesnesi yerine sadece istenen kolonlar (+ cursor için timestamp/id) çekilir
+    columns = [getattr(Post, f) for f in selected if f not in ("post_timestamp",)]
+    query = select(Post.id.label("_row_id"), Post.post_timestamp, *columns).where(
+        Post.username == username
+    )
+    if drink_category:
+        query = query.where(Post.drink_category == drink_category)
+    if ai_category:
+        query = query.where(Post.ai_category == ai_category)
+    return query
+
+def _dated_page(query, cursor_key, limit: int):
+    """One keyset page of dated posts, newest first; fetches limit + 1 rows to detect a next page."""
+    Post = models.InstagramPost
+    dated = query.where(Post.post_timestamp.isnot(None))
+    if cursor_key:
+        # Satır karşılaştırması (ts, id) < (:ts, :id): indeks üzerinde tek aralık taraması
+        dated = dated.where(tuple_(Post.post_timestamp, Post.id) < cursor_key)
+    return dated.order_by(Post.post_timestamp.desc().nullslast(), Post.id.desc()).limit(limit + 1)
+
+def _undated_page(query, before_id: Optional[int], limit: int):
+    """Posts without a timestamp come last, ordered by id alone."""
+    Post = models.InstagramPost
+    undated = query.where(Post.post_timestamp.is_(None))
+    if before_id is not None:
+        undated = undated.where(Post.id < before_id)
+    return undated.order_by(Post.id.desc()).limit(limit + 1)
+
+# Yanıt önbellekten hazır JSON olarak döner; şema yalnızca dokümantasyon için (doğrulama yok)
+@router.get("/posts/{username}", responses={200: {"model": List[schemas.PostResponse]}})
+async def get_user_posts(
+    username: str,
+    request: Request,
+    limit: int = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db)
+):
     """
-    Kullanıcının veritabanındaki tüm analiz edilmiş postlarını getirir.
+    Kullanıcının analiz edilmiş postlarını sayfa sayfa getirir (yeniden eskiye).
+    - limit: sayfa boyutu, cursor: önceki yanıtın X-Next-Cursor başlığı
+    - fields: virgülle ayrılmış alan listesi (örn. instagram_id,drink_category)
+    - drink_category / ai_category: filtreler
+    Sıralama (post_timestamp, id) üzerinden keyset ile yapılır; OFFSET kullanılmaz.
     """
-    posts = db.query(models.InstagramPost).filter(
-        models.InstagramPost.username == username
-    ).order_by(models.InstagramPost.post_timestamp.desc()).all()
-    
-    if not posts:
-        # Boş liste dönebiliriz veya 404 verebiliriz, Frontend yapısına göre değişir.
-        # Genelde boş liste dönmek daha güvenlidir.
-        return []
-        
-    return posts
+    limit = min(limit or settings.POSTS_PAGE_SIZE, settings.POSTS_MAX_PAGE_SIZE)
+    selected = _parse_fields(fields)
+    cursor_key = _decode_cursor(cursor) if cursor else None
+
+    async def build():
+        query = _page_query(username, selected, drink_category, ai_category)
+
+        if cursor_key and cursor_key[0] is None:
+            rows = (await db.execute(_undated_page(query, cursor_key[1], limit))).all()
+        else:
+            rows = (await db.execute(_dated_page(query, cursor_key, limit))).all()
+            if len(rows) <= limit:
+                # Tarihli postlar bitti; sayfa tarihsiz olanlarla tamamlanır (ayrı bir aralık taraması)
+                rows += (await db.execute(_undated_page(query, None, limit - len(rows)))).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        posts = [{f: getattr(row, f) for f in selected} for row in rows]
+
+        headers = {}
+        if has_more:
+            last = rows[-1]
+            next_cursor = _encode_cursor(last.post_timestamp, last._row_id)
+            headers["X-Next-Cursor"] = next_cursor
+            next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+
+        return posts, headers
+
+    # Aynı sürümde tekrar eden istekler önbellekten (veya 304 ile) döner
+    return await response_cache.cached_json(request, username, build)
 
 @router.get("/stats/{username}")
-def get_drink_stats(username: str, db: Session = Depends(database.get_db)):
+async def get_drink_stats(
+    username: str,
+    request: Request,
+    view: bool = False,
+    db: AsyncSession = Depends(database.get_async_db)
+):
     """
     Angular frontend için gerekli istatistik verisini döner.
-    Format: { total_posts: 50, categories: [{category: 'Viski', count: 10}, ...] }
+    Format: { total_posts: 50, categories: [{drink_category: 'Viski', count: 10}, ...],
+              ai_categories: [...], months: [...] }
+    Kayıt sırasında güncellenen user_category_stats tablosundan okunur (GROUP BY yok).
+    view=true: dashboard'un ilk açılışı; zamanlayıcı önceliği için bir okuma sayılır
+    (sayfalama, filtre ve tarama sonrası yenilemeler sayılmaz).
     """
-    # Kategori bazlı gruplama sorgusu
-    stats_query = db.query(
-        models.InstagramPost.drink_category,
-        func.count(models.InstagramPost.id).label('count')
-    ).filter(
-        models.InstagramPost.username == username
-    ).group_by(
-        models.InstagramPost.drink_category
-    ).all()
-    
-    if not stats_query:
-        return {"username": username, "total_posts": 0, "categories": []}
-    
-    # Toplam post sayısını hesapla
-    total_posts = sum(s.count for s in stats_query)
-    
-    # Frontend'in beklediği JSON formatına çevir
-    categories_data = [
-        {"drink_category": s.drink_category, "count": s.count} 
-        for s in stats_query
-    ]
-    
-    return {
-        "username": username,
-        "total_posts": total_posts,
-        "categories": categories_data
-    }
\ No newline at end of file
+    if view:
+        scheduler.record_view(username)
+    async def build():
+        # Servis fonksiyonları senkron Session bekler; run_sync onları async sürücü üzerinde çalıştırır
+        stats = await db.run_sync(category_stats.get_stats, username)
+
+        if not stats["drink_category"]:
+            # Eski veriler için tek seferlik backfill (tabloda kayıt yoksa)
+            has_posts = (await db.execute(
+                select(models.InstagramPost.id).where(models.InstagramPost.username == username).limit(1)
+            )).first() is not None
+            if not has_posts:
+                return {"username": username, "total_posts": 0, "categories": []}, {}
+            await db.run_sync(category_stats.rebuild, username)
+            stats = await db.run_sync(category_stats.get_stats, username)
+
+        # Toplam post sayısını hesapla
+        total_posts = sum(s["count"] for s in stats["drink_category"])
+
+        # Frontend'in beklediği JSON formatına çevir
+        categories_data = [
+            {"drink_category": s["bucket"], "count": s["count"]}
+            for s in stats["drink_category"]
+        ]
+
+        return {
+            "username": username,
+            "total_posts": total_posts,
+            "categories": categories_data,
+            "ai_categories": [
+                {"ai_category": s["bucket"], "count": s["count"]} for s in stats["ai_category"]
+            ],
+            "months": sorted(
+                ({"month": s["bucket"], "count": s["count"]} for s in stats["month"]),
+                key=lambda m: m["month"]
+            )
+        }, {}
+
+    return await response_cache.cached_json(request, username, build)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+# Proje içi importlar
+import database
+from config import settings
+from services import search_index
+from utils import setup_logger
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+logger = setup_logger("Router-Search")
+
+@router.get("")
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    username: Optional[str] = None,
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None,
+    limit: int = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Tüm kullanıcıların caption + AI özetleri içinde tam metin arama.
+    URL: /search?q=vodka cocktails with espresso&drink_category=Vodka
+    Sonuçlar alaka sırasıyla döner; facets alanı tüm eşleşmeler için
+    drink_category / ai_category / username sayımlarını içerir.
+    PostgreSQL'de tsvector + GIN, SQLite'ta FTS5 indeksi kullanılır.
+    """
+    limit = min(limit or settings.SEARCH_PAGE_SIZE, settings.SEARCH_MAX_PAGE_SIZE)
+    return await db.run_sync(
+        search_index.search, q,
+        username=username,
+        drink_category=drink_category,
+        ai_category=ai_category,
+        limit=limit,
+        offset=offset
+    )
@@ -1,9 +1,19 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class AnalysisRequest(BaseModel):
     instagram_url: str
+    # True ise mevcut veriler dönülür ve sadece yeni postlar için artımlı tarama başlatılır
+    refresh: bool = False
+
+class BatchAnalysisRequest(BaseModel):
+    # Kullanıcı adları (Instagram URL'leri de kabul edilir)
+    usernames: List[str]
+
+class WatchlistRequest(BaseModel):
+    # Arka planda düzenli yenilenecek kullanıcı adları (URL de olabilir)
+    usernames: List[str]
 
 class PostResponse(BaseModel):
     instagram_id: str
@@ -1,8 +1,15 @@
+import asyncio
+import hashlib
 import json
 import re
-from google import genai
-from google.genai import types
+import time
+from collections import Counter
+from typing import Dict, List, Optional
 from config import settings
+from services import analysis_cache, categories, media_cache, telemetry
+from services.circuit_breaker import gemini_breaker
+from services.rate_limit import gemini_bucket
+from services.keyword_classifier import classify_captions, classify_with_confidence
 from utils import setup_logger
 
 logger = setup_logger(__name__)
@@ -13,23 +20,116 @@ You are an expert Instagram content analyst. Your task is to analyze the given p
 Respond in JSON format, strictly adhering to the rules below.
 
 **TASKS:**
-1. 'category': Content type (Gastronomy, Fashion, Sports, Nightlife, Travel, Art, etc.)
+1. 'category': Content type. Use exactly one of: {ai_labels}.
 2. 'summary': Summary of the content in ENGLISH (max 10 words).
 3. 'drink_category': If there is an alcoholic beverage, specify its type accurately.
 
 **DRINK_CATEGORY RULES:**
-- Single Spirit: "Whiskey", "Gin", "Rum", "Vodka", "Tequila", "Beer", "Wine", "Raki".
-- Cocktails (Dominant Spirit): "Whiskey Cocktail", "Gin Cocktail", "Rum Cocktail", "Vodka Cocktail", "Tequila Cocktail".
+- Single Spirit: {spirits}.
+- Cocktails (Dominant Spirit): {cocktails}.
 - Cocktails (Mix/Ambiguous): "Mixed Cocktail".
 - Coffee + Alcohol: "Coffee Cocktail".
-- Liqueur based: "Liqueur Cocktail".
 - No alcohol or unclear: "Other".
 
 **IMPORTANT:** - Look for keywords in the text like 'cl', 'oz', 'recipe', 'mix'.
+- 'category' and 'drink_category' must be copied exactly from the lists above; never invent a new value.
 - Return ONLY a valid JSON list.
+""".format(
+    ai_labels=", ".join(categories.AI_CATEGORIES),
+    spirits=", ".join(f'"{spirit}"' for spirit in categories.SPIRITS),
+    cocktails=", ".join(f'"{spirit} Cocktail"' for spirit in categories.SPIRITS)
+)
+
+# Görsel katman: her DATA öğesinden sonra o postun görseli gelir
+MEDIA_PROMPT = ANALYSIS_PROMPT + """
+**IMAGES:** The captions of these posts are missing or too short. Each DATA item is followed
+by a "proxy_id: ..." line and the post's image; classify from what is visible
+(bottles, labels, glasses, garnish). Keep the same JSON fields and proxy_id values.
 """
 
-client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+# Prompt değişince önbellek anahtarları da değişir
+PROMPT_VERSION = hashlib.sha256(ANALYSIS_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# İlk çağrıda oluşturulur; anahtar olmadan da modül import edilebilir (test/benchmark).
+# google.genai de burada yüklenir (~0.5s import), uygulama açılışında değil.
+_client = None
+
+def _genai_types():
+    from google.genai import types
+    return types
+
+def get_genai_client():
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+    return _client
+
+def set_genai_client(client):
+    """Replaces the Gemini client (e.g. with bench.replay.FakeGemini); None restores the real one."""
+    global _client
+    _client = client
+
+# Event loop içinde ilk kullanımda oluşturulur
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+_cache_checked = False
+
+# Postların hangi katmandan sonuç aldığı (metrik): cache, local (güvenli yerel sınıflandırma),
+# model, fallback; breaker_skipped = devre açıkken modele hiç gönderilmeyenler
+tier_counts: Counter = Counter()
+
+def _count_tier(tier: str, count: int):
+    if count:
+        tier_counts[tier] += count
+        telemetry.ANALYSIS_POSTS.labels(tier).inc(count)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _gemini_semaphore
+    if _gemini_semaphore is None:
+        _gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+    return _gemini_semaphore
+
+async def _generate(prompt) -> Optional[str]:
+    """
+    Sends one prompt (text, or a list of text and image parts) through the SDK's async surface,
+    bounded by GEMINI_TIMEOUT so the event loop never blocks. Callers hold a rate-limit token
+    and a GEMINI_MAX_CONCURRENCY slot (_call_model).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with telemetry.span("gemini.generate", model=settings.GEMINI_MODEL) as current:
+            response = await asyncio.wait_for(
+                get_genai_client().aio.models.generate_content(
+                    model=settings.GEMINI_MODEL,
+                    contents=prompt,
+                    config=_genai_types().GenerateContentConfig(
+                        response_mime_type='application/json',
+                        temperature=0.3
+                    )
+                ),
+                timeout=settings.GEMINI_TIMEOUT
+            )
+            _record_usage(response, current)
+        outcome = "ok"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    finally:
+        telemetry.GEMINI_CALL_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+    return response.text
+
+def _record_usage(response, current_span):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, value in (
+        ("prompt", usage.prompt_token_count),
+        ("response", usage.candidates_token_count)
+    ):
+        if value:
+            telemetry.GEMINI_TOKENS.labels(kind).observe(value)
+            telemetry.set_span_attribute(current_span, f"tokens.{kind}", value)
 
 def clean_caption(text):
     """Cleans up the caption text."""
@@ -41,145 +141,335 @@ def clean_caption(text):
     # Remove excessive whitespace
     return " ".join(text.split())[:1000]
 
-def analyze_instagram_posts(posts_data):
-    """Analyzes posts using Gemini AI."""
-    if not posts_data:
-        return []
+# --- TOKEN BÜTÇELİ BATCH MOTORU ---
 
-    logger.info(f"{len(posts_data)} posts are being prepared for analysis...")
+# Kaba tahmin: 1 token ~ 4 karakter. Öğe başına JSON sarmalayıcısı + yanıt payı eklenir.
+_CHARS_PER_TOKEN = 4
+_ITEM_OVERHEAD_TOKENS = 40
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate of one DATA item, including its share of the response."""
+    return len(text) // _CHARS_PER_TOKEN + _ITEM_OVERHEAD_TOKENS
+
+def pack_batches(items: List[dict], token_budget: int, max_items: int) -> List[List[dict]]:
+    """Greedily packs items, in order, into batches that fit the token budget."""
+    batches = []
+    current = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item["text"])
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def _breaker_allows() -> bool:
+    return not settings.GEMINI_BREAKER_ENABLED or gemini_breaker.allow_request()
+
+def analysis_metrics() -> dict:
+    """Breaker state plus how many posts bypassed the model, and why."""
+    return {
+        "breaker": gemini_breaker.snapshot(),
+        "breaker_enabled": settings.GEMINI_BREAKER_ENABLED,
+        "local_confidence_threshold": settings.LOCAL_CONFIDENCE_THRESHOLD,
+        "media_cache": media_cache.get_cache().snapshot() if settings.MEDIA_ANALYSIS_ENABLED else None,
+        "posts": dict(tier_counts)
+    }
 
+async def _run_batch(batch: List[dict]) -> Dict[str, dict]:
+    """Sends one batch; returns {proxy_id: result} for the items the model answered."""
+    full_prompt = f"{ANALYSIS_PROMPT}\n\nDATA:\n{json.dumps(batch, ensure_ascii=False)}"
+    return await _call_model(full_prompt, {item["proxy_id"] for item in batch})
+
+async def _run_media_batch(batch: List[dict]) -> Dict[str, dict]:
+    """Like _run_batch, with every item's image attached after its proxy_id."""
+    data = [{"proxy_id": item["proxy_id"], "text": item["text"]} for item in batch]
+    contents = [f"{MEDIA_PROMPT}\n\nDATA:\n{json.dumps(data, ensure_ascii=False)}"]
+    for item in batch:
+        image, mime_type = item["image"]
+        contents.append(f"proxy_id: {item['proxy_id']}")
+        contents.append(_genai_types().Part.from_bytes(data=image, mime_type=mime_type))
+    return await _call_model(contents, {item["proxy_id"] for item in batch})
+
+async def _call_model(prompt, wanted) -> Dict[str, dict]:
+    """Runs one model call through the circuit breaker and keeps answers for the wanted proxy_ids."""
+    try:
+        await gemini_bucket.acquire()
+        async with _get_semaphore():
+            # Süre kuyrukta beklendikten sonra başlar: sıra beklemek yavaş çağrı sayılmaz
+            started = time.perf_counter()
+            try:
+                response_text = await _generate(prompt)
+
+                if not response_text:
+                    raise ValueError("Gemini returned blank response.")
+
+                ai_data = json.loads(response_text)
+            except Exception:
+                # Zaman aşımı, API hatası ve bozuk JSON devre kesici için hata sayılır
+                gemini_breaker.record_failure(time.perf_counter() - started)
+                raise
+            gemini_breaker.record_success(time.perf_counter() - started)
+    except asyncio.CancelledError:
+        # İptal bir sonuç değildir; yarım açık devrede deneme hakkı geri verilir
+        gemini_breaker.release_probe()
+        raise
+
+    # Handle dict vs list response formats
+    ai_list = ai_data if isinstance(ai_data, list) else ai_data.get("results", [])
+
+    answered = {}
+    for res in ai_list:
+        if not isinstance(res, dict):
+            continue
+        p_id = res.get("proxy_id")
+        if p_id in wanted:
+            answered[p_id] = {
+                "category": res.get("category", "General"),
+                "summary": res.get("summary", "No summary available."),
+                "drink_category": res.get("drink_category", "Other")
+            }
+    return answered
+
+async def _analyze_with_model(posts_data, texts):
+    """
+    Packs posts into token-budgeted batches and runs them concurrently.
+    Items the model silently dropped are re-submitted (and only those).
+    Returns (results, indexes of posts that still have no answer).
+    """
     id_map = {}
-    analysis_input = []
-    
+    items = []
+
     for index, post in enumerate(posts_data):
         real_id = str(post.get("id") or post.get("instagram_id") or f"UNKNOWN_{index}")
         proxy_id = f"REF_{index}"
-        id_map[proxy_id] = real_id
-        
-        cleaned_text = clean_caption(post.get("caption", ""))
-        if not cleaned_text:
-            cleaned_text = "No text, media only."
-        
-        analysis_input.append({
+        id_map[proxy_id] = (index, real_id)
+
+        items.append({
             "proxy_id": proxy_id,
-            "text": cleaned_text
+            "text": texts[index] or "No text, media only."
         })
 
-    full_prompt = f"{ANALYSIS_PROMPT}\n\nDATA:\n{json.dumps(analysis_input, ensure_ascii=False)}"
+    answered: Dict[str, dict] = {}
+    pending = items
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                temperature=0.3
-            )
-        )
+    for attempt in range(settings.GEMINI_MAX_RESUBMITS + 1):
+        batches = pack_batches(pending, settings.GEMINI_BATCH_TOKEN_BUDGET, settings.GEMINI_BATCH_MAX_ITEMS)
+        # Devre açıkken istek hiç gönderilmez; bu öğeler doğrudan fallback'e düşer
+        allowed = [batch for batch in batches if _breaker_allows()]
+        skipped = sum(len(batch) for batch in batches) - sum(len(batch) for batch in allowed)
+        if skipped:
+            _count_tier("breaker_skipped", skipped)
+            logger.warning(f"Gemini circuit is {gemini_breaker.state}: {skipped} items skip the model.")
+        outcomes = await asyncio.gather(*(_run_batch(batch) for batch in allowed), return_exceptions=True)
 
-        if not response.text:
-            logger.warning("Gemini returned blank response. Switching to fallback.")
-            return create_fallback_analysis(posts_data)
-
-        ai_data = json.loads(response.text)
-        
-        # Handle dict vs list response formats
-        ai_list = ai_data if isinstance(ai_data, list) else ai_data.get("results", [])
-
-        final_results = []
-        for res in ai_list:
-            p_id = res.get("proxy_id")
-            if p_id and p_id in id_map:
-                final_results.append({
-                    "id": id_map[p_id],
-                    "category": res.get("category", "General"),
-                    "summary": res.get("summary", "No summary available."),
-                    "drink_category": res.get("drink_category", "Other")
-                })
-        
-        logger.info(f"AI analysis completed: {len(final_results)} items processed.")
-        return final_results
-
-    except Exception as e:
-        logger.error(f"Gemini API Error: {e}")
-        return create_fallback_analysis(posts_data)
+        dropped = []
+        for batch, outcome in zip(allowed, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                logger.error(f"Gemini call timed out after {settings.GEMINI_TIMEOUT}s ({len(batch)} items).")
+                continue
+            if isinstance(outcome, BaseException):
+                logger.error(f"Gemini API Error: {outcome}")
+                continue
+            answered.update(outcome)
+            dropped.extend(item for item in batch if item["proxy_id"] not in outcome)
 
-def create_fallback_analysis(posts_data):
+        if not dropped:
+            break
+        if attempt < settings.GEMINI_MAX_RESUBMITS:
+            logger.warning(f"Gemini dropped {len(dropped)} items, re-submitting them.")
+        pending = dropped
+
+    results = [
+        {"id": id_map[p_id][1], **res} for p_id, res in answered.items()
+    ]
+    unanswered = [index for p_id, (index, _) in id_map.items() if p_id not in answered]
+    return results, unanswered
+
+async def analyze_instagram_posts(posts_data):
     """
-    Fallback method: Regex-based analysis when AI fails.
-    Updated with comprehensive English keywords.
+    Analyzes posts using Gemini AI. Captions already in the result cache skip the model.
+    With MEDIA_ANALYSIS_ENABLED, posts the caption could not classify get a second, image-based pass.
     """
-    logger.info("Running fallback analysis (Regex/Keyword based)...")
-    results = []
-    
-    # --- DÜZELTME 2: Keyword listesi İngilizce varyasyonlarla zenginleştirildi ---
-    keywords = {
-        "Whiskey": ["viski", "whiskey", "whisky", "bourbon", "scotch", "jack daniels", "jameson"],
-        "Gin": ["cin", "gin", "tanqueray", "gordon", "hendricks", "beefeater"],
-        "Rum": ["rom", "rum", "bacardi", "havana club", "captain morgan"],
-        "Vodka": ["votka", "vodka", "absolut", "smirnoff", "grey goose"],
-        "Tequila": ["tekila", "tequila", "patron", "olmeca"],
-        "Beer": ["bira", "beer", "lager", "ale", "ipa", "stout"],
-        "Wine": ["şarap", "wine", "merlot", "cabernet", "chardonnay"],
-        "Raki": ["rakı", "raki", "yeni rakı"],
-        "Liqueur": ["likör", "liqueur", "baileys", "kahlua", "jagermeister", "cointreau"],
-        "Coffee Cocktail": ["espresso martini", "irish coffee"]
+    results = await _analyze_captions(posts_data)
+    if settings.MEDIA_ANALYSIS_ENABLED and results:
+        results = await _refine_with_media(posts_data, results)
+    return results
+
+async def _analyze_captions(posts_data):
+    global _cache_checked
+    if not posts_data:
+        return []
+
+    logger.info(f"{len(posts_data)} posts are being prepared for analysis...")
+
+    if not _cache_checked:
+        # Prompt değiştiyse eski sürümün sonuçlarını temizle
+        _cache_checked = True
+        await asyncio.to_thread(analysis_cache.invalidate, PROMPT_VERSION)
+
+    texts = [clean_caption(post.get("caption", "")) for post in posts_data]
+    # Boş caption'lar önbelleğe alınmaz (hepsi aynı anahtara düşerdi)
+    keys = [
+        analysis_cache.make_key(text, PROMPT_VERSION, settings.GEMINI_MODEL) if text else None
+        for text in texts
+    ]
+
+    cached = await asyncio.to_thread(analysis_cache.get_many, [k for k in keys if k])
+
+    final_results = []
+    miss_indexes = []
+    for index, post in enumerate(posts_data):
+        if keys[index] in cached:
+            real_id = str(post.get("id") or post.get("instagram_id") or f"UNKNOWN_{index}")
+            final_results.append({"id": real_id, **cached[keys[index]]})
+        else:
+            miss_indexes.append(index)
+
+    _count_tier("cache", len(final_results))
+
+    # Yerel katman: anahtar kelimelerle net sınıflanan postlar LLM'e hiç gitmez
+    local_results = []
+    threshold = settings.LOCAL_CONFIDENCE_THRESHOLD
+    if threshold is not None and miss_indexes:
+        remaining = []
+        for index in miss_indexes:
+            post = posts_data[index]
+            result, confidence = classify_with_confidence(post.get("caption"))
+            if confidence >= threshold:
+                local_results.append({"id": str(post.get("id") or post.get("instagram_id")), **result})
+            else:
+                remaining.append(index)
+        _count_tier("local", len(local_results))
+        miss_indexes = remaining
+
+    if not miss_indexes:
+        logger.info(
+            f"AI analysis served without the model: {len(final_results)} from cache, "
+            f"{len(local_results)} classified locally."
+        )
+        return final_results + local_results
+
+    miss_posts = [posts_data[i] for i in miss_indexes]
+    miss_texts = [texts[i] for i in miss_indexes]
+
+    model_results, unanswered = await _analyze_with_model(miss_posts, miss_texts)
+
+    # Modelin cevaplamadığı postlar 'Unprocessed' kalmak yerine fallback'e gider
+    fallback_results = []
+    if unanswered:
+        logger.warning(f"{len(unanswered)} posts got no model answer. Switching to fallback for them.")
+        fallback_results = create_fallback_analysis([miss_posts[i] for i in unanswered])
+
+    # Sadece model sonuçları önbelleğe yazılır (fallback sonuçları değil)
+    key_by_id = {
+        str(post.get("id") or post.get("instagram_id") or ""): keys[i]
+        for i, post in zip(miss_indexes, miss_posts)
     }
+    to_store = {
+        key_by_id[res["id"]]: res for res in model_results if key_by_id.get(res["id"])
+    }
+    if to_store:
+        await asyncio.to_thread(analysis_cache.put_many, to_store, PROMPT_VERSION, settings.GEMINI_MODEL)
+
+    _count_tier("model", len(model_results))
+    _count_tier("fallback", len(fallback_results))
+    logger.info(
+        f"AI analysis completed: {len(model_results)} items from model, "
+        f"{len(final_results)} from cache, {len(local_results)} classified locally, "
+        f"{len(fallback_results)} via fallback."
+    )
+    return final_results + local_results + model_results + fallback_results
 
-    cocktail_indicators = ["cocktail", "kokteyl", "mix", "recipe", "tarif", "cl", "oz"]
+# --- GÖRSEL KATMAN ---
 
+def _needs_media(post: dict, result: dict) -> bool:
+    """The text pass could not tell: (almost) no caption and no drink found."""
+    return (
+        result.get("drink_category") in (None, "Other")
+        and len(clean_caption(post.get("caption", ""))) < settings.MEDIA_MIN_CAPTION_CHARS
+        and bool(media_cache.media_source(post))
+    )
+
+async def _refine_with_media(posts_data, results):
+    """
+    Downloads images only for the ambiguous posts (through the shared on-disk cache)
+    and replaces their text results with the model's image-based answers.
+    Posts whose image is unavailable, or that the model skips, keep their text result.
+    """
+    index_by_id = {str(res["id"]): i for i, res in enumerate(results)}
+    candidates = []
     for post in posts_data:
-        caption = (post.get("caption") or "").lower()
-        drink_cat = "Other"
-        detected_drinks = []
-
-        # 1. Hangi içkiler geçiyor?
-        for cat, keys in keywords.items():
-            if any(k in caption for k in keys):
-                detected_drinks.append(cat)
-        
-        # 2. Mantıksal çıkarım
-        is_cocktail = any(ind in caption for ind in cocktail_indicators)
-
-        if "Coffee Cocktail" in detected_drinks:
-            drink_cat = "Coffee Cocktail"
-        elif len(detected_drinks) == 1:
-            base = detected_drinks[0]
-            if is_cocktail:
-                drink_cat = f"{base} Cocktail"
-            else:
-                drink_cat = base
-        elif len(detected_drinks) > 1:
-             # Birden fazla alkol varsa, karışık kokteyl say
-            if "Liqueur" in detected_drinks and len(detected_drinks) == 2:
-                # Örn: Cin + Likör -> Cin baskın
-                other = [d for d in detected_drinks if d != "Liqueur"][0]
-                drink_cat = f"{other} Cocktail"
-            else:
-                drink_cat = "Mixed Cocktail"
-
-        # Kategori belirleme (Basit)
-        if drink_cat != "Other":
-            category = "Gastronomy"
-            summary = f"{drink_cat} recipe or showcase."
-        elif any(x in caption for x in ["fashion", "style", "moda", "outfit"]):
-            category = "Fashion"
-            summary = "Fashion related content."
-        else:
-            category = "General"
-            summary = "No summary available."
-
-        results.append({
-            "id": str(post.get("id") or post.get("instagram_id")),
-            "category": category,
-            "summary": summary,
-            "drink_category": drink_cat
-        })
-    
+        real_id = str(post.get("id") or post.get("instagram_id") or "")
+        index = index_by_id.get(real_id)
+        if index is not None and _needs_media(post, results[index]):
+            candidates.append((real_id, post))
+
+    if not candidates:
+        return results
+
+    cache = media_cache.get_cache()
+    with telemetry.span("media.download", posts=len(candidates)):
+        images = await asyncio.gather(*(
+            cache.get(real_id, media_cache.media_source(post)) for real_id, post in candidates
+        ), return_exceptions=True)
+
+    items = []
+    id_map = {}
+    for n, ((real_id, post), image) in enumerate(zip(candidates, images)):
+        if isinstance(image, BaseException):
+            # Tek bir görselin hatası diğerlerini düşürmez; bu post caption sonucunda kalır
+            logger.error(f"Media download error for {real_id}: {image!r}")
+            continue
+        if image is None:
+            continue
+        proxy_id = f"IMG_{n}"
+        id_map[proxy_id] = real_id
+        items.append({"proxy_id": proxy_id, "text": clean_caption(post.get("caption", "")), "image": image})
+
+    size = max(1, settings.MEDIA_BATCH_MAX_ITEMS)
+    batches = [items[i:i + size] for i in range(0, len(items), size)]
+    allowed = [batch for batch in batches if _breaker_allows()]
+    skipped = sum(len(batch) for batch in batches) - sum(len(batch) for batch in allowed)
+    if skipped:
+        _count_tier("breaker_skipped", skipped)
+    outcomes = await asyncio.gather(*(_run_media_batch(batch) for batch in allowed), return_exceptions=True)
+
+    refined = 0
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            logger.error(f"Gemini media analysis error: {outcome!r}")
+            continue
+        for proxy_id, res in outcome.items():
+            results[index_by_id[id_map[proxy_id]]] = {"id": id_map[proxy_id], **res}
+            refined += 1
+
+    _count_tier("media", refined)
+    logger.info(
+        f"Media analysis: {len(candidates)} ambiguous posts, {len(items)} images, "
+        f"{len(allowed)} model calls, {refined} results refined."
+    )
     return results
 
+def create_fallback_analysis(posts_data):
+    """
+    Fallback method: Keyword based analysis when AI fails.
+    Uses the precompiled single-pass matcher in services/keyword_classifier.py.
+    """
+    logger.info("Running fallback analysis (Regex/Keyword based)...")
+    classified = classify_captions([post.get("caption") for post in posts_data])
+
+    return [
+        {"id": str(post.get("id") or post.get("instagram_id")), **result}
+        for post, result in zip(posts_data, classified)
+    ]
+
 def merge_analysis_with_posts(original_posts, ai_results):
-    """Merges AI results with original post objects."""
+    """Merges AI results with original post objects; category fields are canonicalized (services/categories.py)."""
     ai_map = {str(res['id']): res for res in ai_results}
     
     for post in original_posts:
@@ -193,5 +483,7 @@ def merge_analysis_with_posts(original_posts, ai_results):
             post['drink_category'] = 'Unprocessed'
             post['ai_category'] = 'General'
             post['ai_summary'] = ''
+        # Model çıktısındaki yazım farkları ("whisky cocktail") tek bir etikete indirgenir
+        categories.canonicalize(post)
             
     return original_posts
\ No newline at end of file
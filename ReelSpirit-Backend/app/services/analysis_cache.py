@@ -0,0 +1,171 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import database
+import models
+from config import settings
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Kaç yazma işleminde bir TTL/LRU temizliği yapılacağı
+_EVICT_EVERY = 50
+
+# --- SAYAÇLAR ---
+# get_many/put_many asyncio.to_thread ile eşzamanlı iş parçacıklarından çağrılır
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+_writes_since_evict = 0
+
+def _count(name: str, amount: int):
+    with _lock:
+        _counters[name] += amount
+
+def make_key(cleaned_text: str, prompt_version: str, model_name: str) -> str:
+    """Cache key: sha256 of the cleaned caption, prompt version and model name."""
+    raw = f"{model_name}\x1f{prompt_version}\x1f{cleaned_text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def stats() -> Dict[str, float]:
+    """Hit/miss counters of this process."""
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        **counters,
+        "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0
+    }
+
+def get_many(keys: List[str]) -> Dict[str, dict]:
+    """
+    Returns {key: {"category", "summary", "drink_category"}} for the non-expired hits.
+    Hits are touched so LRU eviction keeps them, but only when last_used_at is older than
+    ANALYSIS_CACHE_TOUCH_SECONDS; a hot key costs one write per interval, not one per read.
+    """
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not settings.ANALYSIS_CACHE_ENABLED or not keys:
+        return {}
+
+    now = datetime.utcnow()
+    expires_before = now - timedelta(days=settings.ANALYSIS_CACHE_TTL_DAYS)
+    touch_before = now - timedelta(seconds=settings.ANALYSIS_CACHE_TOUCH_SECONDS)
+
+    with database.SessionLocal() as db:
+        rows = db.execute(
+            select(models.AnalysisCache).where(
+                models.AnalysisCache.cache_key.in_(keys),
+                models.AnalysisCache.created_at >= expires_before
+            )
+        ).scalars().all()
+
+        found = {
+            row.cache_key: {
+                "category": row.ai_category,
+                "summary": row.ai_summary,
+                "drink_category": row.drink_category
+            }
+            for row in rows
+        }
+
+        stale = [row.cache_key for row in rows if row.last_used_at is None or row.last_used_at < touch_before]
+        if stale:
+            db.execute(
+                update(models.AnalysisCache)
+                .where(models.AnalysisCache.cache_key.in_(stale))
+                .values(last_used_at=now)
+            )
+            db.commit()
+
+    _count("hits", len(found))
+    _count("misses", len(keys) - len(found))
+    return found
+
+def put_many(entries: Dict[str, dict], prompt_version: str, model_name: str):
+    """Stores model results; existing keys are overwritten with the fresh result."""
+    global _writes_since_evict
+    if not settings.ANALYSIS_CACHE_ENABLED or not entries:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "cache_key": key,
+            "prompt_version": prompt_version,
+            "model_name": model_name,
+            "ai_category": res.get("category"),
+            "ai_summary": res.get("summary"),
+            "drink_category": res.get("drink_category"),
+            "created_at": now,
+            "last_used_at": now
+        }
+        for key, res in entries.items()
+    ]
+
+    with database.SessionLocal() as db:
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert_fn(models.AnalysisCache)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["cache_key"],
+                set_={
+                    field: stmt.excluded[field]
+                    for field in ("ai_category", "ai_summary", "drink_category", "created_at", "last_used_at")
+                }
+            )
+            db.execute(stmt, rows)
+        else:
+            for row in rows:
+                db.merge(models.AnalysisCache(**row))
+
+        _count("stores", len(rows))
+        with _lock:
+            _writes_since_evict += 1
+            evict = _writes_since_evict >= _EVICT_EVERY
+            if evict:
+                _writes_since_evict = 0
+        if evict:
+            _evict(db, prompt_version)
+
+        db.commit()
+
+def _evict(db, prompt_version: str):
+    """Drops entries of old prompt versions, expired entries, then least recently used ones."""
+    expires_before = datetime.utcnow() - timedelta(days=settings.ANALYSIS_CACHE_TTL_DAYS)
+    removed = db.execute(
+        delete(models.AnalysisCache).where(
+            (models.AnalysisCache.prompt_version != prompt_version)
+            | (models.AnalysisCache.created_at < expires_before)
+        )
+    ).rowcount or 0
+
+    # LRU: en son kullanılan MAX_ENTRIES kaydın dışındakileri sil. Aynı yazmadaki kayıtlar
+    # aynı last_used_at'i paylaşır; eşitlik anahtarla bozulur, tam olarak fazlalık silinir
+    overflow = (
+        select(models.AnalysisCache.cache_key)
+        .order_by(models.AnalysisCache.last_used_at.desc(), models.AnalysisCache.cache_key)
+        .offset(settings.ANALYSIS_CACHE_MAX_ENTRIES)
+    )
+    removed += db.execute(
+        delete(models.AnalysisCache).where(models.AnalysisCache.cache_key.in_(overflow))
+    ).rowcount or 0
+
+    if removed:
+        _count("evicted", removed)
+        logger.info(f"Analysis cache: {removed} entries evicted.")
+
+def invalidate(prompt_version: str = None):
+    """Clears the whole cache, or only entries that don't match prompt_version."""
+    with database.SessionLocal() as db:
+        stmt = delete(models.AnalysisCache)
+        if prompt_version:
+            stmt = stmt.where(models.AnalysisCache.prompt_version != prompt_version)
+        removed = db.execute(stmt).rowcount or 0
+        db.commit()
+    _count("evicted", removed)
+    return removed
@@ -0,0 +1,197 @@
+"""
+Canonical vocabularies of the classification fields (drink_category, ai_category, media_type).
+
+instagram_posts stores them as small-int ids into the drink_categories / ai_categories /
+media_types lookup tables (models.LabelType converts name <-> id). The id of a name is its
+position in the list + 1, so the lists are append-only: never reorder or remove an entry.
+Values found in old rows that match no label were added to the tables by migration 0005
+with ids from EXTRA_LABEL_ID_START; the app reads them at startup (main.lifespan) and
+re-reads the table when an unknown id shows up, at most every EXTRA_LABEL_REFRESH_SECONDS.
+
+Model output is mapped onto these names in merge_analysis_with_posts ("whisky cocktail",
+"Whiskey cocktails" and "Viski Kokteyli" all become "Whiskey Cocktail").
+"""
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+from services.keyword_classifier import classify_caption, fold_text, scan_caption
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+SPIRITS = ["Whiskey", "Gin", "Rum", "Vodka", "Tequila", "Beer", "Wine", "Raki", "Liqueur"]
+
+DRINK_CATEGORIES: List[str] = (
+    ["Other", "Not Specified", "Unprocessed"]
+    + SPIRITS
+    + [f"{spirit} Cocktail" for spirit in SPIRITS]
+    + ["Mixed Cocktail", "Coffee Cocktail"]
+)
+
+AI_CATEGORIES: List[str] = [
+    "General", "Gastronomy", "Fashion", "Sports", "Nightlife", "Travel", "Art",
+    "Music", "Beauty", "Fitness", "Lifestyle", "Entertainment", "Education",
+    "Technology", "Business", "Nature", "Animals", "Health", "Family"
+]
+
+MEDIA_TYPES: List[str] = ["IMAGE", "VIDEO", "CAROUSEL_ALBUM"]
+
+# Veriden eklenen etiketlerin ilk id'si (listeler bu sayıya hiç ulaşmaz)
+EXTRA_LABEL_ID_START = 1000
+
+# Modelin sık kullandığı eş anlamlılar; anahtarlar _fold ile katlanarak eşleşir
+AI_ALIASES = {
+    "food": "Gastronomy", "drink": "Gastronomy", "cocktail": "Gastronomy", "recipe": "Gastronomy",
+    "cooking": "Gastronomy", "mixology": "Gastronomy", "bar": "Nightlife", "party": "Nightlife",
+    "art and design": "Art", "design": "Art",
+    "photography": "Art", "pet": "Animals", "tech": "Technology", "humor": "Entertainment",
+    "comedy": "Entertainment", "wellness": "Health", "other": "General", "none": "General"
+}
+
+# Eski kayıtlarda "içki yok" anlamında kullanılan değerler
+DRINK_ALIASES = {"none": "Other", "yok": "Other", "no drink": "Other", "non alcoholic": "Other"}
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+# Çoğul eki sayılmayan sonlar: wellness, fitness, analysis, hibiscus
+_KEEP_S_ENDINGS = ("ss", "is", "us")
+
+def _fold(value: str) -> str:
+    """'Whiskey  Cocktails!' -> 'whiskey cocktail' (accents, case, punctuation, plural -s)."""
+    words = _NON_WORD_RE.sub(" ", fold_text(value)).split()
+    return " ".join(
+        w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith(_KEEP_S_ENDINGS) else w
+        for w in words
+    )
+
+def _fold_keys(aliases: Dict[str, str]) -> Dict[str, str]:
+    return {_fold(alias): label for alias, label in aliases.items()}
+
+class Vocabulary:
+    """A closed list of labels with stable ids and a name matcher for model output."""
+
+    def __init__(self, name: str, labels: List[str], default: Optional[str], match: Callable[[str], Optional[str]]):
+        self.name = name
+        self.labels = labels
+        self.default = default
+        self.ids: Dict[str, int] = {label: i + 1 for i, label in enumerate(labels)}
+        self._folded = {_fold(label): label for label in labels}
+        self._match = match
+        # Veriden eklenen etiketler: id -> ad (models, lookup tablosundan okuyan loader'ı bağlar)
+        self.extra: Dict[int, str] = {}
+        self.loader: Optional[Callable[[], Dict[int, str]]] = None
+        # Son okuma zamanı (monotonic); None = henüz okunmadı
+        self._extra_loaded_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    def add_extra(self, label_id: int, label: str):
+        """Registers a label added from data (see migrations._category_label_ids)."""
+        self.extra[label_id] = label
+        self.ids[label] = label_id
+        self._folded.setdefault(_fold(label), label)
+        _lookup.cache_clear()
+
+    def reset_extra(self):
+        """Forgets the data-added labels; they are read again on next use (new database)."""
+        for label in self.extra.values():
+            self.ids.pop(label, None)
+        self._folded = {_fold(label): label for label in self.labels}
+        self.extra = {}
+        self._extra_loaded_at = None
+        _lookup.cache_clear()
+
+    def load_extra(self) -> bool:
+        """
+        Reads the data-added labels from the lookup table; True if that succeeded.
+        Uses the sync engine, so async code calls it through a thread (see main.lifespan).
+        """
+        if self.loader is None:
+            return False
+        self._extra_loaded_at = time.monotonic()
+        try:
+            rows = self.loader()
+        except Exception as e:
+            # Tablo henüz yok (migrate öncesi) ya da DB'ye ulaşılamıyor: sadece sabit etiketler
+            logger.warning(f"{self.name}: veriden eklenen etiketler okunamadı: {e!r}")
+            return False
+        for label_id, label in rows.items():
+            if label_id not in self.extra:
+                self.add_extra(label_id, label)
+        return True
+
+    def _refresh_extra(self, min_interval: float) -> bool:
+        """Re-reads the labels unless that happened less than min_interval seconds ago."""
+        with self._refresh_lock:
+            loaded_at = self._extra_loaded_at
+            if loaded_at is not None and time.monotonic() - loaded_at < min_interval:
+                return False
+            return self.load_extra()
+
+    def lookup(self, value: Optional[str]) -> Optional[str]:
+        """Canonical label for value, or None if it is not recognised."""
+        if not value or not value.strip():
+            return None
+        label = _lookup(self, value)
+        # Model çıktısındaki bilinmeyen adlar sık görülür; tablo yalnızca hiç okunmadıysa okunur
+        if label is None and self._extra_loaded_at is None and self._refresh_extra(float("inf")):
+            label = _lookup(self, value)
+        return label
+
+    def canonical(self, value: Optional[str]) -> Optional[str]:
+        """Canonical label for value; unrecognised and empty values fall back to the default."""
+        return self.lookup(value) or self.default
+
+    def label(self, label_id: Optional[int]) -> Optional[str]:
+        if label_id is None:
+            return None
+        if 0 < label_id <= len(self.labels):
+            return self.labels[label_id - 1]
+        if label_id not in self.extra:
+            # Başka bir süreç yeni etiket eklemiş olabilir; okuma aralığı sınırlı (sorgu başına değil)
+            self._refresh_extra(settings.EXTRA_LABEL_REFRESH_SECONDS)
+        return self.extra.get(label_id)
+
+    def rows(self) -> List[dict]:
+        """Seed rows of the lookup table."""
+        return [{"id": i, "name": label} for label, i in self.ids.items()]
+
+@lru_cache(maxsize=4096)
+def _lookup(vocabulary: Vocabulary, value: str) -> Optional[str]:
+    folded = _fold(value)
+    return vocabulary._folded.get(folded) or vocabulary._match(folded)
+
+_DRINK_ALIASES = _fold_keys(DRINK_ALIASES)
+_AI_ALIASES = _fold_keys(AI_ALIASES)
+
+def _match_drink(folded: str) -> Optional[str]:
+    if folded in _DRINK_ALIASES:
+        return _DRINK_ALIASES[folded]
+    # Anahtar kelime sınıflandırıcısı yazım farklarını ve Türkçe adları tanır (whisky, viski, bourbon)
+    found = scan_caption(folded)
+    if found["drinks"]:
+        return classify_caption(folded)["drink_category"]
+    if found["is_cocktail"]:
+        return "Mixed Cocktail"
+    return None
+
+def _match_ai(folded: str) -> Optional[str]:
+    return _AI_ALIASES.get(folded)
+
+def _match_media_type(folded: str) -> Optional[str]:
+    return {"carousel": "CAROUSEL_ALBUM", "reel": "VIDEO"}.get(folded)
+
+DRINK = Vocabulary("drink_category", DRINK_CATEGORIES, "Other", _match_drink)
+AI = Vocabulary("ai_category", AI_CATEGORIES, "General", _match_ai)
+MEDIA = Vocabulary("media_type", MEDIA_TYPES, None, _match_media_type)
+
+def canonicalize(post: dict) -> dict:
+    """Maps a post's classification fields onto the canonical labels (in place)."""
+    post["drink_category"] = DRINK.canonical(post.get("drink_category"))
+    post["ai_category"] = AI.canonical(post.get("ai_category"))
+    if "media_type" in post:
+        post["media_type"] = MEDIA.canonical(post.get("media_type"))
+    return post
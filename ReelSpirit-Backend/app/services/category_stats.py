@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+from services import response_cache, sync_state
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+DIMENSIONS = ("drink_category", "ai_category", "month")
+UNKNOWN_MONTH = "unknown"
+# Boş/NULL değerlerin düştüğü bucket
+DEFAULT_BUCKETS = {"drink_category": "Other", "ai_category": "General", "month": UNKNOWN_MONTH}
+
+# (dimension, bucket) -> artış/azalış
+StatDeltas = Counter
+
+def month_bucket(post_timestamp: Optional[datetime]) -> str:
+    return post_timestamp.strftime("%Y-%m") if post_timestamp else UNKNOWN_MONTH
+
+def add_post(deltas: StatDeltas, row: dict, sign: int = 1):
+    """Counts a whole row (insert) in every dimension."""
+    deltas[("drink_category", row.get("drink_category") or DEFAULT_BUCKETS["drink_category"])] += sign
+    deltas[("ai_category", row.get("ai_category") or DEFAULT_BUCKETS["ai_category"])] += sign
+    deltas[("month", month_bucket(row.get("post_timestamp")))] += sign
+
+def move_category(deltas: StatDeltas, dimension: str, old: Optional[str], new: Optional[str]):
+    """Moves one post between buckets when its AI fields are refreshed."""
+    old = old or DEFAULT_BUCKETS[dimension]
+    new = new or DEFAULT_BUCKETS[dimension]
+    if old != new:
+        deltas[(dimension, old)] -= 1
+        deltas[(dimension, new)] += 1
+
+def apply_deltas(db: Session, username: str, deltas: StatDeltas):
+    """
+    Adds the deltas to user_category_stats inside the caller's transaction.
+    One INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count on PostgreSQL/SQLite.
+    """
+    rows = [
+        {"username": username, "dimension": dim, "bucket": bucket, "count": delta}
+        for (dim, bucket), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_fn(models.UserCategoryStat)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username", "dimension", "bucket"],
+            set_={"count": models.UserCategoryStat.count + stmt.excluded["count"]}
+        )
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            updated = db.execute(
+                update(models.UserCategoryStat)
+                .where(
+                    models.UserCategoryStat.username == username,
+                    models.UserCategoryStat.dimension == row["dimension"],
+                    models.UserCategoryStat.bucket == row["bucket"]
+                )
+                .values(count=models.UserCategoryStat.count + row["count"])
+            ).rowcount
+            if not updated:
+                db.add(models.UserCategoryStat(**row))
+
+def _month_expression(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(models.InstagramPost.post_timestamp, "YYYY-MM")
+    return func.strftime("%Y-%m", models.InstagramPost.post_timestamp)
+
+def rebuild(db: Session, username: Optional[str] = None, bump_versions: bool = True) -> int:
+    """
+    Recomputes the aggregates from instagram_posts (backfill / repair).
+    Rebuilds every user when username is None. Commits; returns the number of stat rows written.
+    bump_versions=False skips the response-cache versions (migrations that run before
+    sync_state.data_version exists).
+    """
+    Post = models.InstagramPost
+    columns = {
+        "drink_category": Post.drink_category,
+        "ai_category": Post.ai_category,
+        "month": _month_expression(db)
+    }
+
+    clear = delete(models.UserCategoryStat)
+    if username:
+        clear = clear.where(models.UserCategoryStat.username == username)
+    db.execute(clear)
+
+    written = 0
+    for dimension, column in columns.items():
+        query = select(Post.username, column, func.count(Post.id)).group_by(Post.username, column)
+        if username:
+            query = query.where(Post.username == username)
+
+        rows = [
+            {
+                "username": user,
+                "dimension": dimension,
+                "bucket": bucket or DEFAULT_BUCKETS[dimension],
+                "count": count
+            }
+            for user, bucket, count in db.execute(query)
+        ]
+        if rows:
+            # Aynı bucket'a düşen NULL/boş değerleri birleştir
+            merged: Dict[Tuple[str, str], dict] = {}
+            for row in rows:
+                key = (row["username"], row["bucket"])
+                if key in merged:
+                    merged[key]["count"] += row["count"]
+                else:
+                    merged[key] = row
+            db.add_all(models.UserCategoryStat(**row) for row in merged.values())
+            written += len(merged)
+
+    users = [username] if username else []
+    if bump_versions:
+        if not username:
+            users = list(db.execute(select(models.UserCategoryStat.username).distinct()).scalars())
+        sync_state.bump_data_version(db, users)
+    db.commit()
+    for user in users:
+        response_cache.bump_version(user)
+    logger.info(f"Stats rebuilt for {username or 'all users'}: {written} rows.")
+    return written
+
+def get_stats(db: Session, username: str) -> Dict[str, List[dict]]:
+    """Returns {dimension: [{"bucket", "count"}, ...]}; a single indexed lookup per user."""
+    result: Dict[str, List[dict]] = {dim: [] for dim in DIMENSIONS}
+    rows = db.execute(
+        select(
+            models.UserCategoryStat.dimension,
+            models.UserCategoryStat.bucket,
+            models.UserCategoryStat.count
+        ).where(
+            models.UserCategoryStat.username == username,
+            models.UserCategoryStat.count > 0
+        )
+    ).all()
+
+    for dimension, bucket, count in rows:
+        result.setdefault(dimension, []).append({"bucket": bucket, "count": count})
+    return result
@@ -0,0 +1,164 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from config import settings
+from services import telemetry
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for an upstream dependency.
+
+    closed:    every call goes through; outcomes are recorded in a window of the last N calls.
+    open:      too many failures (or slow calls) in the window; calls are refused for
+               open_seconds so callers can go straight to their fallback.
+    half_open: after the cool-down a limited number of probe calls are let through;
+               a successful probe closes the circuit, a failed one opens it again.
+               A cancelled probe gives its slot back (release_probe); a probe with no
+               outcome after probe_timeout seconds is presumed lost and its slot is reused.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_probes: int,
+        probe_timeout: float = 120.0
+    ):
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.probe_timeout = probe_timeout
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._last_probe_at = 0.0
+        # (başarılı mı, yavaş mı)
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=max(1, window))
+
+        # Metrikler
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+        self.last_latency = 0.0
+
+    def allow_request(self) -> bool:
+        """True if a call may go to the upstream now; refusals are counted."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            else:
+                self.rejected_calls += 1
+                return False
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                if time.monotonic() - self._last_probe_at < self.probe_timeout:
+                    self.rejected_calls += 1
+                    return False
+                # Sonucu hiç gelmeyen denemeler (ör. başlamadan iptal edilen görev) devreyi kilitlemesin
+                logger.warning(f"[BREAKER] {self.name}: {self._probes_in_flight} probe(s) timed out, probing again.")
+                self._probes_in_flight = 0
+            self._probes_in_flight += 1
+            self._last_probe_at = time.monotonic()
+        return True
+
+    def release_probe(self):
+        """Gives back a half-open probe slot whose call was cancelled before it had an outcome."""
+        if self.state == HALF_OPEN and self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def record_success(self, latency: float):
+        slow = latency >= self.slow_call_seconds
+        self._record(True, slow, latency)
+
+    def record_failure(self, latency: float):
+        self._record(False, latency >= self.slow_call_seconds, latency)
+
+    def _record(self, ok: bool, slow: bool, latency: float):
+        self.calls += 1
+        self.failures += not ok
+        self.slow_calls += slow
+        self.last_latency = latency
+
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if ok and not slow:
+                self._transition(CLOSED)
+            else:
+                self._transition(OPEN)
+            return
+
+        self._window.append((ok, slow))
+        if self.state == CLOSED and len(self._window) >= self.min_calls:
+            failed = sum(1 for ok, _ in self._window if not ok) / len(self._window)
+            slowed = sum(1 for _, slow in self._window if slow) / len(self._window)
+            if failed >= self.failure_rate or slowed >= self.slow_call_rate:
+                logger.warning(
+                    f"[BREAKER] {self.name} opening: failure rate {failed:.0%}, "
+                    f"slow call rate {slowed:.0%} over last {len(self._window)} calls."
+                )
+                self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.info(f"[BREAKER] {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._probes_in_flight = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self._window.clear()
+
+    def snapshot(self) -> Dict[str, object]:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened,
+            "last_latency_seconds": round(self.last_latency, 3),
+            "retry_in_seconds": round(retry_in, 1)
+        }
+
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    window=settings.GEMINI_BREAKER_WINDOW,
+    min_calls=settings.GEMINI_BREAKER_MIN_CALLS,
+    failure_rate=settings.GEMINI_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.GEMINI_BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate=settings.GEMINI_BREAKER_SLOW_CALL_RATE,
+    open_seconds=settings.GEMINI_BREAKER_OPEN_SECONDS,
+    half_open_probes=settings.GEMINI_BREAKER_HALF_OPEN_PROBES,
+    probe_timeout=settings.GEMINI_BREAKER_PROBE_TIMEOUT
+)
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+telemetry.BREAKER_STATE.set_function(lambda: _STATE_VALUES[gemini_breaker.state])
+telemetry.BREAKER_REJECTED.set_function(lambda: gemini_breaker.rejected_calls)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+from sqlalchemy import select
+
+import database
+import models
+from config import settings
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+TERMINAL_EVENTS = ("completed", "error")
+
+class _Topic:
+    """Viewers of one username's scan plus the single source that feeds them."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_event: Optional[dict] = None
+        self.watcher: Optional[asyncio.Task] = None
+
+class ScanEventBroker:
+    """
+    Fans scan progress events out to every stream of the same username.
+    Events published by a worker in this process are forwarded as they happen;
+    one DB watcher per username (not per viewer) covers scans running in other workers.
+    """
+
+    def __init__(self):
+        self._topics: Dict[str, _Topic] = {}
+
+    def publish(self, username: str, event: dict):
+        """Non-blocking; slow viewers drop their oldest queued event instead of stalling the scan."""
+        topic = self._topics.get(username)
+        if topic is None:
+            return
+        event = {"username": username, **event}
+        topic.last_event = event
+        for queue in topic.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def viewer_count(self, username: str) -> int:
+        topic = self._topics.get(username)
+        return len(topic.subscribers) if topic else 0
+
+    async def subscribe(self, username: str) -> AsyncIterator[dict]:
+        """Yields events for username until the scan completes or fails."""
+        topic = self._topics.get(username)
+        if topic is None:
+            topic = self._topics[username] = _Topic(username)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        topic.subscribers.add(queue)
+        if topic.watcher is None:
+            topic.watcher = asyncio.create_task(self._watch_job(topic))
+
+        try:
+            # Geç bağlanan izleyici son durumu hemen görsün
+            if topic.last_event:
+                queue.put_nowait(topic.last_event)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield {"event": "keepalive"}
+                    continue
+                yield event
+                if event.get("event") in TERMINAL_EVENTS:
+                    break
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers:
+                if topic.watcher:
+                    topic.watcher.cancel()
+                self._topics.pop(username, None)
+
+    async def _watch_job(self, topic: _Topic):
+        """Polls the scan_jobs row once per interval for all viewers of the topic."""
+        last_seen = None
+        while True:
+            try:
+                job = await asyncio.to_thread(_load_job_snapshot, topic.username)
+            except Exception as e:
+                logger.error(f"[EVENTS] {topic.username} durum okunamadı: {e}")
+                job = None
+
+            if job is not None and job != last_seen:
+                last_seen = job
+                status = job["status"]
+                if status in ("queued", "running"):
+                    self.publish(topic.username, {"event": "progress", **job})
+                else:
+                    self.publish(topic.username, {"event": status, **job})
+
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+def _load_job_snapshot(username: str) -> Optional[dict]:
+    with database.SessionLocal() as db:
+        job = db.execute(
+            select(models.ScanJob)
+            .where(models.ScanJob.username == username)
+            .order_by(models.ScanJob.id.desc())
+            .limit(1)
+        ).scalars().first()
+        if job is None:
+            # Hiç iş yoksa beklenecek bir tarama da yoktur
+            return {"status": "completed", "pages_done": 0, "posts_done": 0}
+        return {
+            "status": job.status,
+            "pages_done": job.pages_done,
+            "posts_done": job.posts_done
+        }
+
+def format_sse(event: dict) -> str:
+    """Serializes an event in text/event-stream format."""
+    if event.get("event") == "keepalive":
+        return ": keep-alive\n\n"
+    return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+broker = ScanEventBroker()
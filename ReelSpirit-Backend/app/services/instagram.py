@@ -1,41 +1,226 @@
+import asyncio
+import json
+import random
+import time
+from typing import Optional, Tuple
 import httpx
 from config import settings
+from services import telemetry
+from services.rate_limit import instagram_bucket
 from utils import setup_logger
 
 logger = setup_logger(__name__)
 
+GRAPH_API_BASE = "https://graph.facebook.com"
+
+# Tekrar denenebilecek HTTP durumları ve Graph API rate-limit hata kodları
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613, 80002}
+
+# --- PAYLAŞILAN İSTEMCİ ---
+# FastAPI lifespan'i tarafından açılıp kapatılır; her sayfa için yeni TCP+TLS el sıkışması yapılmaz.
+_client: Optional[httpx.AsyncClient] = None
+# Testlerde/benchmark'ta ağ yerine kullanılacak transport (bench.replay.ReplayTransport)
+_default_transport: Optional[httpx.AsyncBaseTransport] = None
+
+# Son yanıttaki kota kullanımı (yüzde) ve kotanın geri gelmesi için önerilen süre (saniye)
+_last_usage_percent: float = 0.0
+_last_regain_seconds: float = 0.0
+
+def set_default_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """Routes every client built from now on through transport (None restores the network)."""
+    global _default_transport
+    _default_transport = transport
+
+def _build_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Creates the long-lived Graph API client with pooling and HTTP/2 keep-alive."""
+    transport = transport or _default_transport
+    return httpx.AsyncClient(
+        base_url=GRAPH_API_BASE,
+        http2=settings.HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        transport=transport
+    )
+
+async def start_client(transport: Optional[httpx.AsyncBaseTransport] = None):
+    """Opens the shared client (called from the app lifespan)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = _build_client(transport)
+    return _client
+
+async def close_client():
+    """Closes the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the shared client, creating it lazily outside of the lifespan (scripts, tasks)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+# --- RATE LIMIT YARDIMCILARI ---
+
+def _parse_usage_headers(headers: httpx.Headers) -> Tuple[float, float]:
+    """
+    Reads X-App-Usage and X-Business-Use-Case-Usage.
+    Returns (highest usage percent, seconds until access is regained).
+    """
+    usage = 0.0
+    regain_seconds = 0.0
+
+    app_usage = headers.get("x-app-usage")
+    if app_usage:
+        try:
+            data = json.loads(app_usage)
+            usage = max([usage] + [float(v) for v in data.values() if isinstance(v, (int, float))])
+        except (ValueError, AttributeError):
+            pass
+
+    buc_usage = headers.get("x-business-use-case-usage")
+    if buc_usage:
+        try:
+            data = json.loads(buc_usage)
+            for entries in data.values():
+                for entry in entries:
+                    usage = max(
+                        usage,
+                        float(entry.get("call_count", 0)),
+                        float(entry.get("total_cputime", 0)),
+                        float(entry.get("total_time", 0))
+                    )
+                    # Graph API bu değeri dakika olarak döner
+                    regain_seconds = max(regain_seconds, float(entry.get("estimated_time_to_regain_access", 0)) * 60)
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    return usage, regain_seconds
+
+def _record_usage(headers: httpx.Headers):
+    global _last_usage_percent, _last_regain_seconds
+    if "x-app-usage" in headers or "x-business-use-case-usage" in headers:
+        _last_usage_percent, _last_regain_seconds = _parse_usage_headers(headers)
+
+def recommended_delay() -> float:
+    """
+    Seconds to wait before the next page, derived from the last usage headers.
+    Zero while usage is below GRAPH_USAGE_THROTTLE_PERCENT.
+    """
+    if _last_regain_seconds > 0:
+        return min(_last_regain_seconds, settings.GRAPH_BACKOFF_MAX)
+
+    threshold = settings.GRAPH_USAGE_THROTTLE_PERCENT
+    if _last_usage_percent < threshold:
+        return 0.0
+
+    # Eşikten %100'e doğru doğrusal olarak artan bekleme
+    ratio = (_last_usage_percent - threshold) / max(100.0 - threshold, 1.0)
+    return min(ratio, 1.0) * settings.GRAPH_BACKOFF_MAX
+
+def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """Backoff for the given attempt; honors Retry-After and usage headers when present."""
+    delay = min(settings.GRAPH_BACKOFF_BASE * (2 ** attempt), settings.GRAPH_BACKOFF_MAX)
+    delay += random.uniform(0, settings.GRAPH_BACKOFF_BASE)
+
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        delay = max(delay, recommended_delay())
+
+    return min(delay, settings.GRAPH_BACKOFF_MAX)
+
+def _is_rate_limited(response: httpx.Response) -> bool:
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        return True
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get("code") in RATE_LIMIT_ERROR_CODES
+
 async def fetch_instagram_page(target_username: str, after_cursor: str = None):
     """
     Instagram Graph API'den asenkron veri çeker.
     """
-    url = f"https://graph.facebook.com/{settings.API_VERSION}/{settings.INSTAGRAM_BUSINESS_ID}"
-    
-    media_query = "media{caption,media_type,media_url,permalink,timestamp,id}"
+    started = time.perf_counter()
+    with telemetry.span("instagram.fetch_page", username=target_username, paged=bool(after_cursor)) as current:
+        posts, next_cursor = await _fetch_page(target_username, after_cursor)
+        telemetry.set_span_attribute(current, "posts", len(posts))
+
+    outcome = "ok" if posts or next_cursor else "empty"
+    telemetry.INSTAGRAM_FETCH_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+    return posts, next_cursor
+
+async def _fetch_page(target_username: str, after_cursor: Optional[str]):
+    url = f"/{settings.API_VERSION}/{settings.INSTAGRAM_BUSINESS_ID}"
+
+    # thumbnail_url: videoların görsel analizi için kapak karesi
+    media_fields = "caption,media_type,media_url,thumbnail_url,permalink,timestamp,id"
+    media_query = f"media{{{media_fields}}}"
     if after_cursor:
-        media_query = f"media.after({after_cursor}){{caption,media_type,media_url,permalink,timestamp,id}}"
+        media_query = f"media.after({after_cursor}){{{media_fields}}}"
 
     params = {
         "fields": f"business_discovery.username({target_username}){{{media_query}}}",
         "access_token": settings.ACCESS_TOKEN
     }
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
+
+    client = get_client()
+    for attempt in range(settings.GRAPH_MAX_RETRIES + 1):
         try:
+            await instagram_bucket.acquire()
             response = await client.get(url, params=params)
+            _record_usage(response.headers)
+
+            if response.is_error and _is_rate_limited(response) and attempt < settings.GRAPH_MAX_RETRIES:
+                delay = _retry_delay(response, attempt)
+                logger.warning(
+                    f"Instagram API {response.status_code} (attempt {attempt + 1}), retrying in {delay:.1f}s."
+                )
+                telemetry.INSTAGRAM_RETRIES.inc()
+                await asyncio.sleep(delay)
+                continue
+
             response.raise_for_status()
             data = response.json()
-            
+
             business_data = data.get('business_discovery', {})
             media_data = business_data.get('media', {})
-            
+
             posts = media_data.get('data', [])
             next_cursor = media_data.get('paging', {}).get('cursors', {}).get('after')
-            
+
             return posts, next_cursor
-            
+
         except httpx.HTTPStatusError as e:
             logger.error(f"Instagram API Error: {e.response.text}")
             return [], None
+        except httpx.TransportError as e:
+            # Bağlantı/zaman aşımı hataları da backoff ile tekrar denenir
+            if attempt < settings.GRAPH_MAX_RETRIES:
+                delay = _retry_delay(None, attempt)
+                logger.warning(f"Instagram connection error: {e!r}, retrying in {delay:.1f}s.")
+                telemetry.INSTAGRAM_RETRIES.inc()
+                await asyncio.sleep(delay)
+                continue
+            logger.error(f"Instagram connection error: {e!r}")
+            return [], None
         except Exception as e:
             logger.error(f"Unexpected Error: {e}")
-            return [], None
\ No newline at end of file
+            return [], None
+
+    return [], None
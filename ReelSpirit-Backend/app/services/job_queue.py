@@ -0,0 +1,359 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import database
+import models
+from config import settings
+from services import sync_state, telemetry
+from services.events import broker
+from services.scan_pipeline import ScanReport, run_deep_scan
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# --- KUYRUK İŞLEMLERİ ---
+
+def get_active_job(db: Session, username: str) -> Optional[models.ScanJob]:
+    return db.execute(
+        select(models.ScanJob).where(
+            models.ScanJob.username == username,
+            models.ScanJob.status.in_(ACTIVE_STATUSES)
+        )
+    ).scalars().first()
+
+def get_latest_job(db: Session, username: str) -> Optional[models.ScanJob]:
+    return db.execute(
+        select(models.ScanJob)
+        .where(models.ScanJob.username == username)
+        .order_by(models.ScanJob.id.desc())
+        .limit(1)
+    ).scalars().first()
+
+def enqueue_scan(
+    db: Session,
+    username: str,
+    cursor: Optional[str],
+    mode: str = "full",
+    origin: str = "api"
+) -> Tuple[models.ScanJob, bool]:
+    """
+    Queues a deep scan starting at cursor (incremental scans start at the newest page).
+    origin records who asked for it (api, batch or scheduler).
+    Returns (job, created); an already active job for the username is reused.
+    """
+    active = get_active_job(db, username)
+    if active:
+        return active, False
+
+    job = models.ScanJob(username=username, status="queued", cursor=cursor, mode=mode, origin=origin)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Başka bir worker aynı anda aynı kullanıcı için iş açtı
+        db.rollback()
+        return get_active_job(db, username), False
+
+    db.refresh(job)
+    logger.info(f"[JOB] {username} için {mode} tarama işi #{job.id} kuyruğa alındı.")
+    return job, True
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Puts running jobs whose worker stopped sending heartbeats back in the queue."""
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    requeued = db.execute(
+        update(models.ScanJob)
+        .where(
+            models.ScanJob.status == "running",
+            models.ScanJob.heartbeat_at < stale_before
+        )
+        .values(status="queued", worker_id=None)
+    ).rowcount or 0
+    db.commit()
+    if requeued:
+        logger.warning(f"[JOB] {requeued} sahipsiz iş yeniden kuyruğa alındı.")
+    return requeued
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[models.ScanJob]:
+    """
+    Claims the queued job that was served least recently (round-robin across profiles):
+    new jobs are ordered by creation, sliced jobs by when their last slice ended.
+    PostgreSQL: FOR UPDATE SKIP LOCKED keeps workers off each other's rows.
+    SQLite ignores FOR UPDATE; the guarded UPDATE below makes the claim atomic there.
+    """
+    job_id = db.execute(
+        select(models.ScanJob.id)
+        .where(models.ScanJob.status == "queued")
+        .order_by(
+            func.coalesce(models.ScanJob.heartbeat_at, models.ScanJob.created_at),
+            models.ScanJob.id
+        )
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+
+    if job_id is None:
+        db.commit()
+        return None
+
+    claimed = db.execute(
+        update(models.ScanJob)
+        .where(models.ScanJob.id == job_id, models.ScanJob.status == "queued")
+        .values(
+            status="running",
+            worker_id=worker_id,
+            heartbeat_at=datetime.utcnow(),
+            attempts=models.ScanJob.attempts + 1
+        )
+    ).rowcount
+    db.commit()
+
+    if not claimed:
+        return None
+    return db.get(models.ScanJob, job_id)
+
+class LeaseLost(Exception):
+    """The job was requeued (stale heartbeat) and may belong to another worker now."""
+
+def _update_leased(db: Session, job_id: int, worker_id: str, values: Dict[str, object]) -> bool:
+    """
+    Updates a running job only while worker_id still holds it.
+    False means the lease is lost: requeue_stale_jobs took the job back, and another
+    worker may already be running it, so this worker must not write to it again.
+    """
+    updated = db.execute(
+        update(models.ScanJob)
+        .where(
+            models.ScanJob.id == job_id,
+            models.ScanJob.worker_id == worker_id,
+            models.ScanJob.status == "running"
+        )
+        .values(**values)
+    ).rowcount
+    db.commit()
+    if not updated:
+        logger.warning(f"[JOB] #{job_id}: {worker_id} işin sahipliğini kaybetti; güncelleme yapılmadı.")
+    return bool(updated)
+
+def record_progress(
+    db: Session, job_id: int, worker_id: str, pages_done: int, posts_done: int, cursor: Optional[str]
+) -> bool:
+    return _update_leased(db, job_id, worker_id, {
+        "pages_done": pages_done,
+        "posts_done": posts_done,
+        "cursor": cursor,
+        "heartbeat_at": datetime.utcnow()
+    })
+
+def heartbeat(db: Session, job_id: int, worker_id: str) -> bool:
+    return _update_leased(db, job_id, worker_id, {"heartbeat_at": datetime.utcnow()})
+
+def finish_job(db: Session, job_id: int, worker_id: str, status: str, error: Optional[str] = None) -> bool:
+    return _update_leased(db, job_id, worker_id, {
+        "status": status, "error": error, "finished_at": datetime.utcnow(), "worker_id": None
+    })
+
+def release_job(db: Session, job_id: int, worker_id: str) -> bool:
+    """
+    Hands a running job back to the queue (end of a slice or graceful shutdown);
+    progress is kept and the job goes behind the jobs that waited longer.
+    """
+    return _update_leased(db, job_id, worker_id, {
+        "status": "queued", "worker_id": None, "heartbeat_at": datetime.utcnow()
+    })
+
+# --- TOPLU (BATCH) ANALİZ ---
+
+def create_batch(db: Session, usernames: List[str]) -> models.ScanBatch:
+    """
+    Queues an incremental scan for every username (a new profile scans from its newest
+    page to the end) and records them as one batch. Profiles that already have an
+    active job share it instead of queueing a second one.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    batch = models.ScanBatch(total=len(usernames))
+    db.add(batch)
+    db.commit()
+
+    for username in usernames:
+        job, _ = enqueue_scan(db, username, None, mode="incremental", origin="batch")
+        db.add(models.ScanBatchItem(batch_id=batch.id, username=username, job_id=job.id))
+    db.commit()
+
+    logger.info(f"[BATCH] #{batch.id}: {len(usernames)} profil kuyruğa alındı.")
+    return batch
+
+def get_batch_progress(db: Session, batch_id: int) -> Optional[Dict[str, object]]:
+    """Aggregated progress of a batch plus one line per profile."""
+    batch = db.get(models.ScanBatch, batch_id)
+    if batch is None:
+        return None
+
+    rows = db.execute(
+        select(
+            models.ScanBatchItem.username,
+            models.ScanJob.status,
+            models.ScanJob.pages_done,
+            models.ScanJob.posts_done,
+            models.ScanJob.error
+        )
+        .join(models.ScanJob, models.ScanJob.id == models.ScanBatchItem.job_id)
+        .where(models.ScanBatchItem.batch_id == batch_id)
+        .order_by(models.ScanBatchItem.username)
+    ).all()
+
+    counts = {status: 0 for status in ("queued", "running", "completed", "error")}
+    profiles = []
+    for username, status, pages_done, posts_done, error in rows:
+        counts[status] = counts.get(status, 0) + 1
+        profiles.append({
+            "username": username,
+            "status": status,
+            "pages_done": pages_done,
+            "posts_done": posts_done,
+            "error": error
+        })
+
+    finished = counts["completed"] + counts["error"]
+    return {
+        "batch_id": batch.id,
+        "status": "completed" if finished == batch.total else "processing",
+        "total": batch.total,
+        "finished": finished,
+        **counts,
+        "pages_done": sum(p["pages_done"] for p in profiles),
+        "posts_done": sum(p["posts_done"] for p in profiles),
+        "profiles": profiles
+    }
+
+def _in_session(fn, *args):
+    """Runs a queue operation with its own short-lived session (used from worker threads)."""
+    with database.SessionLocal() as db:
+        return fn(db, *args)
+
+# --- WORKER ---
+
+async def run_job(job: models.ScanJob):
+    """
+    Runs (or resumes) one claimed job through the deep-scan pipeline.
+    Every write is guarded by the job's lease (worker_id); if the job was requeued
+    meanwhile, the scan stops and leaves the job to its new owner.
+    """
+    job_id = job.id
+    worker_id = job.worker_id
+    base_pages = job.pages_done or 0
+    base_posts = job.posts_done or 0
+    incremental = job.mode == "incremental"
+
+    # Artımlı tarama en yeni sayfadan başlar (cursor'suz); diğer durumlarda
+    # cursor'un olmaması önceki denemenin son sayfayı kaydettikten sonra düştüğünü gösterir
+    if not job.cursor and not (incremental and base_pages == 0):
+        if await asyncio.to_thread(_in_session, finish_job, job_id, worker_id, "completed"):
+            await asyncio.to_thread(_in_session, sync_state.mark_synced, job.username)
+        return
+
+    page_filter = None
+    if incremental:
+        high_water_mark = await asyncio.to_thread(
+            _in_session, sync_state.get_high_water_mark, job.username, base_pages == 0
+        )
+        page_filter = sync_state.make_page_filter(job.username, high_water_mark)
+
+    if base_pages:
+        logger.info(f"[JOB] #{job_id} {job.username} kaldığı yerden devam ediyor ({base_pages} sayfa).")
+    else:
+        logger.info(f"[JOB] #{job_id} {job.username} için derinlemesine tarama başladı.")
+
+    async def on_progress(report: ScanReport):
+        pages_done = base_pages + report.pages
+        posts_done = base_posts + report.posts
+        if not await asyncio.to_thread(
+            _in_session, record_progress, job_id, worker_id, pages_done, posts_done, report.resume_cursor
+        ):
+            raise LeaseLost(job_id)
+        broker.publish(job.username, {
+            "event": "progress", "status": "running", "pages_done": pages_done, "posts_done": posts_done
+        })
+
+    async def keep_alive():
+        # Uzun Gemini çağrıları sırasında işin sahipsiz sayılmaması için.
+        # Sahiplik kaybolduysa durur; sonraki ilerleme kaydı LeaseLost ile taramayı keser.
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            if not await asyncio.to_thread(_in_session, heartbeat, job_id, worker_id):
+                return
+
+    heartbeat_task = asyncio.create_task(keep_alive())
+    telemetry.SCANS_IN_FLIGHT.inc()
+    try:
+        with telemetry.span("scan.job", job_id=job_id, username=job.username, mode=job.mode):
+            report = await run_deep_scan(
+                job.username, job.cursor, on_progress=on_progress, page_filter=page_filter,
+                max_pages=settings.SCAN_SLICE_PAGES or None
+            )
+            if settings.SCAN_SLICE_PAGES and report.pages >= settings.SCAN_SLICE_PAGES and report.resume_cursor:
+                # Dilim bitti: diğer profiller sıra alsın, bu iş kaldığı yerden devam edecek
+                if not await asyncio.to_thread(_in_session, release_job, job_id, worker_id):
+                    raise LeaseLost(job_id)
+                logger.info(f"[JOB] #{job_id} {job.username} dilimi bitti ({report.pages} sayfa), sıraya döndü.")
+                return
+            await asyncio.to_thread(_in_session, sync_state.mark_synced, job.username)
+            if not await asyncio.to_thread(_in_session, finish_job, job_id, worker_id, "completed"):
+                raise LeaseLost(job_id)
+        broker.publish(job.username, {"event": "completed", "status": "completed"})
+        logger.info(f"[JOB] #{job_id} {job.username} scan completed.")
+    except asyncio.CancelledError:
+        # Kapanışta iş kaybolmasın: başka bir worker kaldığı yerden devam eder
+        _in_session(release_job, job_id, worker_id)
+        raise
+    except LeaseLost:
+        # İş artık başka bir worker'ın; durumuna ve olaylarına dokunulmaz
+        logger.warning(f"[JOB] #{job_id} {job.username} başka bir worker'a geçti, bu deneme durduruldu.")
+    except Exception as e:
+        logger.error(f"[JOB ERROR] #{job_id} {job.username} hatası: {e}")
+        if await asyncio.to_thread(_in_session, finish_job, job_id, worker_id, "error", str(e)):
+            broker.publish(job.username, {"event": "error", "status": "error", "detail": str(e)})
+    finally:
+        telemetry.SCANS_IN_FLIGHT.dec()
+        heartbeat_task.cancel()
+
+async def worker_loop(worker_id: str):
+    """Claims and runs jobs until cancelled."""
+    logger.info(f"[WORKER] {worker_id} başladı.")
+    while True:
+        try:
+            await asyncio.to_thread(_in_session, requeue_stale_jobs)
+            job = await asyncio.to_thread(_in_session, claim_next_job, worker_id)
+        except Exception as e:
+            logger.error(f"[WORKER] {worker_id} kuyruk hatası: {e}")
+            job = None
+
+        if job is None:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+
+        await run_job(job)
+
+def start_workers() -> List[asyncio.Task]:
+    """Starts SCAN_WORKER_CONCURRENCY worker loops in this process."""
+    if not settings.SCAN_WORKERS_ENABLED:
+        return []
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    return [
+        asyncio.create_task(worker_loop(f"{prefix}:{slot}"))
+        for slot in range(max(1, settings.SCAN_WORKER_CONCURRENCY))
+    ]
+
+async def stop_workers(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,201 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+# --- ANAHTAR KELİMELER ---
+# Türkçe kökler ek alabilir (viskili, kokteyli); diğerleri tam kelime olarak (çoğul eki hariç) eşleşir.
+DRINK_KEYWORDS = {
+    "Whiskey": ["viski*", "whiskey", "whisky", "bourbon", "scotch", "jack daniels", "jameson"],
+    "Gin": ["cin", "gin", "tanqueray", "gordon", "hendricks", "beefeater"],
+    "Rum": ["rom", "rum", "bacardi", "havana club", "captain morgan"],
+    "Vodka": ["votka*", "vodka", "absolut", "smirnoff", "grey goose"],
+    "Tequila": ["tekila*", "tequila", "patron", "olmeca"],
+    "Beer": ["bira", "biralar*", "birasi*", "beer", "lager", "ale", "ipa", "stout"],
+    "Wine": ["sarap*", "sarab*", "wine", "merlot", "cabernet", "chardonnay"],
+    "Raki": ["raki*", "yeni raki*"],
+    "Liqueur": ["likor*", "liqueur", "baileys", "kahlua", "jagermeister", "cointreau"],
+    "Coffee Cocktail": ["espresso martini", "irish coffee"]
+}
+
+COCKTAIL_INDICATORS = ["cocktail*", "kokteyl*", "mix*", "recipe*", "tarif*", "cl", "oz"]
+FASHION_KEYWORDS = ["fashion", "style", "moda", "outfit"]
+
+# Katlamadan sonra bir kökle başlayan ama içki olmayan kelimeler (ı -> i: "rakip" ~ "raki*").
+# Daha uzun kök önce denendiği için bunlar kısa kökü bastırır.
+IGNORED_STEMS = [
+    "rakip*", "rakib*",  # rakip, rakibi, rakipler
+    "rakim*"             # rakım (yükseklik)
+]
+
+# Türkçe harfler ASCII karşılıklarına indirilir; I/İ/ı hepsi 'i' olur
+_TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i",
+    "Ş": "s", "ş": "s", "Ğ": "g", "ğ": "g",
+    "Ü": "u", "ü": "u", "Ö": "o", "ö": "o", "Ç": "c", "ç": "c"
+})
+
+def fold_text(text: str) -> str:
+    """Turkish-aware casefold plus accent stripping (jägermeister -> jagermeister)."""
+    text = text.translate(_TURKISH_FOLD).casefold()
+    if not text.isascii():
+        text = "".join(
+            ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)
+        )
+    return text
+
+# Eşleşmeyi bastıran etiket (IGNORED_STEMS)
+_IGNORED = ("ignored", None)
+
+# Kelimeler harf dizileridir: "50cl" -> "cl", "class" tek kelime kalır (cl ile eşleşmez)
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+def _build_matcher():
+    """
+    Precompiles every keyword into hash tables, so a caption is matched in one pass
+    over its words:
+      exact: whole word (or its -s/-es plural) -> label
+      stems: word prefix (Turkish suffixes) -> label, looked up by stem length,
+             only for words whose first letters start some stem (stem heads)
+      phrases: first word -> [(remaining words, suffixable, label)]
+    """
+    entries = []
+    for drink, keys in DRINK_KEYWORDS.items():
+        entries += [(k, ("drink", drink)) for k in keys]
+    entries += [(k, ("cocktail", None)) for k in COCKTAIL_INDICATORS]
+    entries += [(k, ("fashion", None)) for k in FASHION_KEYWORDS]
+    entries += [(k, _IGNORED) for k in IGNORED_STEMS]
+
+    exact, stems, phrases = {}, {}, {}
+    for keyword, label in entries:
+        suffixable = keyword.endswith("*")
+        words = fold_text(keyword.rstrip("*")).split()
+        if len(words) > 1:
+            phrases.setdefault(words[0], []).append((tuple(words[1:]), suffixable, label))
+        elif suffixable:
+            stems[words[0]] = label
+        else:
+            exact[words[0]] = label
+
+    stem_lengths = sorted({len(stem) for stem in stems}, reverse=True)
+    # Kök aramasından önce ucuz ön eleme: kelimenin ilk harfleri hiçbir kökle başlamıyorsa atlanır
+    head = stem_lengths[-1]
+    return exact, stems, stem_lengths, head, {stem[:head] for stem in stems}, phrases
+
+_EXACT, _STEMS, _STEM_LENGTHS, _STEM_HEAD, _STEM_HEADS, _PHRASES = _build_matcher()
+_DRINK_ORDER = {drink: i for i, drink in enumerate(DRINK_KEYWORDS)}
+
+def _match_word(word: str, keyword: str, suffixable: bool) -> bool:
+    if suffixable:
+        return word.startswith(keyword)
+    return word == keyword or word in (keyword + "s", keyword + "es")
+
+@lru_cache(maxsize=65536)
+def _word_label(word: str):
+    # Kelime sıklığı Zipf dağılımlıdır; sık kelimelerin sonucu önbellekten gelir
+    label = _EXACT.get(word)
+    if label is None and word.endswith("s"):
+        # Çoğul: beers, gins, ales
+        label = _EXACT.get(word[:-1]) or (_EXACT.get(word[:-2]) if word.endswith("es") else None)
+    if label is None and word[:_STEM_HEAD] in _STEM_HEADS:
+        for length in _STEM_LENGTHS:
+            if len(word) >= length:
+                label = _STEMS.get(word[:length])
+                if label is not None:
+                    break
+    return None if label is _IGNORED else label
+
+def scan_caption(caption: Optional[str]) -> Dict[str, object]:
+    """Single pass over the folded caption's words; returns the detected drinks and flags."""
+    drinks: Set[str] = set()
+    is_cocktail = False
+    is_fashion = False
+
+    words = _WORD_RE.findall(fold_text(caption or ""))
+    labels = []
+    for index, word in enumerate(words):
+        label = _word_label(word)
+        if label is not None:
+            labels.append(label)
+        for rest, suffixable, phrase_label in _PHRASES.get(word, ()):
+            following = words[index + 1:index + 1 + len(rest)]
+            if len(following) == len(rest) and all(
+                _match_word(w, k, suffixable and i == len(rest) - 1)
+                for i, (w, k) in enumerate(zip(following, rest))
+            ):
+                labels.append(phrase_label)
+
+    for kind, drink in labels:
+        if kind == "drink":
+            drinks.add(drink)
+        elif kind == "cocktail":
+            is_cocktail = True
+        else:
+            is_fashion = True
+
+    return {
+        "drinks": sorted(drinks, key=_DRINK_ORDER.get),
+        "is_cocktail": is_cocktail,
+        "is_fashion": is_fashion
+    }
+
+def classify_caption(caption: Optional[str]) -> dict:
+    """Keyword classification of one caption: {"category", "summary", "drink_category"}."""
+    return _classify(scan_caption(caption))
+
+def classify_with_confidence(caption: Optional[str]) -> Tuple[dict, float]:
+    """
+    Same classification plus a 0..1 confidence that it is unambiguous.
+    A single named spirit (or a coffee cocktail phrase) scores high; several spirits,
+    fashion-only or keyword-less captions score low, since the model can do better there.
+    """
+    found = scan_caption(caption)
+    drinks = found["drinks"]
+    if "Coffee Cocktail" in drinks and len(drinks) == 1:
+        confidence = 0.95
+    elif len(drinks) == 1:
+        confidence = 0.9
+    elif len(drinks) == 2 and "Liqueur" in drinks:
+        confidence = 0.6
+    elif drinks:
+        confidence = 0.5
+    elif found["is_fashion"]:
+        confidence = 0.3
+    else:
+        confidence = 0.0
+    return _classify(found), confidence
+
+def _classify(found: Dict[str, object]) -> dict:
+    detected_drinks = found["drinks"]
+    drink_cat = "Other"
+
+    if "Coffee Cocktail" in detected_drinks:
+        drink_cat = "Coffee Cocktail"
+    elif len(detected_drinks) == 1:
+        base = detected_drinks[0]
+        drink_cat = f"{base} Cocktail" if found["is_cocktail"] else base
+    elif len(detected_drinks) > 1:
+        # Birden fazla alkol varsa, karışık kokteyl say
+        if "Liqueur" in detected_drinks and len(detected_drinks) == 2:
+            # Örn: Cin + Likör -> Cin baskın
+            other = [d for d in detected_drinks if d != "Liqueur"][0]
+            drink_cat = f"{other} Cocktail"
+        else:
+            drink_cat = "Mixed Cocktail"
+
+    # Kategori belirleme (Basit)
+    if drink_cat != "Other":
+        category = "Gastronomy"
+        summary = f"{drink_cat} recipe or showcase."
+    elif found["is_fashion"]:
+        category = "Fashion"
+        summary = "Fashion related content."
+    else:
+        category = "General"
+        summary = "No summary available."
+
+    return {"category": category, "summary": summary, "drink_category": drink_cat}
+
+def classify_captions(captions: List[Optional[str]]) -> List[dict]:
+    """Batch API: classifies a list of captions with the precompiled matcher."""
+    return [classify_caption(caption) for caption in captions]
@@ -0,0 +1,252 @@
+"""
+Bounded on-disk cache for post thumbnails, keyed by instagram_id.
+
+- Concurrent downloads share one httpx client; MEDIA_DOWNLOAD_CONCURRENCY caps them.
+- A second request for an id that is already downloading awaits the same task.
+- When the directory exceeds MEDIA_CACHE_MAX_BYTES the least recently used files are deleted.
+"""
+import asyncio
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from config import settings
+from services import telemetry
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Dosya adında kullanılabilecek karakterler (instagram_id sayısal ama garanti değil)
+_SAFE_ID_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+# Modelin kabul ettiği görsel türleri; diğerleri (ör. video) indirilmez
+IMAGE_MIME_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+# Testlerde/benchmark'ta ağ yerine kullanılacak transport (bench.replay.MediaFixtureTransport)
+_default_transport: Optional[httpx.AsyncBaseTransport] = None
+
+def set_default_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """Routes media downloads through transport (None restores the network); resets the shared cache."""
+    global _default_transport, _cache
+    _default_transport = transport
+    _cache = None
+
+def media_source(post: dict) -> Optional[str]:
+    """Image URL of a post: the thumbnail for videos/reels, media_url for images and albums."""
+    if post.get("media_type") == "VIDEO":
+        return post.get("thumbnail_url")
+    return post.get("media_url")
+
+class MediaCache:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        max_file_bytes: int,
+        concurrency: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        # instagram_id -> devam eden indirme
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Açılışta mevcut dosyalar sayılır; sonrası bellekte takip edilir.
+        # _store/_evict to_thread içinde çalışır: _sizes ve total_bytes _lock ile korunur
+        self._lock = threading.Lock()
+        self._sizes: Dict[Path, int] = {
+            path: path.stat().st_size for path in self.directory.glob("*.img")
+        }
+        self.total_bytes = sum(self._sizes.values())
+        self.hits = 0
+        self.downloads = 0
+        self.evictions = 0
+
+    def _path(self, instagram_id: str) -> Path:
+        return self.directory / f"{_SAFE_ID_RE.sub('_', instagram_id)}.img"
+
+    def _client_or_new(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.MEDIA_DOWNLOAD_TIMEOUT),
+                follow_redirects=True,
+                transport=self._transport
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, instagram_id: str, url: Optional[str]) -> Optional[Tuple[bytes, str]]:
+        """Returns (bytes, mime type) of the post's image, downloading it once; None if unavailable."""
+        if not instagram_id or not url:
+            return None
+
+        path = self._path(instagram_id)
+        with self._lock:
+            cached = path in self._sizes
+        if cached:
+            try:
+                data = await asyncio.to_thread(_read_and_touch, path)
+                self.hits += 1
+                telemetry.MEDIA_CACHE.labels("hit").inc()
+                return data, _sniff_mime(data)
+            except FileNotFoundError:
+                self._forget(path)
+
+        task = self._inflight.get(instagram_id)
+        if task is None:
+            task = asyncio.ensure_future(self._download(instagram_id, url, path))
+            self._inflight[instagram_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(instagram_id, None))
+        else:
+            telemetry.MEDIA_CACHE.labels("coalesced").inc()
+        # shield: bekleyenlerden biri iptal edilse de indirme diğerleri için sürer
+        return await asyncio.shield(task)
+
+    async def _download(self, instagram_id: str, url: str, path: Path) -> Optional[Tuple[bytes, str]]:
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                data, mime = await self._fetch(url)
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Media download failed for {instagram_id}: {e!r}")
+                telemetry.MEDIA_CACHE.labels("error").inc()
+                return None
+            finally:
+                telemetry.MEDIA_DOWNLOAD_SECONDS.observe(time.perf_counter() - started)
+
+        try:
+            await asyncio.to_thread(self._store, path, data)
+        except OSError as e:
+            # Disk dolu vb.: görsel yine de bu analizde kullanılır, sadece önbelleğe girmez
+            logger.warning(f"Media cache write failed for {instagram_id}: {e!r}")
+        self.downloads += 1
+        telemetry.MEDIA_CACHE.labels("download").inc()
+        return data, mime
+
+    async def _fetch(self, url: str) -> Tuple[bytes, str]:
+        async with self._client_or_new().stream("GET", url) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get("content-length") or 0)
+            if declared > self.max_file_bytes:
+                raise ValueError(f"media too large ({declared} bytes)")
+
+            chunks = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > self.max_file_bytes:
+                    raise ValueError(f"media too large (> {self.max_file_bytes} bytes)")
+                chunks.append(chunk)
+
+        data = b"".join(chunks)
+        mime = _sniff_mime(data)
+        if mime not in IMAGE_MIME_TYPES:
+            raise ValueError(f"unsupported media type {mime}")
+        return data, mime
+
+    def _store(self, path: Path, data: bytes):
+        # Yarım yazılmış dosya okunmasın: geçici dosya + atomik rename
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+        finally:
+            # Yazma/rename başarısızsa .part dosyası dizinde kalmasın
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+        with self._lock:
+            self.total_bytes += len(data) - self._sizes.get(path, 0)
+            self._sizes[path] = len(data)
+            self._evict()
+
+    def _forget(self, path: Path):
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(path, 0)
+
+    def _evict(self):
+        """Deletes least recently used files until the cache fits; caller holds _lock."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        by_age = []
+        for path in self._sizes:
+            try:
+                by_age.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                by_age.append((0.0, path))
+        for _, path in sorted(by_age):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= self._sizes.pop(path, 0)
+            self.evictions += 1
+            telemetry.MEDIA_CACHE.labels("evicted").inc()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            files, total = len(self._sizes), self.total_bytes
+        return {
+            "files": files,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "downloads": self.downloads,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight)
+        }
+
+def _read_and_touch(path: Path) -> bytes:
+    data = path.read_bytes()
+    # mtime = son kullanım; tahliye sırası buna göre
+    os.utime(path)
+    return data
+
+def _sniff_mime(data: bytes) -> str:
+    """Image type from magic bytes; CDN content-type headers are not trusted."""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+# --- PAYLAŞILAN ÖNBELLEK ---
+# Event loop içinde ilk kullanımda oluşturulur
+_cache: Optional[MediaCache] = None
+
+def get_cache() -> MediaCache:
+    global _cache
+    if _cache is None:
+        _cache = MediaCache(
+            settings.MEDIA_CACHE_DIR,
+            max_bytes=settings.MEDIA_CACHE_MAX_BYTES,
+            max_file_bytes=settings.MEDIA_MAX_FILE_BYTES,
+            concurrency=settings.MEDIA_DOWNLOAD_CONCURRENCY,
+            transport=_default_transport
+        )
+    return _cache
+
+async def close_cache():
+    """Closes the download client (called from the app lifespan)."""
+    if _cache is not None:
+        await _cache.close()
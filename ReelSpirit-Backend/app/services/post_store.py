@@ -0,0 +1,181 @@
+import time
+from typing import Dict, Optional, Set
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from services import categories, category_stats, response_cache, search_index, sync_state, telemetry
+from utils import setup_logger, parse_timestamp
+
+logger = setup_logger(__name__)
+
+AI_FIELDS = ("ai_category", "ai_summary", "drink_category")
+REFRESH_POLICIES = ("never", "unprocessed", "always")
+
+# Tek IN (...) sorgusunda gönderilecek en fazla id (SQLite parametre limiti için)
+_CHUNK_SIZE = 500
+
+def _build_row(item: dict, username: str) -> dict:
+    """Converts a merged Graph API + AI item into an instagram_posts row (labels canonicalized)."""
+    return {
+        "instagram_id": str(item.get('id') or item.get('instagram_id') or ''),
+        "permalink": item.get('permalink'),
+        "username": username,
+        "caption": item.get('caption'),
+        "media_type": categories.MEDIA.canonical(item.get('media_type')),
+        "media_url": item.get('media_url'),
+        "post_timestamp": parse_timestamp(item.get('timestamp') or item.get('post_timestamp')),
+        # AI alanları
+        "ai_category": categories.AI.canonical(item.get('ai_category', 'General')),
+        "ai_summary": item.get('ai_summary', ''),
+        "drink_category": categories.DRINK.canonical(item.get('drink_category', 'Other')),
+    }
+
+def _should_refresh(policy: str, old_drink_category: Optional[str], new_row: dict) -> bool:
+    """Decides whether an existing row's AI fields are overwritten."""
+    # Başarısız bir analiz, daha önce kaydedilmiş iyi sonucu ezmemeli
+    if new_row["drink_category"] == "Unprocessed":
+        return False
+    if policy == "always":
+        return True
+    if policy == "unprocessed":
+        return old_drink_category == "Unprocessed"
+    return False
+
+def _insert_new_rows(db: Session, dialect: str, rows: Dict[str, dict]) -> Set[str]:
+    """
+    Inserts the rows whose instagram_id is not taken yet and returns the ids that this
+    statement inserted. The set comes from the INSERT itself (ON CONFLICT DO NOTHING
+    RETURNING), so rows written by a concurrent transaction are never counted as ours.
+    """
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = (
+            insert_fn(models.InstagramPost.__table__)
+            .on_conflict_do_nothing(index_elements=["instagram_id"])
+            .returning(models.InstagramPost.instagram_id)
+        )
+        # executemany + insertmanyvalues: satırlar RETURNING ile birlikte çok-değerli tek INSERT'lerde gider
+        return set(db.execute(stmt, list(rows.values())).scalars())
+
+    # ON CONFLICT'siz veritabanları: var olanları kilitle, eksikleri ekle
+    existing = set()
+    ids = list(rows)
+    for start in range(0, len(ids), _CHUNK_SIZE):
+        existing.update(db.execute(
+            select(models.InstagramPost.instagram_id)
+            .where(models.InstagramPost.instagram_id.in_(ids[start:start + _CHUNK_SIZE]))
+            .with_for_update()
+        ).scalars())
+    new_rows = [row for insta_id, row in rows.items() if insta_id not in existing]
+    if new_rows:
+        db.execute(insert(models.InstagramPost), new_rows)
+    return {row["instagram_id"] for row in new_rows}
+
+def _locked_rows(db: Session, ids: list) -> Dict[str, tuple]:
+    """
+    Reads (pk, drink_category, ai_category) of existing rows under a row lock
+    (SELECT ... FOR UPDATE; SQLite already holds the write lock after the INSERT),
+    so the old labels used for the stat deltas cannot change before the UPDATE.
+    """
+    existing = {}
+    for start in range(0, len(ids), _CHUNK_SIZE):
+        result = db.execute(
+            select(
+                models.InstagramPost.id,
+                models.InstagramPost.instagram_id,
+                models.InstagramPost.drink_category,
+                models.InstagramPost.ai_category
+            )
+            .where(models.InstagramPost.instagram_id.in_(ids[start:start + _CHUNK_SIZE]))
+            .with_for_update()
+        )
+        for pk, insta_id, drink_category, ai_category in result:
+            existing[insta_id] = (pk, drink_category, ai_category)
+    return existing
+
+def bulk_upsert_posts(
+    db: Session,
+    final_data: list,
+    username: str,
+    refresh_policy: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Writes a page of analyzed posts with batched statements instead of one query per post.
+    Does not commit; the caller owns the transaction.
+    Returns {"inserted": n, "updated": m}.
+    """
+    policy = refresh_policy or settings.AI_REFRESH_POLICY
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Unknown AI refresh policy: {policy}")
+
+    # Sayfa içindeki mükerrer id'leri ele (aynı id iki kez eklenmesin/güncellenmesin)
+    rows: Dict[str, dict] = {}
+    for item in final_data:
+        row = _build_row(item, username)
+        if row["instagram_id"]:
+            rows[row["instagram_id"]] = row
+
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+
+    inserted = _insert_new_rows(db, db.get_bind().dialect.name, rows)
+
+    # user_category_stats aynı transaction içinde güncellenir
+    deltas = category_stats.StatDeltas()
+    for insta_id in inserted:
+        category_stats.add_post(deltas, rows[insta_id])
+
+    # Eklenemeyenler zaten vardı; politika izin verirse AI alanları kilit altında yenilenir
+    refresh_ids = []
+    if policy != "never":
+        candidates = [
+            insta_id for insta_id, row in rows.items()
+            if insta_id not in inserted and row["drink_category"] != "Unprocessed"
+        ]
+        existing = _locked_rows(db, candidates) if candidates else {}
+        refresh_ids = [
+            insta_id for insta_id, (_, old_category, _) in existing.items()
+            if _should_refresh(policy, old_category, rows[insta_id])
+        ]
+        for insta_id in refresh_ids:
+            _, old_drink, old_ai = existing[insta_id]
+            category_stats.move_category(deltas, "drink_category", old_drink, rows[insta_id]["drink_category"])
+            category_stats.move_category(deltas, "ai_category", old_ai, rows[insta_id]["ai_category"])
+        if refresh_ids:
+            # pk ile toplu update (executemany)
+            db.execute(update(models.InstagramPost), [
+                {"id": existing[insta_id][0], **{f: rows[insta_id][f] for f in AI_FIELDS}}
+                for insta_id in refresh_ids
+            ])
+
+    category_stats.apply_deltas(db, username, deltas)
+    # Yeni ve AI alanları yenilenen postlar arama indeksine (SQLite FTS5) işlenir
+    search_index.index_posts(db, [i for i in rows if i in inserted] + refresh_ids)
+
+    return {"inserted": len(inserted), "updated": len(refresh_ids)}
+
+def save_posts_to_db(db: Session, final_data: list, username: str, refresh_policy: Optional[str] = None):
+    """
+    Analiz edilmiş verileri veritabanına kaydeder (Bulk upsert).
+    """
+    started = time.perf_counter()
+    with telemetry.span("db.save_posts", username=username, posts=len(final_data)):
+        counts = bulk_upsert_posts(db, final_data, username, refresh_policy)
+
+        if counts["inserted"] or counts["updated"]:
+            sync_state.bump_data_version(db, [username])
+            db.commit()
+            # Bu kullanıcının /posts ve /stats yanıtları artık eski
+            response_cache.bump_version(username)
+            logger.info(
+                f"DB: {username} için {counts['inserted']} yeni post kaydedildi, "
+                f"{counts['updated']} post güncellendi."
+            )
+
+    telemetry.DB_SAVE_SECONDS.observe(time.perf_counter() - started)
+    for result in ("inserted", "updated"):
+        telemetry.DB_ROWS.labels(result).inc(counts[result])
+    return counts
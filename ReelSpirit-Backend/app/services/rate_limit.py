@@ -0,0 +1,65 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from config import settings
+
+class TokenBucket:
+    """
+    Async token bucket shared by every caller of one upstream in this process.
+    Waiters are served first-come first-served (the lock is FIFO), so a profile
+    with many pages cannot jump ahead of others already waiting.
+    rate <= 0 disables limiting.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        # Metrik: toplam bekleme süresi
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            # Event loop içinde ilk kullanımda oluşturulur
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                wait = (tokens - self._tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        if self.rate > 0:
+            self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "available": round(self._tokens, 2),
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+# Upstream başına tek kova (bu süreçteki tüm taramalar ve istekler paylaşır)
+instagram_bucket = TokenBucket(
+    "instagram", settings.INSTAGRAM_REQUESTS_PER_SECOND, settings.INSTAGRAM_REQUEST_BURST
+)
+gemini_bucket = TokenBucket(
+    "gemini", settings.GEMINI_REQUESTS_PER_SECOND, settings.GEMINI_REQUEST_BURST
+)
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    return {"instagram": instagram_bucket.snapshot(), "gemini": gemini_bucket.snapshot()}
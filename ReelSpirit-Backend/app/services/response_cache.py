@@ -0,0 +1,193 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+import database
+import models
+from config import settings
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Önbellekteki bir yanıt: (gövde, ek başlıklar)
+CachedBody = Tuple[bytes, Dict[str, str]]
+Builder = Callable[[], Awaitable[Tuple[object, Dict[str, str]]]]
+
+class LocalBackend:
+    """
+    In-process LRU of serialized responses. The per-user version is sync_state.data_version,
+    which writers bump in their own transaction, so every process (uvicorn workers, the job
+    worker, manage.py) agrees on it and issues the same ETags. A read version is reused for
+    RESPONSE_CACHE_VERSION_TTL_SECONDS: a write from another process becomes visible within
+    that window, writes from this process (bump) immediately.
+    """
+
+    def __init__(self, max_entries: int, version_ttl: float = 1.0):
+        self.max_entries = max(1, max_entries)
+        self.version_ttl = version_ttl
+        # username -> (data_version, okunduğu an)
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        # bump() kayıt thread'lerinden çağrılır
+        self._lock = threading.Lock()
+
+    async def get_version(self, username: str) -> str:
+        now = time.monotonic()
+        with self._lock:
+            memo = self._versions.get(username)
+        if memo is None or now - memo[1] >= self.version_ttl:
+            async with database.AsyncSessionLocal() as db:
+                version = (await db.execute(
+                    select(models.SyncState.data_version).where(models.SyncState.username == username)
+                )).scalar() or 0
+            memo = (version, now)
+            with self._lock:
+                self._versions[username] = memo
+        return f"d{memo[0]}"
+
+    def bump(self, username: str):
+        # Sürüm DB'de kayıtla birlikte arttı; bir sonraki istek onu yeniden okur
+        with self._lock:
+            self._versions.pop(username, None)
+
+    async def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    async def set(self, key: str, value: CachedBody):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisBackend:
+    """
+    Shared backend for multi-instance deployments: every API process and scan worker
+    sees the same version counters. Entries expire after RESPONSE_CACHE_TTL_SECONDS;
+    stale versions are never read again, so no explicit purge is needed.
+    """
+
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio as redis_async
+
+        self._sync = redis.Redis.from_url(url)
+        self._async = redis_async.Redis.from_url(url)
+        self.ttl = settings.RESPONSE_CACHE_TTL_SECONDS
+
+    async def get_version(self, username: str) -> str:
+        value = await self._async.get(f"reelspirit:ver:{username}")
+        return f"r{int(value or 0)}"
+
+    def bump(self, username: str):
+        self._sync.incr(f"reelspirit:ver:{username}")
+
+    async def get(self, key: str) -> Optional[CachedBody]:
+        raw = await self._async.get(f"reelspirit:resp:{key}")
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        return payload["body"].encode("utf-8"), payload["headers"]
+
+    async def set(self, key: str, value: CachedBody):
+        body, headers = value
+        payload = json.dumps({"body": body.decode("utf-8"), "headers": headers})
+        await self._async.set(f"reelspirit:resp:{key}", payload, ex=self.ttl)
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.RESPONSE_CACHE_URL:
+            try:
+                _backend = RedisBackend(settings.RESPONSE_CACHE_URL)
+                logger.info("Response cache: shared Redis backend.")
+            except ImportError:
+                logger.warning("RESPONSE_CACHE_URL is set but the redis package is not installed; using in-process cache.")
+        if _backend is None:
+            _backend = LocalBackend(
+                settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_VERSION_TTL_SECONDS
+            )
+    return _backend
+
+def bump_version(username: str):
+    """
+    Invalidates every cached response of username in this process (and in Redis).
+    Called after rows are committed together with sync_state.bump_data_version;
+    a cache failure must never fail the write itself.
+    """
+    try:
+        get_backend().bump(username)
+    except Exception as e:
+        logger.error(f"[RESPONSE CACHE] {username} sürümü artırılamadı: {e}")
+
+def _request_key(request: Request) -> str:
+    # Parametre sırası önemsiz: ?a=1&b=2 ile ?b=2&a=1 aynı anahtar
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.netloc}{request.url.path}?{query}"
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+async def cached_json(request: Request, username: str, build: Builder) -> Response:
+    """
+    Serves a JSON response for username through the cache.
+    The strong ETag is derived from the user's data version and the request key,
+    so If-None-Match is answered with 304 without building the response (the version
+    itself is at most one primary-key read per RESPONSE_CACHE_VERSION_TTL_SECONDS). On a miss, build()
+    returns (content, extra headers) and the serialized body is stored.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        content, headers = await build()
+        return Response(content=_serialize(content), media_type="application/json", headers=headers)
+
+    backend = get_backend()
+    request_key = _request_key(request)
+    try:
+        version = await backend.get_version(username)
+    except Exception as e:
+        logger.error(f"[RESPONSE CACHE] sürüm okunamadı, önbellek atlanıyor: {e}")
+        content, headers = await build()
+        return Response(content=_serialize(content), media_type="application/json", headers=headers)
+
+    digest = hashlib.sha256(f"{username}\x1f{version}\x1f{request_key}".encode("utf-8")).hexdigest()
+    etag = f'"{digest[:32]}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    try:
+        cached = await backend.get(digest)
+    except Exception as e:
+        logger.error(f"[RESPONSE CACHE] okuma hatası: {e}")
+        cached = None
+
+    if cached is None:
+        content, headers = await build()
+        cached = (_serialize(content), headers)
+        try:
+            await backend.set(digest, cached)
+        except Exception as e:
+            logger.error(f"[RESPONSE CACHE] yazma hatası: {e}")
+
+    body, headers = cached
+    return Response(content=body, media_type="application/json", headers={**headers, **cache_headers})
+
+def _serialize(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import database
+from config import settings
+from services import telemetry
+from services.events import broker
+from services.ai_analyzer import analyze_instagram_posts, merge_analysis_with_posts
+from services.instagram import fetch_instagram_page, recommended_delay
+from services.post_store import save_posts_to_db
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Kuyruklarda "iş bitti" işareti
+_DONE = object()
+
+@dataclass
+class StageStats:
+    """Wall-clock accounting of one pipeline stage."""
+    name: str
+    workers: int = 1
+    items: int = 0
+    busy_seconds: float = 0.0
+    # Kuyrukta beklenen süre: girişte boş kuyruk (açlık), çıkışta dolu kuyruk (backpressure)
+    idle_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3)
+        }
+
+@dataclass
+class ScanReport:
+    username: str
+    pages: int = 0
+    posts: int = 0
+    inserted: int = 0
+    updated: int = 0
+    wall_seconds: float = 0.0
+    # Son ardışık kaydedilmiş sayfadan sonraki cursor (kaldığı yerden devam için)
+    resume_cursor: Optional[str] = None
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "username": self.username,
+            "pages": self.pages,
+            "posts": self.posts,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "stages": {name: s.as_dict() for name, s in self.stages.items()}
+        }
+
+@dataclass
+class _Page:
+    seq: int
+    posts: List[dict]
+    next_cursor: Optional[str]
+    counts: Dict[str, int] = field(default_factory=dict)
+
+ProgressCallback = Callable[[ScanReport], Awaitable[None]]
+# Sayfadaki postları süzer: (işlenecek postlar, taramayı burada bitir mi?)
+PageFilter = Callable[[List[dict]], Awaitable[Tuple[List[dict], bool]]]
+
+def _persist_page(username: str, final_data: list) -> Dict[str, int]:
+    """Runs in a worker thread with its own short-lived session."""
+    with database.SessionLocal() as db:
+        return save_posts_to_db(db, final_data, username)
+
+async def run_deep_scan(
+    username: str,
+    initial_cursor: Optional[str],
+    on_progress: Optional[ProgressCallback] = None,
+    page_filter: Optional[PageFilter] = None,
+    max_pages: Optional[int] = None
+) -> ScanReport:
+    """
+    Walks the remaining pages as a fetch -> analyze -> persist pipeline.
+    The next page is fetched while earlier ones are still in Gemini or being saved;
+    bounded queues between stages provide backpressure.
+    initial_cursor=None starts at the newest page.
+    on_progress is awaited after each page once every earlier page is saved too.
+    page_filter can drop posts from a page and stop the cursor walk (incremental sync).
+    max_pages stops after that many pages; report.resume_cursor then points at the rest.
+    """
+    analyze_workers = max(1, settings.SCAN_ANALYZE_WORKERS)
+    persist_workers = max(1, settings.SCAN_PERSIST_WORKERS)
+
+    report = ScanReport(username=username, resume_cursor=initial_cursor)
+    report.stages = {
+        "fetch": StageStats("fetch"),
+        "analyze": StageStats("analyze", workers=analyze_workers),
+        "persist": StageStats("persist", workers=persist_workers)
+    }
+    analyze_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.SCAN_PREFETCH_PAGES))
+    persist_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.SCAN_PERSIST_QUEUE_SIZE))
+
+    # Sayfalar sırasız kaydedilebilir; ilerleme sadece ardışık kısım için bildirilir
+    saved_pages: Dict[int, _Page] = {}
+    next_to_report = 0
+    analyzers_left = analyze_workers
+
+    async def timed_put(queue: asyncio.Queue, item, stats: StageStats):
+        started = time.perf_counter()
+        await queue.put(item)
+        stats.blocked_seconds += time.perf_counter() - started
+
+    async def timed_get(queue: asyncio.Queue, stats: StageStats):
+        started = time.perf_counter()
+        item = await queue.get()
+        stats.idle_seconds += time.perf_counter() - started
+        return item
+
+    async def fetch_stage():
+        stats = report.stages["fetch"]
+        cursor = initial_cursor
+        seq = 0
+        first_page = True
+        try:
+            while first_page or cursor:
+                first_page = False
+                started = time.perf_counter()
+                with telemetry.span("scan.fetch_page", username=username, page=seq + 1):
+                    posts, next_cursor = await fetch_instagram_page(username, cursor)
+                    if posts and page_filter:
+                        posts, stop = await page_filter(posts)
+                        if stop:
+                            next_cursor = None
+                elapsed = time.perf_counter() - started
+                stats.busy_seconds += elapsed
+                telemetry.PIPELINE_STAGE_SECONDS.labels("fetch").observe(elapsed)
+                if not posts and not next_cursor:
+                    break
+
+                stats.items += 1
+                broker.publish(username, {"event": "page_fetched", "page": seq + 1, "posts": len(posts)})
+                await timed_put(analyze_queue, _Page(seq, posts, next_cursor), stats)
+                seq += 1
+                cursor = next_cursor
+                if max_pages and seq >= max_pages:
+                    break
+
+                # Rate limit koruması (Graph API kullanım başlıklarına göre)
+                delay = recommended_delay()
+                if cursor and delay:
+                    await asyncio.sleep(delay)
+        finally:
+            for _ in range(analyze_workers):
+                await analyze_queue.put(_DONE)
+
+    async def analyze_stage():
+        nonlocal analyzers_left
+        stats = report.stages["analyze"]
+        try:
+            while True:
+                page = await timed_get(analyze_queue, stats)
+                if page is _DONE:
+                    break
+                started = time.perf_counter()
+                with telemetry.span("scan.analyze_page", username=username, page=page.seq + 1, posts=len(page.posts)):
+                    ai_results = await analyze_instagram_posts(page.posts)
+                    page.posts = merge_analysis_with_posts(page.posts, ai_results)
+                elapsed = time.perf_counter() - started
+                stats.busy_seconds += elapsed
+                telemetry.PIPELINE_STAGE_SECONDS.labels("analyze").observe(elapsed)
+                stats.items += 1
+                broker.publish(username, {"event": "posts_analyzed", "page": page.seq + 1, "posts": len(page.posts)})
+                await timed_put(persist_queue, page, stats)
+        finally:
+            analyzers_left -= 1
+            if analyzers_left == 0:
+                for _ in range(persist_workers):
+                    await persist_queue.put(_DONE)
+
+    async def persist_stage():
+        nonlocal next_to_report
+        stats = report.stages["persist"]
+        while True:
+            page = await timed_get(persist_queue, stats)
+            if page is _DONE:
+                break
+            started = time.perf_counter()
+            with telemetry.span("scan.persist_page", username=username, page=page.seq + 1):
+                page.counts = await asyncio.to_thread(_persist_page, username, page.posts)
+            elapsed = time.perf_counter() - started
+            stats.busy_seconds += elapsed
+            telemetry.PIPELINE_STAGE_SECONDS.labels("persist").observe(elapsed)
+            stats.items += 1
+
+            saved_pages[page.seq] = page
+            while next_to_report in saved_pages:
+                done = saved_pages.pop(next_to_report)
+                next_to_report += 1
+                report.pages += 1
+                report.posts += len(done.posts)
+                report.inserted += done.counts.get("inserted", 0)
+                report.updated += done.counts.get("updated", 0)
+                report.resume_cursor = done.next_cursor
+                report.wall_seconds = time.perf_counter() - wall_started
+                broker.publish(username, {
+                    "event": "posts_saved",
+                    "page": done.seq + 1,
+                    "inserted": done.counts.get("inserted", 0),
+                    "updated": done.counts.get("updated", 0)
+                })
+                if on_progress:
+                    await on_progress(report)
+
+    wall_started = time.perf_counter()
+    tasks = [asyncio.create_task(fetch_stage())]
+    tasks += [asyncio.create_task(analyze_stage()) for _ in range(analyze_workers)]
+    tasks += [asyncio.create_task(persist_stage()) for _ in range(persist_workers)]
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Bir aşama çökerse diğerleri kuyrukta sonsuza kadar beklemesin
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        report.wall_seconds = time.perf_counter() - wall_started
+
+    logger.info(
+        f"[PIPELINE] {username}: {report.pages} pages, {report.posts} posts in "
+        f"{report.wall_seconds:.1f}s | "
+        + " | ".join(
+            f"{name} busy={s.busy_seconds:.1f}s idle={s.idle_seconds:.1f}s blocked={s.blocked_seconds:.1f}s"
+            for name, s in report.stages.items()
+        )
+    )
+    return report
@@ -0,0 +1,184 @@
+"""
+In-process refresh scheduler for tracked creators (no external cron).
+
+The watchlist is sync_state.watched. Every SCHEDULER_INTERVAL_SECONDS one process
+(PostgreSQL advisory lock) picks the due creators by
+    priority = hours since last sync * (1 + reads since last sync)
+and queues incremental scans for them, within SCHEDULER_REFRESHES_PER_HOUR
+(its own jobs, counted over every worker from scan_jobs) and below SCHEDULER_MAX_ACTIVE_JOBS.
+Dashboard loads are counted in memory on the hot path and flushed once per tick.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import database
+import models
+from config import settings
+from services import job_queue
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+_LOCK_KEY = "reelspirit:scheduler"
+# Hiç senkronize edilmemiş (elle eklenmiş) kullanıcılar en bayat kabul edilir
+_NEVER_SYNCED_HOURS = 24 * 365
+
+# --- OKUMA SAYACI ---
+# Dashboard açılışları (/stats?view=true) DB'ye yazmadan sayılır
+_pending_views: Counter = Counter()
+
+def record_view(username: str):
+    _pending_views[username] += 1
+
+def flush_views(db: Session) -> int:
+    """Adds the in-memory read counts to sync_state (one executemany UPDATE)."""
+    if not _pending_views:
+        return 0
+    views = dict(_pending_views)
+    _pending_views.clear()
+
+    now = datetime.utcnow()
+    State = models.SyncState
+    for username, count in views.items():
+        db.execute(
+            update(State)
+            .where(State.username == username)
+            .values(views_since_sync=State.views_since_sync + count, last_viewed_at=now)
+        )
+    db.commit()
+    return len(views)
+
+# --- İZLEME LİSTESİ ---
+
+def watch(db: Session, usernames: List[str]) -> int:
+    """Adds usernames to the watchlist; unknown ones get a state row and are refreshed first."""
+    added = 0
+    for username in dict.fromkeys(usernames):
+        state = db.get(models.SyncState, username)
+        if state is None:
+            db.add(models.SyncState(username=username, watched=True, views_since_sync=0))
+            added += 1
+        elif not state.watched:
+            state.watched = True
+            added += 1
+    db.commit()
+    return added
+
+def unwatch(db: Session, username: str) -> bool:
+    state = db.get(models.SyncState, username)
+    if state is None or not state.watched:
+        return False
+    state.watched = False
+    db.commit()
+    return True
+
+def _priority(state: models.SyncState, now: datetime) -> float:
+    if state.last_synced_at is None:
+        hours = _NEVER_SYNCED_HOURS
+    else:
+        hours = (now - state.last_synced_at).total_seconds() / 3600
+    return hours * (1 + (state.views_since_sync or 0))
+
+def get_watchlist(db: Session, limit: int = 100) -> List[Dict[str, object]]:
+    """Watched creators in refresh order, with their staleness and demand."""
+    now = datetime.utcnow()
+    states = db.execute(
+        select(models.SyncState).where(models.SyncState.watched.is_(True))
+    ).scalars().all()
+    rows = []
+    for state in sorted(states, key=lambda s: _priority(s, now), reverse=True)[:limit]:
+        rows.append({
+            "username": state.username,
+            "last_synced_at": state.last_synced_at,
+            "views_since_sync": state.views_since_sync,
+            "last_viewed_at": state.last_viewed_at,
+            "priority": round(_priority(state, now), 2)
+        })
+    return rows
+
+def remaining_budget(db: Session) -> int:
+    """Refreshes left this hour; only jobs the scheduler queued count (not user refreshes or batches)."""
+    since = datetime.utcnow() - timedelta(hours=1)
+    used = db.execute(
+        select(func.count(models.ScanJob.id)).where(
+            models.ScanJob.origin == "scheduler",
+            models.ScanJob.created_at >= since
+        )
+    ).scalar() or 0
+    return max(0, settings.SCHEDULER_REFRESHES_PER_HOUR - used)
+
+def pick_due(db: Session, limit: int) -> List[str]:
+    """The `limit` stalest / most-read watched creators without an active job."""
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    stale_before = now - timedelta(hours=settings.SCHEDULER_MIN_STALENESS_HOURS)
+    State = models.SyncState
+
+    active = select(models.ScanJob.username).where(models.ScanJob.status.in_(job_queue.ACTIVE_STATUSES))
+    states = db.execute(
+        select(State).where(
+            State.watched.is_(True),
+            (State.last_synced_at.is_(None)) | (State.last_synced_at < stale_before),
+            State.username.not_in(active)
+        )
+    ).scalars().all()
+    ranked = sorted(states, key=lambda s: _priority(s, now), reverse=True)
+    return [state.username for state in ranked[:limit]]
+
+def schedule_refreshes(db: Session) -> List[str]:
+    """One scheduler tick: queue incremental scans for the most urgent creators."""
+    active = db.execute(
+        select(func.count(models.ScanJob.id)).where(models.ScanJob.status.in_(job_queue.ACTIVE_STATUSES))
+    ).scalar() or 0
+    slots = min(remaining_budget(db), settings.SCHEDULER_MAX_ACTIVE_JOBS - active)
+
+    queued = []
+    for username in pick_due(db, slots):
+        _, created = job_queue.enqueue_scan(db, username, None, mode="incremental", origin="scheduler")
+        if created:
+            queued.append(username)
+    if queued:
+        logger.info(f"[SCHEDULER] {len(queued)} kullanıcı yenileme için kuyruğa alındı: {', '.join(queued)}")
+    return queued
+
+# --- DÖNGÜ ---
+
+def _in_session(fn):
+    with database.SessionLocal() as db:
+        return fn(db)
+
+async def run_tick() -> List[str]:
+    await asyncio.to_thread(_in_session, flush_views)
+    # Birden fazla worker varsa turu sadece kilidi alan planlar
+    async with database.try_advisory_lock(_LOCK_KEY) as acquired:
+        if not acquired:
+            return []
+        return await asyncio.to_thread(_in_session, schedule_refreshes)
+
+async def scheduler_loop():
+    logger.info("[SCHEDULER] başladı.")
+    while True:
+        await asyncio.sleep(settings.SCHEDULER_INTERVAL_SECONDS)
+        try:
+            await run_tick()
+        except Exception as e:
+            logger.error(f"[SCHEDULER] tur hatası: {e}")
+
+def start_scheduler() -> Optional[asyncio.Task]:
+    if not settings.SCHEDULER_ENABLED:
+        return None
+    return asyncio.create_task(scheduler_loop())
+
+async def stop_scheduler(task: Optional[asyncio.Task]):
+    if task is None:
+        return
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    # Son okuma sayıları kaybolmasın
+    await asyncio.to_thread(_in_session, flush_views)
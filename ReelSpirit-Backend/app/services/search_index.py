@@ -0,0 +1,179 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import desc, func, literal_column, select, text
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+FACET_FIELDS = ("drink_category", "ai_category", "username")
+RESULT_FIELDS = (
+    "instagram_id", "username", "caption", "media_type", "media_url", "permalink",
+    "post_timestamp", "ai_category", "ai_summary", "drink_category"
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Sorgudan atılan bağlaçlar ("vodka cocktails with espresso" -> vodka, cocktails, espresso)
+_STOP_WORDS = frozenset({
+    "a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or",
+    "ve", "ile", "bir", "veya", "için", "da", "de"
+})
+
+# Tek IN (...) sorgusunda gönderilecek en fazla id (SQLite parametre limiti için)
+_CHUNK_SIZE = 500
+
+def query_terms(q: str) -> List[str]:
+    """Lower-cased word tokens without stop words; only \\w characters survive, so no quoting issues."""
+    terms = [t for t in _TOKEN_RE.findall(q.lower()) if t not in _STOP_WORDS]
+    # Sadece bağlaçtan oluşan sorgu boş kalmasın
+    return terms or _TOKEN_RE.findall(q.lower())
+
+def _fts_ready(db: Session) -> bool:
+    """True when the SQLite FTS5 table exists (it is created together with instagram_posts)."""
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": models.SQLITE_FTS_TABLE}
+    ).first() is not None
+
+# --- İNDEKS BAKIMI ---
+
+def index_posts(db: Session, instagram_ids: Iterable[str]):
+    """
+    Re-indexes the given posts after they were inserted or their AI fields refreshed.
+    Runs inside the caller's transaction. PostgreSQL maintains its GIN index on write,
+    so only SQLite has work to do here.
+    """
+    ids = list(instagram_ids)
+    if not ids or db.get_bind().dialect.name != "sqlite" or not _fts_ready(db):
+        return
+
+    fts = models.SQLITE_FTS_TABLE
+    for start in range(0, len(ids), _CHUNK_SIZE):
+        chunk = ids[start:start + _CHUNK_SIZE]
+        params = {f"id{i}": insta_id for i, insta_id in enumerate(chunk)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        db.execute(text(
+            f"DELETE FROM {fts} WHERE rowid IN "
+            f"(SELECT id FROM instagram_posts WHERE instagram_id IN ({placeholders}))"
+        ), params)
+        db.execute(text(
+            f"INSERT INTO {fts} (rowid, caption, ai_summary) "
+            f"SELECT id, coalesce(caption, ''), coalesce(ai_summary, '') "
+            f"FROM instagram_posts WHERE instagram_id IN ({placeholders})"
+        ), params)
+
+def rebuild(db: Session) -> int:
+    """Rebuilds the SQLite FTS table from instagram_posts (e.g. for a database created before search existed)."""
+    dialect = db.get_bind().dialect.name
+    total = db.execute(select(func.count(models.InstagramPost.id))).scalar() or 0
+    if dialect == "sqlite":
+        fts = models.SQLITE_FTS_TABLE
+        # Arama öncesinde oluşturulmuş veritabanlarında tablo henüz yok
+        db.execute(text(models.SQLITE_FTS_DDL))
+        db.execute(text(f"DELETE FROM {fts}"))
+        db.execute(text(
+            f"INSERT INTO {fts} (rowid, caption, ai_summary) "
+            f"SELECT id, coalesce(caption, ''), coalesce(ai_summary, '') FROM instagram_posts"
+        ))
+        db.commit()
+    elif dialect == "postgresql":
+        db.execute(text("REINDEX INDEX ix_instagram_posts_search"))
+        db.commit()
+    logger.info(f"Arama indeksi yeniden oluşturuldu: {total} post.")
+    return total
+
+# --- ARAMA ---
+
+def _match(db: Session, terms: List[str]):
+    """Returns (subquery of matching (id, score), ascending?) for the current dialect."""
+    dialect = db.get_bind().dialect.name
+    Post = models.InstagramPost
+
+    if dialect == "postgresql":
+        # Son kelime dahil her terim ön ek olarak eşleşir: "cocktail" -> cocktails
+        tsquery = func.to_tsquery(
+            text(f"'{models.SEARCH_TS_CONFIG}'::regconfig"), " & ".join(f"{t}:*" for t in terms)
+        )
+        document = models.search_document(Post.caption, Post.ai_summary)
+        score = func.ts_rank_cd(document, tsquery)
+        return select(Post.id.label("post_id"), score.label("score")).where(document.op("@@")(tsquery)), False
+
+    if dialect == "sqlite" and _fts_ready(db):
+        fts = models.SQLITE_FTS_TABLE
+        # bm25: küçük değer daha alakalı
+        return select(
+            literal_column("rowid").label("post_id"), literal_column(f"bm25({fts})").label("score")
+        ).select_from(text(fts)).where(
+            text(f"{fts} MATCH :fts_query").bindparams(fts_query=" ".join(f'"{t}"*' for t in terms))
+        ), True
+
+    # İndeks yoksa: sıralamasız ILIKE taraması
+    logger.warning("Arama indeksi yok; ILIKE taramasına düşülüyor.")
+    query = select(Post.id.label("post_id"), literal_column("0").label("score"))
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.where(Post.caption.ilike(pattern) | Post.ai_summary.ilike(pattern))
+    return query, True
+
+def search(
+    db: Session,
+    q: str,
+    username: Optional[str] = None,
+    drink_category: Optional[str] = None,
+    ai_category: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, object]:
+    """
+    Ranked full-text search over caption + ai_summary with facet counts.
+    Facets are computed over every match (before limit/offset) and respect the filters.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return {"query": q, "terms": [], "total": 0, "results": [], "facets": {f: [] for f in FACET_FIELDS}}
+
+    Post = models.InstagramPost
+    match_query, ascending = _match(db, terms)
+    matches = match_query.subquery("matches")
+
+    base = select(Post).join(matches, matches.c.post_id == Post.id)
+    if username:
+        base = base.where(Post.username == username)
+    if drink_category:
+        base = base.where(Post.drink_category == drink_category)
+    if ai_category:
+        base = base.where(Post.ai_category == ai_category)
+
+    columns = [getattr(Post, f) for f in RESULT_FIELDS]
+    order = matches.c.score if ascending else desc(matches.c.score)
+    rows = db.execute(
+        base.with_only_columns(*columns, matches.c.score)
+        .order_by(order, Post.post_timestamp.desc().nullslast(), Post.id.desc())
+        .limit(limit).offset(offset)
+    ).all()
+
+    total = db.execute(base.with_only_columns(func.count())).scalar() or 0
+
+    facets = {}
+    for field in FACET_FIELDS:
+        column = getattr(Post, field)
+        count = func.count().label("count")
+        facet_rows = db.execute(
+            base.with_only_columns(column, count)
+            .group_by(column)
+            .order_by(count.desc(), column)
+            .limit(settings.SEARCH_FACET_LIMIT)
+        ).all()
+        facets[field] = [{"value": value, "count": n} for value, n in facet_rows]
+
+    results = []
+    for row in rows:
+        item = {f: getattr(row, f) for f in RESULT_FIELDS}
+        item["score"] = round(abs(float(row.score or 0)), 4)
+        results.append(item)
+
+    return {"query": q, "terms": terms, "total": total, "results": results, "facets": facets}
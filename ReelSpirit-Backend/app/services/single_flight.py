@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key in this process: the first caller
+    runs the work, later callers await the same task and receive the same result
+    (or the same exception). The key is forgotten as soon as the work finishes,
+    so nothing is cached beyond the calls that overlapped.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Metrik: işi yapan / bekleyen çağrı sayısı
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(work())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.followers += 1
+            logger.info(f"{self.name}: {key} zaten işleniyor, aynı sonuç bekleniyor.")
+        # shield: istemcisi kopan bir çağrı işi diğer bekleyenler için iptal etmez
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {"inflight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
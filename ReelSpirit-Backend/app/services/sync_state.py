@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import database
+import models
+from utils import setup_logger, parse_timestamp
+
+logger = setup_logger(__name__)
+
+def get_high_water_mark(db: Session, username: str, fallback_to_posts: bool = True) -> Optional[datetime]:
+    """
+    Timestamp of the newest stored post; falls back to the posts table if no state row exists.
+    A resumed scan passes fallback_to_posts=False: its own earlier pages are in the table
+    but the mark must still be the one from before the scan started.
+    """
+    state = db.get(models.SyncState, username)
+    if state and state.newest_timestamp:
+        return state.newest_timestamp
+    if not fallback_to_posts:
+        return None
+
+    return db.execute(
+        select(models.InstagramPost.post_timestamp)
+        .where(models.InstagramPost.username == username)
+        .order_by(models.InstagramPost.post_timestamp.desc().nullslast())
+        .limit(1)
+    ).scalar()
+
+def bump_data_version(db: Session, usernames: List[str]):
+    """
+    Increments data_version of every username in the caller's transaction, so the
+    new version commits together with the rows it describes. Every API process reads
+    it (response_cache), including processes that did not make the write.
+    """
+    State = models.SyncState
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_fn(State)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["username"], set_={"data_version": State.data_version + 1}
+            ),
+            [{"username": username, "data_version": 1} for username in usernames]
+        )
+        return
+    for username in usernames:
+        updated = db.execute(
+            update(State).where(State.username == username).values(data_version=State.data_version + 1)
+        ).rowcount
+        if not updated:
+            db.add(State(username=username, data_version=1))
+    db.flush()
+
+def mark_synced(db: Session, username: str):
+    """Moves the high-water mark to the newest stored post and stamps last_synced_at."""
+    newest = db.execute(
+        select(models.InstagramPost.instagram_id, models.InstagramPost.post_timestamp)
+        .where(
+            models.InstagramPost.username == username,
+            models.InstagramPost.post_timestamp.isnot(None)
+        )
+        .order_by(models.InstagramPost.post_timestamp.desc().nullslast())
+        .limit(1)
+    ).first()
+
+    state = db.get(models.SyncState, username)
+    if state is None:
+        state = models.SyncState(username=username)
+        db.add(state)
+
+    if newest:
+        state.newest_instagram_id, state.newest_timestamp = newest
+    state.last_synced_at = datetime.utcnow()
+    # Talep sayacı bir sonraki yenilemeye kadar yeniden birikir
+    state.views_since_sync = 0
+    db.commit()
+
+def _known_ids(username: str, ids: List[str]) -> set:
+    with database.SessionLocal() as db:
+        return set(db.execute(
+            select(models.InstagramPost.instagram_id).where(
+                models.InstagramPost.username == username,
+                models.InstagramPost.instagram_id.in_(ids)
+            )
+        ).scalars())
+
+def make_page_filter(username: str, high_water_mark: Optional[datetime]):
+    """
+    Page filter for run_deep_scan: keeps only unseen posts and stops paging once
+    the page reaches posts at or below the high-water mark (media comes newest-first).
+    """
+    async def page_filter(posts: List[dict]) -> Tuple[List[dict], bool]:
+        ids = [str(p.get('id')) for p in posts if p.get('id')]
+        known = await asyncio.to_thread(_known_ids, username, ids)
+        fresh = [p for p in posts if str(p.get('id')) not in known]
+
+        reached_known = bool(known)
+        if high_water_mark is not None:
+            reached_known = reached_known or any(
+                (parse_timestamp(p.get('timestamp')) or datetime.max) <= high_water_mark
+                for p in posts
+            )
+
+        if reached_known:
+            logger.info(f"[SYNC] {username}: bilinen postlara ulaşıldı, {len(fresh)} yeni post.")
+        return fresh, reached_known
+
+    return page_filter
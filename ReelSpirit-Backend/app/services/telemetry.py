@@ -0,0 +1,151 @@
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from config import settings
+from utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# --- PROMETHEUS METRİKLERİ ---
+# Graph API sayfası ~0.2-2s, Gemini batch'i saniyeler-dakika, DB kaydı milisaniyeler sürer
+_FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+INSTAGRAM_FETCH_SECONDS = Histogram(
+    "reelspirit_instagram_fetch_seconds",
+    "fetch_instagram_page latency, retries included",
+    ["outcome"],
+    buckets=_SLOW_BUCKETS
+)
+INSTAGRAM_RETRIES = Counter(
+    "reelspirit_instagram_retries_total",
+    "Graph API requests retried after a rate limit or connection error"
+)
+GEMINI_CALL_SECONDS = Histogram(
+    "reelspirit_gemini_call_seconds",
+    "Latency of one Gemini generate_content call",
+    ["outcome"],
+    buckets=_SLOW_BUCKETS
+)
+GEMINI_TOKENS = Histogram(
+    "reelspirit_gemini_tokens",
+    "Tokens per Gemini call as reported by usage metadata",
+    ["kind"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+DB_SAVE_SECONDS = Histogram(
+    "reelspirit_db_save_seconds",
+    "save_posts_to_db duration",
+    buckets=_FAST_BUCKETS
+)
+DB_ROWS = Counter(
+    "reelspirit_db_rows_total",
+    "Rows written by save_posts_to_db",
+    ["result"]
+)
+ANALYSIS_POSTS = Counter(
+    "reelspirit_analysis_posts_total",
+    "Analyzed posts by the tier that produced the result (fallback rate = fallback / all)",
+    ["tier"]
+)
+MEDIA_CACHE = Counter(
+    "reelspirit_media_cache_total",
+    "Media cache lookups and downloads (hit, download, coalesced, error, evicted)",
+    ["result"]
+)
+MEDIA_DOWNLOAD_SECONDS = Histogram(
+    "reelspirit_media_download_seconds",
+    "Thumbnail download latency",
+    buckets=_FAST_BUCKETS
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "reelspirit_pipeline_stage_seconds",
+    "Busy time per page in each deep-scan stage",
+    ["stage"],
+    buckets=_SLOW_BUCKETS
+)
+SCANS_IN_FLIGHT = Gauge(
+    "reelspirit_scans_in_flight",
+    "Scan jobs currently running in this process"
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "reelspirit_http_request_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=_FAST_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "reelspirit_http_requests_in_flight",
+    "API requests being served"
+)
+BREAKER_STATE = Gauge(
+    "reelspirit_gemini_breaker_state",
+    "Gemini circuit breaker state (0 closed, 1 half-open, 2 open)"
+)
+BREAKER_REJECTED = Gauge(
+    "reelspirit_gemini_breaker_rejected_calls",
+    "Gemini calls refused by the open circuit since start"
+)
+
+def render_metrics():
+    """Returns (body, content type) in the Prometheus text format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+# --- OPENTELEMETRY (opsiyonel) ---
+# Paket kurulu değilse veya OTEL_ENABLED kapalıysa span'ler no-op'tur
+_tracer = None
+
+def setup_tracing():
+    """
+    Installs a tracer provider exporting over OTLP. Endpoint and headers come from
+    the standard OTEL_EXPORTER_OTLP_* environment variables.
+    """
+    global _tracer
+    if not settings.OTEL_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry-sdk / otlp exporter are not installed.")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("reelspirit")
+    logger.info("OpenTelemetry tracing enabled.")
+
+def shutdown_tracing():
+    global _tracer
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    _tracer = None
+
+def span(name: str, **attributes):
+    """Context manager for one traced stage; attributes with None values are skipped."""
+    if _tracer is None:
+        return nullcontext()
+    return _start_span(name, attributes)
+
+@contextmanager
+def _start_span(name: str, attributes: dict):
+    with _tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        yield current
+
+def set_span_attribute(current, key: str, value: Optional[object]):
+    """Sets an attribute on a span returned by span(); no-op when tracing is off."""
+    if current is not None and value is not None:
+        current.set_attribute(key, value)
@@ -0,0 +1,100 @@
+"""
+Shared test fixtures. Tests run offline: the Graph API is served by
+tests.fakes.ReplayTransport, Gemini by tests.fakes.FakeGemini, and every test that
+needs a database gets a fresh, migrated SQLite file.
+
+Run from the app directory:
+    python -m pytest
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Ayarlar ilk import'ta okunur; uygulama modüllerinden önce
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+# DB'siz testler de (ör. etiket tablosu okuması) çalışma dizinindeki reelspirit.db'ye dokunmasın
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='reelspirit-tests-')}/unit.db")
+
+import pytest
+
+import database
+from config import settings
+
+def _dispose_engines():
+    database.dispose_engine()
+    asyncio.run(database.dispose_async_engine())
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Points both engines at a new SQLite file and applies every migration."""
+    import migrations
+    from services import categories, rate_limit, response_cache
+
+    _dispose_engines()
+    # Veriden eklenen etiketler önceki testin veritabanına aitti
+    for vocabulary in (categories.DRINK, categories.AI, categories.MEDIA):
+        vocabulary.reset_extra()
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(settings, "ASYNC_DATABASE_URL", None)
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 0.02)
+    # Kayıtlı sayfalar ve sahte model bedava; kovalar testleri yavaşlatmasın
+    monkeypatch.setattr(rate_limit.instagram_bucket, "rate", 0)
+    monkeypatch.setattr(rate_limit.gemini_bucket, "rate", 0)
+    monkeypatch.setattr(response_cache, "_backend", None)
+    migrations.migrate()
+    yield settings.DATABASE_URL
+    _dispose_engines()
+
+@pytest.fixture
+def offline(fresh_db, monkeypatch):
+    """
+    The app wired to replayed Graph API pages and a FakeGemini, with a fresh breaker
+    and Gemini semaphore. harness.gemini can be replaced before the first call.
+    """
+    from types import SimpleNamespace
+
+    from tests.fakes import FakeGemini, ReplayTransport, synthesize_fixtures
+    from routers import analysis
+    from services import ai_analyzer, circuit_breaker, instagram
+    from services.single_flight import SingleFlight
+
+    fixtures = synthesize_fixtures(2, 2, per_page=10, seed=1)
+    breaker = circuit_breaker.CircuitBreaker(
+        "gemini", window=20, min_calls=5, failure_rate=0.5, slow_call_seconds=30.0,
+        slow_call_rate=0.8, open_seconds=30.0, half_open_probes=1
+    )
+    monkeypatch.setattr(ai_analyzer, "gemini_breaker", breaker)
+    monkeypatch.setattr(ai_analyzer, "_gemini_semaphore", None)
+    monkeypatch.setattr(ai_analyzer, "_cache_checked", False)
+    monkeypatch.setattr(analysis, "analyze_flight", SingleFlight("analyze"))
+    harness = SimpleNamespace(
+        fixtures=fixtures,
+        usernames=sorted(fixtures),
+        gemini=FakeGemini(),
+        breaker=breaker
+    )
+    transport = ReplayTransport(fixtures)
+    harness.graph = transport
+    instagram.set_default_transport(transport)
+    ai_analyzer.set_genai_client(harness.gemini)
+
+    def use_gemini(client):
+        harness.gemini = client
+        ai_analyzer.set_genai_client(client)
+
+    harness.use_gemini = use_gemini
+    yield harness
+    asyncio.run(instagram.close_client())
+    instagram.set_default_transport(None)
+    ai_analyzer.set_genai_client(None)
+
+def app_client():
+    """An httpx client bound to a fresh app (no lifespan: no workers, no scheduler)."""
+    import httpx
+
+    from main import create_app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://test")
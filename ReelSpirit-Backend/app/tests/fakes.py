@@ -0,0 +1,280 @@
+"""
+Test doubles shared by the unit tests: a replayed Graph API, a media server, a
+deterministic fake Gemini, synthetic posts and a DB statement counter.
+
+These are owned by the tests; bench/ keeps its own copies for the benchmarks, so a
+change to a benchmark cannot silently change what a test exercises.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import event
+
+import database
+import models
+from services.keyword_classifier import classify_caption
+
+_USERNAME_RE = re.compile(r"business_discovery\.username\(([^)]+)\)")
+_CURSOR_RE = re.compile(r"media\.after\(([^)]+)\)")
+
+# username -> {cursor ("" = ilk sayfa) -> Graph API yanıt gövdesi}
+Fixtures = Dict[str, Dict[str, dict]]
+
+_WORDS = (
+    "gin tonic", "negroni with 3cl gin", "old fashioned whiskey", "rakı balık", "şarap tadımı",
+    "espresso martini", "craft beer ipa", "vodka sour", "margarita tequila", "baileys coffee",
+    "sunset", "new outfit", "fashion week", "travel diaries", "street food", "concert night",
+    "recipe", "mix it", "cheers", "weekend"
+)
+
+# --- GRAPH API ---
+
+def synthesize_fixtures(profiles: int, pages: int, per_page: int = 25, seed: int = 0) -> Fixtures:
+    """Deterministic profiles as Graph API business_discovery pages (newest page first)."""
+    rng = random.Random(seed)
+    fixtures: Fixtures = {}
+    start = datetime(2025, 1, 1)
+    for p in range(profiles):
+        username = f"bench_{seed}_{p}"
+        posts = [
+            {
+                "id": f"{username}_{i}",
+                "caption": " ".join(rng.sample(_WORDS, 3)) + f" #{i}",
+                "media_type": "IMAGE",
+                "media_url": f"https://example.invalid/{username}/{i}.jpg",
+                "permalink": f"https://instagram.com/p/{username}_{i}",
+                "timestamp": (start - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S+0000")
+            }
+            for i in range(pages * per_page)
+        ]
+        profile_pages = {}
+        for n in range(pages):
+            paging = {"cursors": {"after": f"c{n + 1}"}} if n + 1 < pages else {}
+            profile_pages["" if n == 0 else f"c{n}"] = {
+                "business_discovery": {
+                    "media": {"data": posts[n * per_page:(n + 1) * per_page], "paging": paging}
+                },
+                "id": "0"
+            }
+        fixtures[username] = profile_pages
+    return fixtures
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves fixture pages by (username, after cursor); unknown profiles get error 110."""
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        fields = request.url.params.get("fields", "")
+        username = _USERNAME_RE.search(fields)
+        cursor = _CURSOR_RE.search(fields)
+        username = username.group(1) if username else ""
+        page = self.fixtures.get(username, {}).get(cursor.group(1) if cursor else "")
+        if page is None:
+            return httpx.Response(
+                400,
+                json={"error": {"message": f"Invalid user id: {username}", "type": "OAuthException", "code": 110}},
+                request=request
+            )
+        return httpx.Response(200, json=page, request=request)
+
+class MediaFixtureTransport(httpx.AsyncBaseTransport):
+    """Serves media downloads from a directory by the URL's last path segment; 404 if missing."""
+
+    def __init__(self, directory: str, latency: float = 0.0):
+        self.directory = Path(directory)
+        self.latency = latency
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = self.directory / Path(request.url.path).name
+        if not path.is_file():
+            return httpx.Response(404, request=request)
+        return httpx.Response(200, content=path.read_bytes(), request=request)
+
+# --- GEMINI ---
+
+class FakeGemini:
+    """
+    Stands in for genai.Client (client.aio.models.generate_content). Answers come from the
+    keyword classifier; image prompts are classified from the image bytes read as text.
+    Jitter, error and drop decisions are derived from a hash of the prompt, so runs are
+    reproducible.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 drop_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.calls = 0
+        self.errors = 0
+        self.image_calls = 0
+        self.aio = SimpleNamespace(models=self)
+
+    async def generate_content(self, model: str, contents, config=None):
+        self.calls += 1
+        images = {}
+        if isinstance(contents, list):
+            # [prompt, "proxy_id: X", görsel, "proxy_id: Y", görsel, ...]
+            self.image_calls += 1
+            for label, part in zip(contents[1::2], contents[2::2]):
+                images[label.split(": ", 1)[1]] = part.inline_data.data.decode("utf-8", "ignore")
+            contents = contents[0]
+        rng = random.Random(hashlib.sha256(f"{self.seed}\x1f{contents}".encode("utf-8")).digest())
+
+        await asyncio.sleep(max(0.0, self.latency * (1 + rng.uniform(-self.jitter, self.jitter))))
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            raise RuntimeError("Fake Gemini: 503 UNAVAILABLE")
+
+        answers = [
+            {"proxy_id": item["proxy_id"], **classify_caption(images.get(item["proxy_id"], item["text"]))}
+            for item in json.loads(contents.split("DATA:\n", 1)[1])
+            if rng.random() >= self.drop_rate
+        ]
+        text = json.dumps(answers, ensure_ascii=False)
+        usage = SimpleNamespace(prompt_token_count=len(contents) // 4, candidates_token_count=len(text) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+# --- VERİTABANI ---
+
+def synthetic_posts(count: int, username: str = "bench_user", offset: int = 0) -> List[dict]:
+    """Analyzed Graph API items as they reach save_posts_to_db (newest first)."""
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "id": f"{username}_{i}",
+            "caption": f"negroni with 3cl gin #{i}",
+            "media_type": "VIDEO",
+            "media_url": f"https://example.invalid/{username}/{i}.jpg",
+            "permalink": f"https://instagram.com/p/{username}_{i}",
+            "timestamp": (start - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            "ai_category": "Gastronomy",
+            "ai_summary": "Gin cocktail recipe.",
+            "drink_category": "Gin Cocktail"
+        }
+        for i in range(offset, offset + count)
+    ]
+
+def seed_export_rows(count: int, username: str = "bench_user", chunk: int = 50_000):
+    """Inserts count posts straight into instagram_posts (no stats or search index)."""
+    table = models.InstagramPost.__table__
+    start = datetime(2025, 1, 1)
+    with database.get_engine().begin() as conn:
+        for offset in range(0, count, chunk):
+            conn.execute(table.insert(), [
+                {
+                    "instagram_id": f"{username}_{i}",
+                    "username": username,
+                    "caption": f"negroni with 3cl gin #{i}",
+                    "media_type": "VIDEO",
+                    "media_url": f"https://example.invalid/{username}/{i}.jpg",
+                    "permalink": f"https://instagram.com/p/{username}_{i}",
+                    "post_timestamp": start - timedelta(minutes=i),
+                    "ai_category": "Gastronomy",
+                    "ai_summary": "Gin cocktail recipe.",
+                    "drink_category": "Gin Cocktail"
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ])
+
+class QueryCounter:
+    """Counts statements sent to the DB by both the sync and the async engine."""
+
+    def __init__(self):
+        self.count = 0
+        self._engines = [database.get_engine(), database.get_async_engine().sync_engine]
+        for engine in self._engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def close(self):
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+# --- HTTP ---
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux /proc; elsewhere the peak from getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            import os
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+async def drain_export(app, path: str, accept_encoding: str = "") -> Dict[str, object]:
+    """
+    Calls the ASGI app directly and discards the body as it streams, sampling RSS per
+    chunk; nothing is buffered on the client side, so the growth is the server's.
+    """
+    import zlib
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": headers, "client": ("127.0.0.1", 1), "server": ("test", 80), "root_path": ""
+    }
+    baseline = _rss_bytes()
+    state = {"status": None, "encoding": None, "bytes": 0, "lines": 0, "peak": baseline}
+    decoder = zlib.decompressobj(31)
+    requested, done = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # İstemci yanıt bitene kadar bağlı kalır
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+            state["encoding"] = dict(message["headers"]).get(b"content-encoding", b"").decode() or None
+            return
+        body = message.get("body", b"")
+        state["bytes"] += len(body)
+        text = decoder.decompress(body) if state["encoding"] == "gzip" else body
+        state["lines"] += text.count(b"\n")
+        state["peak"] = max(state["peak"], _rss_bytes())
+        if not message.get("more_body", False):
+            done.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return {
+        "status": state["status"],
+        "encoding": state["encoding"],
+        "lines": state["lines"],
+        "body_mb": round(state["bytes"] / 2 ** 20, 1),
+        "seconds": round(time.perf_counter() - started, 2),
+        "rss_growth_mb": round((state["peak"] - baseline) / 2 ** 20, 1)
+    }
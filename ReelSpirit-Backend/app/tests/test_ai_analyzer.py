@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from config import settings
+from services import ai_analyzer
+from services.keyword_classifier import classify_caption
+from tests.fakes import FakeGemini
+
+def _items(count, text="negroni with 3cl gin"):
+    return [{"proxy_id": f"REF_{i}", "text": text} for i in range(count)]
+
+def test_pack_batches_respects_budget_and_item_cap():
+    items = _items(10, "x" * 400)
+    cost = ai_analyzer.estimate_tokens("x" * 400)
+    batches = ai_analyzer.pack_batches(items, token_budget=cost * 3, max_items=50)
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [item for batch in batches for item in batch] == items
+
+    assert [len(batch) for batch in ai_analyzer.pack_batches(items, 10**9, 4)] == [4, 4, 2]
+    # Bütçeden büyük tek öğe kendi batch'ine düşer, atlanmaz
+    assert ai_analyzer.pack_batches(_items(1, "x" * 8000), 100, 50) == [_items(1, "x" * 8000)]
+
+class RecordingGemini(FakeGemini):
+    """FakeGemini that remembers which proxy_ids each call carried."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+
+    async def generate_content(self, model, contents, config=None):
+        self.sent.append([item["proxy_id"] for item in json.loads(contents.split("DATA:\n", 1)[1])])
+        return await super().generate_content(model, contents, config)
+
+def test_dropped_items_are_resubmitted_and_only_those(offline, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BATCH_TOKEN_BUDGET", 300)
+    gemini = RecordingGemini(latency=0.0, jitter=0.0, drop_rate=0.3, seed=3)
+    offline.use_gemini(gemini)
+    posts = [{"id": f"p{i}", "caption": "negroni with 3cl gin"} for i in range(40)]
+    texts = [post["caption"] for post in posts]
+
+    results, unanswered = asyncio.run(ai_analyzer._analyze_with_model(posts, texts))
+
+    first_round = len(ai_analyzer.pack_batches(_items(40), 300, settings.GEMINI_BATCH_MAX_ITEMS))
+    assert gemini.calls > first_round
+    assert sorted(res["id"] for res in results) == sorted(post["id"] for post in posts if post["id"] not in
+                                                          {posts[i]["id"] for i in unanswered})
+    assert len(results) + len(unanswered) == 40
+    assert len(unanswered) < 40 * 0.3 ** (settings.GEMINI_MAX_RESUBMITS + 1) + 2
+    # İlk turdan sonra her öğe en fazla bir kez daha gönderilir ve yalnızca cevapsız kalanlar
+    first_ids = [p_id for call in gemini.sent[:first_round] for p_id in call]
+    resent = [p_id for call in gemini.sent[first_round:] for p_id in call]
+    assert sorted(first_ids) == sorted(f"REF_{i}" for i in range(40))
+    assert 0 < len(resent) < 40
+
+def test_unanswered_posts_fall_back_instead_of_unprocessed(offline, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_MAX_RESUBMITS", 0)
+    offline.use_gemini(FakeGemini(drop_rate=1.0))
+    posts = [{"id": f"p{i}", "caption": "old fashioned whiskey"} for i in range(5)]
+
+    merged = ai_analyzer.merge_analysis_with_posts(posts, asyncio.run(ai_analyzer.analyze_instagram_posts(posts)))
+    expected = classify_caption("old fashioned whiskey")["drink_category"]
+    assert {post["drink_category"] for post in merged} == {expected} != {"Unprocessed"}
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+import database
+import models
+from tests.conftest import app_client
+from tests.fakes import FakeGemini
+
+def test_other_endpoints_keep_serving_while_the_model_is_slow(offline):
+    """A 1s model call must not stall the event loop: health and status polls answer at once."""
+    offline.use_gemini(FakeGemini(latency=1.0))
+    username = offline.usernames[0]
+
+    async def scenario():
+        async with app_client() as client:
+            analysis = asyncio.create_task(
+                client.post("/analyze", json={"instagram_url": f"https://instagram.com/{username}"})
+            )
+            while not offline.gemini.calls:
+                await asyncio.sleep(0.01)
+
+            latencies = []
+            for path in ("/", f"/analyze/status/{username}", "/analyze/breaker"):
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+            assert not analysis.done(), "analysis finished before the polls; model latency too low"
+
+            response = await analysis
+            assert response.status_code == 200
+            return latencies, response.json()
+
+    latencies, posts = asyncio.run(scenario())
+    assert max(latencies) < 0.3
+    assert len(posts) == 10
+
+def test_timed_out_model_call_falls_back_to_keywords(offline, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "GEMINI_TIMEOUT", 0.05)
+    monkeypatch.setattr(settings, "GEMINI_MAX_RESUBMITS", 0)
+    offline.use_gemini(FakeGemini(latency=1.0))
+    username = offline.usernames[0]
+
+    async def scenario():
+        async with app_client() as client:
+            started = time.perf_counter()
+            response = await client.post("/analyze", json={"instagram_url": f"https://instagram.com/{username}"})
+            return response, time.perf_counter() - started
+
+    response, seconds = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert seconds < 0.8
+    assert offline.breaker.failures >= 1
+    assert all(post["drink_category"] != "Unprocessed" for post in response.json())
+
+def test_concurrent_first_time_analyses_share_one_scan(offline):
+    """50 simultaneous first visits: one Graph fetch, one model call, one queued job."""
+    offline.use_gemini(FakeGemini(latency=0.2))
+    username = offline.usernames[0]
+
+    async def scenario():
+        async with app_client() as client:
+            return await asyncio.gather(*(
+                client.post("/analyze", json={"instagram_url": f"https://instagram.com/{username}"})
+                for _ in range(50)
+            ))
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    bodies = [[post["instagram_id"] for post in response.json()] for response in responses]
+    assert len(bodies[0]) == 10
+    assert all(body == bodies[0] for body in bodies)
+
+    assert offline.graph.requests == 1
+    assert offline.gemini.calls == 1
+    with database.SessionLocal() as db:
+        jobs = db.execute(
+            select(models.ScanJob.cursor, func.count()).where(models.ScanJob.username == username)
+            .group_by(models.ScanJob.cursor)
+        ).all()
+    # İlk sayfa isteğin içinde işlendi; kalan sayfa için tek bir iş
+    assert len(jobs) == 1 and jobs[0][0] and jobs[0][1] == 1
+
+def test_no_connection_is_held_while_the_model_runs(offline):
+    """The first analysis only opens sessions for the existence check and the save."""
+    offline.use_gemini(FakeGemini(latency=0.5))
+    username = offline.usernames[0]
+
+    async def scenario():
+        async with app_client() as client:
+            analysis = asyncio.create_task(
+                client.post("/analyze", json={"instagram_url": f"https://instagram.com/{username}"})
+            )
+            while not offline.gemini.calls:
+                await asyncio.sleep(0.01)
+            checked_out = database.get_engine().pool.checkedout()
+            response = await analysis
+            return checked_out, response
+
+    checked_out, response = asyncio.run(scenario())
+    assert response.status_code == 200 and len(response.json()) == 10
+    assert checked_out == 0
@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import database
+import models
+from config import settings
+from services import analysis_cache
+
+_RESULT = {"category": "Gastronomy", "summary": "Gin cocktail recipe.", "drink_category": "Gin Cocktail"}
+
+def _put(*keys):
+    analysis_cache.put_many({key: _RESULT for key in keys}, "v1", "test-model")
+
+def _age(key, **columns):
+    """Moves created_at/last_used_at of a key into the past (values in days)."""
+    now = datetime.utcnow()
+    with database.SessionLocal() as db:
+        db.execute(
+            update(models.AnalysisCache)
+            .where(models.AnalysisCache.cache_key == key)
+            .values({column: now - timedelta(days=days) for column, days in columns.items()})
+        )
+        db.commit()
+
+def _last_used(key):
+    with database.SessionLocal() as db:
+        return db.execute(
+            select(models.AnalysisCache.last_used_at).where(models.AnalysisCache.cache_key == key)
+        ).scalar()
+
+def test_hit_and_miss_are_counted(fresh_db):
+    before = analysis_cache.stats()
+    _put("a")
+    assert analysis_cache.get_many(["a", "b", "a"]) == {"a": _RESULT}
+    after = analysis_cache.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+def test_expired_entries_are_misses(fresh_db):
+    _put("fresh", "old")
+    _age("old", created_at=settings.ANALYSIS_CACHE_TTL_DAYS + 1)
+    assert set(analysis_cache.get_many(["fresh", "old"])) == {"fresh"}
+
+def test_lru_eviction_keeps_the_recently_used(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(analysis_cache, "_EVICT_EVERY", 2)
+    monkeypatch.setattr(analysis_cache, "_writes_since_evict", 0)
+    _put("a", "b", "c")
+    for key, days in (("a", 3), ("b", 1), ("c", 2)):
+        _age(key, last_used_at=days)
+
+    # Bir sonraki yazma temizliği tetikler: "d" ve en son kullanılan "b" kalır
+    _put("d")
+    with database.SessionLocal() as db:
+        keys = set(db.execute(select(models.AnalysisCache.cache_key)).scalars())
+    assert keys == {"b", "d"}
+
+def test_hits_touch_last_used_at_once_per_interval(fresh_db):
+    _put("recent", "stale")
+    _age("stale", last_used_at=1)
+    recent, stale = _last_used("recent"), _last_used("stale")
+
+    analysis_cache.get_many(["recent", "stale"])
+    # Bir saatten yeni kayıt yazılmaz, eski olan tazelenir
+    assert _last_used("recent") == recent
+    assert _last_used("stale") > stale
+
+def test_eviction_keeps_a_batch_written_together(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(analysis_cache, "_EVICT_EVERY", 1)
+    monkeypatch.setattr(analysis_cache, "_writes_since_evict", 0)
+    # Aynı last_used_at'i paylaşan kayıtlardan yalnızca fazlalık silinir, hepsi değil
+    _put("a", "b", "c")
+    assert len(analysis_cache.get_many(["a", "b", "c"])) == 2
+
+def test_counters_add_up_across_threads(fresh_db):
+    _put("a")
+    before = analysis_cache.stats()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: analysis_cache.get_many(["a", "missing"]), range(200)))
+    after = analysis_cache.stats()
+    assert after["hits"] - before["hits"] == 200
+    assert after["misses"] - before["misses"] == 200
@@ -0,0 +1,182 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, select, text
+
+import database
+import migrations
+import models
+from config import settings
+from services import ai_analyzer, categories, category_stats
+
+# 0005 öncesi şema: kategoriler metin kolonlarında
+_LEGACY_POSTS_DDL = """
+CREATE TABLE instagram_posts (
+    id INTEGER PRIMARY KEY, permalink TEXT, instagram_id VARCHAR(100) NOT NULL UNIQUE,
+    username VARCHAR(100) NOT NULL, caption TEXT, media_type VARCHAR(50), media_url TEXT,
+    post_timestamp DATETIME, ai_category VARCHAR(100), ai_summary TEXT,
+    drink_category VARCHAR(100), created_at DATETIME
+)
+"""
+
+def test_every_alias_maps_to_its_label():
+    for alias, label in categories.AI_ALIASES.items():
+        assert categories.AI.lookup(alias) == label, alias
+        assert categories.AI.lookup(f" {alias.upper()}! ") == label, alias
+    for alias, label in categories.DRINK_ALIASES.items():
+        assert categories.DRINK.lookup(alias) == label, alias
+    assert categories.AI.lookup("Wellness") == "Health"
+    assert categories.AI.lookup("Pets") == "Animals"
+    assert categories.AI.lookup("Recipes") == "Gastronomy"
+
+@pytest.mark.parametrize("vocabulary", [categories.DRINK, categories.AI, categories.MEDIA])
+def test_every_label_maps_to_itself(vocabulary):
+    for label in vocabulary.labels:
+        assert vocabulary.lookup(label) == label
+        assert vocabulary.lookup(label.lower()) == label
+    assert len({categories._fold(label) for label in vocabulary.labels}) == len(vocabulary.labels)
+
+def test_fold_strips_plurals_only():
+    assert categories._fold("Whiskey  Cocktails!") == "whiskey cocktail"
+    assert categories._fold("wellness") == "wellness"
+    assert categories._fold("Fitness") == "fitness"
+    assert categories._fold("Business") == "business"
+    assert categories._fold("hibiscus") == "hibiscus"
+
+def test_prompt_lists_exactly_the_allowed_labels():
+    prompt = ai_analyzer.ANALYSIS_PROMPT
+    assert "etc." not in prompt
+    for label in categories.AI_CATEGORIES:
+        assert label in prompt
+    for label in categories.DRINK_CATEGORIES:
+        if label not in ("Not Specified", "Unprocessed"):
+            assert f'"{label}"' in prompt
+
+def test_label_ids_migration_keeps_unknown_values(tmp_path, monkeypatch):
+    database.dispose_engine()
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'legacy.db'}")
+    for vocabulary in (categories.DRINK, categories.AI, categories.MEDIA):
+        vocabulary.reset_extra()
+
+    rows = [
+        ("Whisky Cocktail", "Wellness", "IMAGE"),
+        ("Sake", "Automotive", "STORY"),
+        ("sake ", "automotive", "VIDEO"),
+        ("Yok", "Fitness", None),
+        (None, None, "CAROUSEL_ALBUM"),
+    ]
+    with database.get_engine().begin() as conn:
+        conn.execute(text(_LEGACY_POSTS_DDL))
+        for i, (drink, ai, media) in enumerate(rows):
+            conn.execute(
+                text(
+                    "INSERT INTO instagram_posts (instagram_id, username, drink_category, ai_category, media_type, post_timestamp) "
+                    "VALUES (:iid, 'legacy_user', :drink, :ai, :media, :ts)"
+                ),
+                {"iid": f"p{i}", "drink": drink, "ai": ai, "media": media, "ts": datetime(2024, 1, 1 + i)}
+            )
+
+    try:
+        migrations.migrate()
+        with database.SessionLocal() as db:
+            posts = db.execute(select(models.InstagramPost).order_by(models.InstagramPost.instagram_id)).scalars().all()
+            got = [(p.drink_category, p.ai_category, p.media_type) for p in posts]
+            assert got == [
+                ("Whiskey Cocktail", "Health", "IMAGE"),
+                ("Sake", "Automotive", "STORY"),
+                ("Sake", "Automotive", "VIDEO"),
+                ("Other", "Fitness", None),
+                (None, None, "CAROUSEL_ALBUM"),
+            ]
+            extra = db.execute(
+                select(models.DrinkCategory.id, models.DrinkCategory.name)
+                .where(models.DrinkCategory.id >= categories.EXTRA_LABEL_ID_START)
+            ).all()
+            assert [name for _, name in extra] == ["Sake"]
+            stats = category_stats.get_stats(db, "legacy_user")
+            assert {"bucket": "Sake", "count": 2} in stats["drink_category"]
+
+        with database.get_engine().begin() as conn:
+            columns = {column["name"] for column in inspect(conn).get_columns("instagram_posts")}
+            assert {"drink_category_legacy", "ai_category_legacy", "media_type_legacy"} <= columns
+            indexes = {index["name"] for index in inspect(conn).get_indexes("instagram_posts")}
+            assert "ix_instagram_posts_drink_category_id" in indexes
+            report = migrations.legacy_label_report(conn)
+            assert ("Wellness", "Health", 1) in report["ai_category"]
+
+        # Yeni bir süreç: etiketler ilk kullanımda tablodan okunur
+        categories.DRINK.reset_extra()
+        with database.SessionLocal() as db:
+            assert db.execute(
+                select(models.InstagramPost.instagram_id).where(models.InstagramPost.drink_category == "sake")
+            ).scalars().all() == ["p1", "p2"]
+
+        with database.get_engine().begin() as conn:
+            assert migrations.drop_legacy_label_columns(conn) == [
+                "drink_category_legacy", "ai_category_legacy", "media_type_legacy"
+            ]
+            assert migrations.legacy_label_report(conn) == {}
+    finally:
+        database.dispose_engine()
+        for vocabulary in (categories.DRINK, categories.AI, categories.MEDIA):
+            vocabulary.reset_extra()
+
+def _add_drink_label(label_id, name):
+    with database.get_engine().begin() as conn:
+        conn.execute(models.DrinkCategory.__table__.insert(), {"id": label_id, "name": name})
+
+def _count_loads(monkeypatch, vocabulary):
+    calls = []
+    loader = vocabulary.loader
+
+    def counting_loader():
+        calls.append(1)
+        return loader()
+
+    monkeypatch.setattr(vocabulary, "loader", counting_loader)
+    return calls
+
+def test_startup_loads_the_data_added_labels(fresh_db, monkeypatch):
+    from main import create_app, lifespan
+
+    monkeypatch.setattr(settings, "SCAN_WORKERS_ENABLED", False)
+    monkeypatch.setattr(settings, "SCHEDULER_ENABLED", False)
+    _add_drink_label(categories.EXTRA_LABEL_ID_START, "Sake")
+    calls = _count_loads(monkeypatch, categories.DRINK)
+
+    async def start():
+        async with lifespan(create_app()):
+            return dict(categories.DRINK.extra)
+
+    assert asyncio.run(start()) == {categories.EXTRA_LABEL_ID_START: "Sake"}
+    # Okuma yolunda tekrar sorgu yok
+    assert categories.DRINK.label(categories.EXTRA_LABEL_ID_START) == "Sake"
+    assert categories.DRINK.lookup("sake") == "Sake"
+    assert len(calls) == 1
+
+def test_unknown_id_refreshes_at_most_once_per_interval(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRA_LABEL_REFRESH_SECONDS", 3600.0)
+    calls = _count_loads(monkeypatch, categories.DRINK)
+    assert categories.DRINK.load_extra()
+    first, second = categories.EXTRA_LABEL_ID_START, categories.EXTRA_LABEL_ID_START + 1
+
+    # Başka bir süreç açılıştan sonra etiket ekledi: aralık dolmadan tablo tekrar okunmaz
+    _add_drink_label(first, "Sake")
+    for _ in range(5):
+        assert categories.DRINK.label(first) is None
+    assert len(calls) == 1
+
+    monkeypatch.setattr(settings, "EXTRA_LABEL_REFRESH_SECONDS", 0.0)
+    assert categories.DRINK.label(first) == "Sake"
+    assert len(calls) == 2
+    # Bilinen id tabloyu okutmaz; yeni eklenen de bir sonraki okumada gelir
+    assert categories.DRINK.label(first) == "Sake"
+    assert len(calls) == 2
+    _add_drink_label(second, "Soju")
+    assert categories.DRINK.label(second) == "Soju"
+    assert len(calls) == 3
+
+    # Bilinmeyen model çıktısı, tablo okunduktan sonra sorgu yapmaz
+    assert categories.DRINK.lookup("Kombucha") is None
+    assert len(calls) == 3
@@ -0,0 +1,72 @@
+from argparse import Namespace
+
+from sqlalchemy import delete
+
+import database
+import manage
+import models
+from services import category_stats, post_store
+from tests.fakes import synthetic_posts
+
+_DRINKS = ("Gin Cocktail", "Whiskey", "Wine", "Beer", "Other")
+_TOPICS = ("Gastronomy", "Lifestyle", "Travel", "General")
+
+def _rows(count, offset=0, relabel=None):
+    """
+    Posts spread over labels and months; every seventh has no timestamp, every fifth no topic.
+    relabel=(drink, topic) gives every post the same labels instead.
+    """
+    rows = synthetic_posts(count, offset=offset)
+    for i, row in enumerate(rows, start=offset):
+        drink, topic = relabel or (_DRINKS[i % len(_DRINKS)], _TOPICS[i % len(_TOPICS)])
+        row["drink_category"] = drink
+        row["ai_category"] = "" if i % 5 == 0 else topic
+        row["timestamp"] = None if i % 7 == 0 else f"2025-{i % 12 + 1:02d}-01T12:00:00+0000"
+    return rows
+
+def _stats(username="bench_user"):
+    with database.SessionLocal() as db:
+        stats = category_stats.get_stats(db, username)
+    return {dim: sorted((s["bucket"], s["count"]) for s in buckets) for dim, buckets in stats.items()}
+
+def _save(rows, policy="always"):
+    with database.SessionLocal() as db:
+        return post_store.save_posts_to_db(db, rows, "bench_user", policy)
+
+def test_incremental_deltas_match_a_rebuild(fresh_db):
+    assert _save(_rows(40)) == {"inserted": 40, "updated": 0}
+    # Aynı postlar yeni etiketlerle (move_category) + yeni postlar (add_post)
+    assert _save(_rows(30, offset=20, relabel=("Whiskey", "Travel"))) == {"inserted": 10, "updated": 20}
+    # Başarısız analiz mevcut etiketi ezmez; sayılar da kıpırdamaz
+    failed = _rows(5)
+    for row in failed:
+        row["drink_category"] = "Unprocessed"
+    assert _save(failed)["updated"] == 0
+
+    incremental = _stats()
+    assert sum(count for _, count in incremental["drink_category"]) == 50
+    assert sum(count for _, count in incremental["month"]) == 50
+
+    with database.SessionLocal() as db:
+        category_stats.rebuild(db, "bench_user")
+    assert _stats() == incremental
+
+def test_rebuild_stats_command_repairs_the_table(fresh_db, capsys):
+    _save(_rows(25))
+    _save(_rows(25, relabel=("Wine", "Lifestyle")))
+    expected = _stats()
+    with database.SessionLocal() as db:
+        db.execute(delete(models.UserCategoryStat))
+        db.commit()
+    assert _stats() == {dim: [] for dim in category_stats.DIMENSIONS}
+
+    manage.rebuild_stats(Namespace(username=None))
+    assert _stats() == expected
+    assert "user_category_stats rebuilt" in capsys.readouterr().out
+
+    # Tek kullanıcı: diğer kullanıcıların satırlarına dokunulmaz
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, synthetic_posts(3, username="other_user"), "other_user")
+    manage.rebuild_stats(Namespace(username="bench_user"))
+    assert _stats() == expected
+    assert sum(count for _, count in _stats("other_user")["drink_category"]) == 3
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+
+from config import settings
+from services import ai_analyzer, circuit_breaker
+from tests.fakes import FakeGemini
+
+def _breaker(**overrides):
+    options = dict(
+        window=20, min_calls=3, failure_rate=0.5, slow_call_seconds=0.2,
+        slow_call_rate=0.5, open_seconds=0.0, half_open_probes=1, probe_timeout=60.0
+    )
+    options.update(overrides)
+    return circuit_breaker.CircuitBreaker("test", **options)
+
+def _prompt(n=1):
+    data = [{"proxy_id": f"REF_{i}", "text": "gin tonic"} for i in range(n)]
+    return f"{ai_analyzer.ANALYSIS_PROMPT}\n\nDATA:\n{json.dumps(data)}"
+
+def _half_open(breaker):
+    breaker._transition(circuit_breaker.OPEN)
+    assert breaker.allow_request()  # open_seconds=0: hemen yarım açık, bu çağrı deneme hakkını alır
+    assert breaker.state == circuit_breaker.HALF_OPEN
+
+def test_time_queued_for_a_model_slot_is_not_a_slow_call(offline, monkeypatch):
+    breaker = _breaker()
+    monkeypatch.setattr(ai_analyzer, "gemini_breaker", breaker)
+    monkeypatch.setattr(settings, "GEMINI_MAX_CONCURRENCY", 1)
+    offline.use_gemini(FakeGemini(latency=0.1))
+    # google.genai ilk çağrıda import edilir (~0.5s); testin ölçtüğü bu değil
+    ai_analyzer._genai_types()
+
+    async def six_calls():
+        return await asyncio.gather(*(ai_analyzer._call_model(_prompt(), {"REF_0"}) for _ in range(6)))
+
+    started = time.perf_counter()
+    asyncio.run(six_calls())
+    # Son çağrı ~0.5s sırada bekledi; model süresi yine de 0.1s
+    assert time.perf_counter() - started >= 0.5
+    assert (breaker.state, breaker.failures, breaker.slow_calls) == (circuit_breaker.CLOSED, 0, 0)
+    assert breaker.last_latency < 0.2
+
+def test_cancelled_probe_gives_its_slot_back(offline, monkeypatch):
+    breaker = _breaker()
+    monkeypatch.setattr(ai_analyzer, "gemini_breaker", breaker)
+    offline.use_gemini(FakeGemini(latency=5.0))
+    _half_open(breaker)
+    assert not breaker.allow_request()
+
+    async def cancel_probe():
+        probe = asyncio.create_task(ai_analyzer._call_model(_prompt(), {"REF_0"}))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(cancel_probe())
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert breaker.allow_request()
+
+def test_lost_probe_expires_after_probe_timeout():
+    breaker = _breaker(probe_timeout=0.05)
+    _half_open(breaker)
+    # Sonucu hiç kaydedilmeyen deneme (görev başlamadan iptal edildi)
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success(0.01)
+    assert breaker.state == circuit_breaker.CLOSED
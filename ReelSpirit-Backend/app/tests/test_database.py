@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+import database
+import models
+from config import settings
+
+@pytest.mark.parametrize("database_url, async_url, forced, expected", [
+    ("sqlite:///./x.db", None, None, False),
+    ("sqlite:///./x.db", "sqlite+aiosqlite:///./x.db", None, True),
+    ("postgresql://u@h/db", None, None, True),
+    ("postgresql://u@h/db", None, False, False),
+    ("sqlite:///./x.db", None, True, True),
+])
+def test_async_driver_is_opt_in_on_sqlite(monkeypatch, database_url, async_url, forced, expected):
+    monkeypatch.setattr(settings, "DATABASE_URL", database_url)
+    monkeypatch.setattr(settings, "ASYNC_DATABASE_URL", async_url)
+    monkeypatch.setattr(settings, "DB_ASYNC_DRIVER", forced)
+    assert database.uses_async_driver() is expected
+
+def test_threaded_sessions_beyond_the_pool_size_do_not_starve(fresh_db):
+    async def one():
+        async with database.AsyncSessionLocal() as db:
+            # Bağlantı ilk sorgudan kapanışa kadar tutulur, arada olay döngüsüne dönülür
+            await db.execute(select(models.SyncState.username))
+            await asyncio.sleep(0.01)
+            rows = (await db.execute(select(models.SyncState.username))).all()
+        return rows
+
+    async def many():
+        assert not database.uses_async_driver()
+        return await asyncio.wait_for(asyncio.gather(*(one() for _ in range(200))), timeout=20)
+
+    # Havuz 5 + 10 bağlantı; fazlası thread'de değil olay döngüsünde sıra bekler
+    assert asyncio.run(many()) == [[]] * 200
@@ -0,0 +1,43 @@
+import asyncio
+
+from sqlalchemy import update
+
+import database
+import models
+from config import settings
+from services.events import ScanEventBroker
+from tests.fakes import QueryCounter
+
+def test_viewers_of_one_scan_share_one_db_watcher(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_POLL_INTERVAL", 0.05)
+    with database.SessionLocal() as db:
+        db.add(models.ScanJob(username="someone", status="running", mode="full"))
+        db.commit()
+    broker = ScanEventBroker()
+
+    async def watch():
+        return [event async for event in broker.subscribe("someone")]
+
+    async def scenario():
+        viewers = [asyncio.create_task(watch()) for _ in range(200)]
+        await asyncio.sleep(0.2)
+        assert broker.viewer_count("someone") == 200
+        # Aynı süreçteki worker olayları doğrudan iletilir
+        broker.publish("someone", {"event": "page_fetched", "page": 1, "posts": 25})
+        with database.SessionLocal() as db:
+            db.execute(update(models.ScanJob).values(status="completed", pages_done=3, posts_done=75))
+            db.commit()
+        return await asyncio.wait_for(asyncio.gather(*viewers), timeout=5)
+
+    counter = QueryCounter()
+    try:
+        streams = asyncio.run(scenario())
+    finally:
+        counter.close()
+
+    for events in streams:
+        assert [event["event"] for event in events][-2:] == ["page_fetched", "completed"]
+        assert events[-1]["posts_done"] == 75
+    # Tek izleyici sorgusu / aralık; 200 izleyici başına değil (+2: testin kendi yazmaları)
+    assert counter.count < 20
+    assert broker.viewer_count("someone") == 0
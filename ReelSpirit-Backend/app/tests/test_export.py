@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+import database
+from config import settings
+from main import create_app
+from routers.export import accepts_gzip
+from tests.fakes import drain_export, seed_export_rows
+
+def test_accept_encoding_q_values():
+    assert accepts_gzip("gzip")
+    assert accepts_gzip("deflate, gzip;q=0.5")
+    assert accepts_gzip("GZIP ; Q=1.0")
+    assert accepts_gzip("x-gzip")
+    assert accepts_gzip("br, *;q=0.1")
+    assert not accepts_gzip("")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("gzip;q=0.000, deflate")
+    # Açıkça listelenen gzip, '*' kuralından önce gelir
+    assert not accepts_gzip("*, gzip;q=0")
+    assert not accepts_gzip("gzip;q=oops")
+
+@pytest.mark.parametrize("async_driver", [False, True])
+def test_gzip_is_only_sent_when_accepted(fresh_db, monkeypatch, async_driver):
+    # Akış iki session yolunda da aynı: ThreadedSession.stream ve AsyncSession.stream
+    monkeypatch.setattr(settings, "DB_ASYNC_DRIVER", async_driver)
+    seed_export_rows(2500)
+    app = create_app()
+
+    async def run():
+        refused = await drain_export(app, "/export/bench_user", "gzip;q=0, deflate")
+        accepted = await drain_export(app, "/export/bench_user", "deflate, gzip;q=0.8")
+        await database.dispose_async_engine()
+        return refused, accepted
+
+    refused, accepted = asyncio.run(run())
+    assert refused["encoding"] is None and refused["lines"] == 2500
+    assert accepted["encoding"] == "gzip" and accepted["lines"] == 2500
+
+def test_export_of_a_million_rows_keeps_rss_flat(fresh_db):
+    seed_export_rows(1_000_000)
+    app = create_app()
+
+    async def run():
+        result = await drain_export(app, "/export/bench_user?format=csv")
+        await database.dispose_async_engine()
+        return result
+
+    result = asyncio.run(run())
+    assert result["status"] == 200
+    assert result["lines"] == 1_000_001
+    # Tek bir EXPORT_BATCH_SIZE partisi + flush tamponu; yüzlerce MB'lık gövde bellekte tutulmaz
+    assert result["rss_growth_mb"] < 32, result
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from config import settings
+from services import instagram, rate_limit
+from tests.fakes import ReplayTransport, synthesize_fixtures
+
+@pytest.fixture
+def graph(monkeypatch):
+    """Runs fetch_instagram_page against a mock transport; records the backoff sleeps instead of sleeping."""
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(rate_limit.instagram_bucket, "rate", 0)
+    monkeypatch.setattr(instagram.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(instagram, "_last_usage_percent", 0.0)
+    monkeypatch.setattr(instagram, "_last_regain_seconds", 0.0)
+
+    def use(transport):
+        asyncio.run(instagram.start_client(transport))
+
+    yield use, sleeps
+    asyncio.run(instagram.close_client())
+
+def _page(posts=1, after=None):
+    media = {"data": [{"id": str(i), "caption": "gin"} for i in range(posts)]}
+    if after:
+        media["paging"] = {"cursors": {"after": after}}
+    return {"business_discovery": {"media": media}}
+
+def test_walks_replayed_pages_with_one_shared_client(graph):
+    use, _ = graph
+    fixtures = synthesize_fixtures(1, 3, per_page=5)
+    username = next(iter(fixtures))
+    use(ReplayTransport(fixtures))
+
+    async def walk():
+        client = instagram.get_client()
+        cursor, total = None, 0
+        while True:
+            posts, cursor = await instagram.fetch_instagram_page(username, cursor)
+            total += len(posts)
+            # Her sayfa aynı havuzlanmış istemciden geçer
+            assert instagram.get_client() is client
+            if not cursor:
+                return total
+
+    assert asyncio.run(walk()) == 15
+
+def test_retries_429_honoring_retry_after(graph):
+    use, sleeps = graph
+    responses = iter([
+        httpx.Response(429, headers={"retry-after": "7"}, json={"error": {"code": 4}}),
+        httpx.Response(200, json=_page(2)),
+    ])
+    use(httpx.MockTransport(lambda request: next(responses)))
+
+    posts, cursor = asyncio.run(instagram.fetch_instagram_page("someone"))
+    assert len(posts) == 2 and cursor is None
+    assert len(sleeps) == 1 and sleeps[0] >= 7
+
+def test_rate_limit_error_code_in_body_is_retried(graph):
+    use, sleeps = graph
+    responses = iter([
+        httpx.Response(400, json={"error": {"code": 613, "message": "Calls within one hour exceeded"}}),
+        httpx.Response(200, json=_page(1, after="c1")),
+    ])
+    use(httpx.MockTransport(lambda request: next(responses)))
+
+    posts, cursor = asyncio.run(instagram.fetch_instagram_page("someone"))
+    assert len(posts) == 1 and cursor == "c1"
+    assert len(sleeps) == 1
+
+def test_business_use_case_usage_sets_the_next_delay(graph):
+    use, _ = graph
+    usage = {"123": [{"call_count": 96, "total_cputime": 10, "total_time": 12, "estimated_time_to_regain_access": 2}]}
+    use(httpx.MockTransport(lambda request: httpx.Response(
+        200, json=_page(1), headers={"x-business-use-case-usage": json.dumps(usage)}
+    )))
+
+    asyncio.run(instagram.fetch_instagram_page("someone"))
+    # 2 dakika -> 120 s, GRAPH_BACKOFF_MAX ile sınırlı
+    assert instagram.recommended_delay() == min(120.0, settings.GRAPH_BACKOFF_MAX)
+
+def test_gives_up_after_max_retries(graph):
+    use, sleeps = graph
+    use(httpx.MockTransport(lambda request: httpx.Response(503, text="unavailable")))
+
+    assert asyncio.run(instagram.fetch_instagram_page("someone")) == ([], None)
+    assert len(sleeps) == settings.GRAPH_MAX_RETRIES
+
+def test_invalid_user_is_not_retried(graph):
+    use, sleeps = graph
+    use(ReplayTransport({}))
+
+    assert asyncio.run(instagram.fetch_instagram_page("nobody")) == ([], None)
+    assert sleeps == []
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import database
+import models
+from config import settings
+from services import job_queue
+from tests.conftest import app_client
+
+def _steal(job_id: int, thief: str) -> models.ScanJob:
+    """Lets the first worker's heartbeat go stale, then a second worker requeues and claims the job."""
+    with database.SessionLocal() as db:
+        db.execute(
+            update(models.ScanJob)
+            .where(models.ScanJob.id == job_id)
+            .values(heartbeat_at=datetime.utcnow() - timedelta(days=1))
+        )
+        db.commit()
+        assert job_queue.requeue_stale_jobs(db) == 1
+        job = job_queue.claim_next_job(db, thief)
+        assert job.id == job_id
+        return job
+
+def _job(job_id: int) -> models.ScanJob:
+    with database.SessionLocal() as db:
+        return db.get(models.ScanJob, job_id)
+
+def test_stale_worker_cannot_write_to_a_requeued_job(fresh_db):
+    with database.SessionLocal() as db:
+        job, _ = job_queue.enqueue_scan(db, "someone", "c1")
+        job_queue.claim_next_job(db, "worker-a")
+    _steal(job.id, "worker-b")
+
+    with database.SessionLocal() as db:
+        assert not job_queue.record_progress(db, job.id, "worker-a", 9, 90, "c9")
+        assert not job_queue.heartbeat(db, job.id, "worker-a")
+        assert not job_queue.release_job(db, job.id, "worker-a")
+        assert not job_queue.finish_job(db, job.id, "worker-a", "error", "late failure")
+
+    stolen = _job(job.id)
+    assert (stolen.status, stolen.worker_id, stolen.pages_done, stolen.error) == ("running", "worker-b", 0, None)
+
+    with database.SessionLocal() as db:
+        assert job_queue.record_progress(db, job.id, "worker-b", 1, 10, "c2")
+        assert job_queue.finish_job(db, job.id, "worker-b", "completed")
+        # Bitmiş iş sahibine de kapalı
+        assert not job_queue.heartbeat(db, job.id, "worker-b")
+    assert _job(job.id).status == "completed"
+
+def test_run_job_stops_when_its_lease_is_lost(offline):
+    username = offline.usernames[0]
+    first_cursor = offline.fixtures[username][""]["business_discovery"]["media"]["paging"]["cursors"]["after"]
+    with database.SessionLocal() as db:
+        job_queue.enqueue_scan(db, username, first_cursor)
+        job = job_queue.claim_next_job(db, "worker-a")
+    _steal(job.id, "worker-b")
+
+    asyncio.run(job_queue.run_job(job))
+
+    after = _job(job.id)
+    assert (after.status, after.worker_id, after.pages_done) == ("running", "worker-b", 0)
+
+def _drain(worker_id="worker-a"):
+    """Claims and runs queued jobs one at a time until the queue is empty; returns the claim order."""
+    order = []
+    while True:
+        with database.SessionLocal() as db:
+            job = job_queue.claim_next_job(db, worker_id)
+        if job is None:
+            return order
+        order.append(job.username)
+        asyncio.run(job_queue.run_job(job))
+
+def test_slices_interleave_across_profiles(offline, monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_SLICE_PAGES", 1)
+    first, second = offline.usernames
+    with database.SessionLocal() as db:
+        job_queue.enqueue_scan(db, first, None, mode="incremental")
+        job_queue.enqueue_scan(db, second, None, mode="incremental")
+
+    # Her profil 2 sayfa: ilk dilimden sonra iş sıranın sonuna döner
+    assert _drain() == [first, second, first, second]
+    with database.SessionLocal() as db:
+        jobs = db.query(models.ScanJob).order_by(models.ScanJob.id).all()
+    assert [(job.status, job.pages_done, job.posts_done, job.attempts) for job in jobs] == [
+        ("completed", 2, 20, 2), ("completed", 2, 20, 2)
+    ]
+
+def test_batch_progress_adds_up_across_jobs(offline, monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_SLICE_PAGES", 1)
+    first, second = offline.usernames
+
+    async def post_batch():
+        async with app_client() as client:
+            return await client.post("/analyze/batch", json={
+                "usernames": [f"https://instagram.com/{first}", second, first]
+            })
+
+    response = asyncio.run(post_batch())
+    assert response.status_code == 202
+    progress = response.json()
+    assert (progress["total"], progress["queued"], progress["finished"], progress["status"]) == (
+        2, 2, 0, "processing"
+    )
+
+    # Birer dilim: iki iş de kuyruğa döner, ilerleme toplamı iki sayfa
+    for _ in range(2):
+        with database.SessionLocal() as db:
+            job = job_queue.claim_next_job(db, "worker-a")
+        asyncio.run(job_queue.run_job(job))
+    with database.SessionLocal() as db:
+        progress = job_queue.get_batch_progress(db, progress["batch_id"])
+    assert (progress["queued"], progress["pages_done"], progress["posts_done"]) == (2, 2, 20)
+
+    _drain()
+
+    async def get_batch(batch_id):
+        async with app_client() as client:
+            return await client.get(f"/analyze/batch/{batch_id}")
+
+    response = asyncio.run(get_batch(progress["batch_id"]))
+    assert response.status_code == 200
+    progress = response.json()
+    assert (progress["status"], progress["completed"], progress["finished"]) == ("completed", 2, 2)
+    assert (progress["pages_done"], progress["posts_done"]) == (4, 40)
+    assert progress["pages_done"] == sum(p["pages_done"] for p in progress["profiles"])
+    assert [p["username"] for p in progress["profiles"]] == [first, second]
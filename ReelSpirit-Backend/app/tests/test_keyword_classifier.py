@@ -0,0 +1,33 @@
+import pytest
+
+from services.keyword_classifier import classify_caption, classify_captions
+
+@pytest.mark.parametrize("caption, expected", [
+    ("Rakı balık akşamı", "Raki"),
+    ("RAKI sofrası", "Raki"),
+    ("Rakının yanında meze", "Raki"),
+    ("Yeni Rakı ile şerefe", "Raki"),
+    ("VİSKİ keyfi", "Whiskey"),
+    ("viskili kokteyl tarifi", "Whiskey Cocktail"),
+    ("Negroni: 3cl gin, campari", "Gin Cocktail"),
+    ("cold beers with friends", "Beer"),
+    ("espresso martini time", "Coffee Cocktail"),
+    ("Baileys and vodka", "Vodka Cocktail"),
+    ("gin, rum and tequila", "Mixed Cocktail"),
+    # Türkçe "rakip" (rakibi, rakipler) ve "rakım" rakı değildir
+    ("Rakip takım kazandı", "Other"),
+    ("RAKİBİ yendik", "Other"),
+    ("Rakipler sahada", "Other"),
+    ("Rakım 2000 metre", "Other"),
+    # Eski alt dize kontrolünün yanlış eşleşmeleri
+    ("Big sale in our yoga class", "Other"),
+    ("original design, ginger tea", "Other"),
+    ("romantic cinema night", "Other"),
+])
+def test_drink_category(caption, expected):
+    assert classify_caption(caption)["drink_category"] == expected
+
+def test_batch_matches_single_calls():
+    captions = ["rakı balık", None, "", "Rakip takım", "fashion week outfit"]
+    assert classify_captions(captions) == [classify_caption(c) for c in captions]
+    assert classify_caption("fashion week outfit")["category"] == "Fashion"
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select
+
+import database
+import models
+from services import category_stats, post_store
+from tests.fakes import QueryCounter, synthetic_posts
+
+def _drink_categories():
+    with database.SessionLocal() as db:
+        return dict(db.execute(select(models.InstagramPost.instagram_id, models.InstagramPost.drink_category)).all())
+
+def test_counts_inserted_and_updated(fresh_db):
+    rows = synthetic_posts(30)
+    with database.SessionLocal() as db:
+        assert post_store.save_posts_to_db(db, rows, "bench_user") == {"inserted": 30, "updated": 0}
+        # Aynı sayfa tekrar: "always" politikasında AI alanları güncellenir
+        assert post_store.save_posts_to_db(db, rows + synthetic_posts(5, offset=30), "bench_user", "always") == {
+            "inserted": 5, "updated": 30
+        }
+
+@pytest.mark.parametrize("policy, expected", [
+    ("never", "Unprocessed"),
+    ("unprocessed", "Gin Cocktail"),
+    ("always", "Gin Cocktail"),
+])
+def test_refresh_policy(fresh_db, policy, expected):
+    first = synthetic_posts(3)
+    for row in first:
+        row["drink_category"] = "Unprocessed"
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, first, "bench_user")
+        post_store.save_posts_to_db(db, synthetic_posts(3), "bench_user", policy)
+    assert set(_drink_categories().values()) == {expected}
+
+def test_unprocessed_never_overwrites_a_result(fresh_db):
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, synthetic_posts(3), "bench_user")
+        failed = synthetic_posts(3)
+        for row in failed:
+            row["drink_category"] = "Unprocessed"
+        assert post_store.save_posts_to_db(db, failed, "bench_user", "always")["updated"] == 0
+    assert set(_drink_categories().values()) == {"Gin Cocktail"}
+
+def test_query_count_does_not_grow_with_page_size(fresh_db):
+    counts = []
+    for size, offset in ((25, 0), (400, 25)):
+        counter = QueryCounter()
+        try:
+            with database.SessionLocal() as db:
+                post_store.save_posts_to_db(db, synthetic_posts(size, offset=offset), "bench_user")
+        finally:
+            counter.close()
+        counts.append(counter.count)
+    # Satır başına SELECT yok: 16 kat büyük sayfa en fazla birkaç ek sorgu
+    assert counts[1] <= counts[0] + 3
+
+def test_concurrent_writers_count_each_row_once(fresh_db):
+    rows = synthetic_posts(60)
+
+    def save(page):
+        with database.SessionLocal() as db:
+            return post_store.save_posts_to_db(db, page, "bench_user", "never")
+
+    # Örtüşen sayfalar aynı anda yazılır; her id tam bir yazara "inserted" sayılmalı
+    pages = [rows[i:i + 30] for i in (0, 10, 20, 30)] * 2
+    with ThreadPoolExecutor(max_workers=len(pages)) as pool:
+        results = list(pool.map(save, pages))
+
+    assert sum(result["inserted"] for result in results) == 60
+    with database.SessionLocal() as db:
+        stats = category_stats.get_stats(db, "bench_user")
+    assert sum(bucket["count"] for bucket in stats["drink_category"]) == 60
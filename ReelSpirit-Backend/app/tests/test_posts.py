@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+import database
+from config import settings
+from routers import posts
+from services import post_store
+from tests.conftest import app_client
+from tests.fakes import synthetic_posts
+
+def _seed():
+    rows = synthetic_posts(23)
+    # Aynı zaman damgasını paylaşan postlar ve zaman damgası olmayanlar
+    for row in rows[5:9]:
+        row["timestamp"] = rows[5]["timestamp"]
+    for row in rows[18:]:
+        row["timestamp"] = None
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, rows, "bench_user")
+
+def _walk(limit):
+    async def walk():
+        pages, cursor = [], None
+        async with app_client() as client:
+            while True:
+                params = {"limit": limit, "fields": "instagram_id"}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await client.get("/posts/bench_user", params=params)
+                assert response.status_code == 200
+                pages.append([post["instagram_id"] for post in response.json()])
+                cursor = response.headers.get("x-next-cursor")
+                if not cursor:
+                    return pages
+    return asyncio.run(walk())
+
+@pytest.mark.parametrize("async_driver", [False, True])
+def test_keyset_pages_match_the_full_ordering(fresh_db, monkeypatch, async_driver):
+    monkeypatch.setattr(settings, "DB_ASYNC_DRIVER", async_driver)
+    _seed()
+    with database.SessionLocal() as db:
+        expected = list(db.execute(text(
+            "SELECT instagram_id FROM instagram_posts "
+            "ORDER BY post_timestamp IS NULL, post_timestamp DESC, id DESC"
+        )).scalars())
+
+    for limit in (1, 4, 5, 18, 30):
+        pages = _walk(limit)
+        assert [post for page in pages for post in page] == expected
+        assert all(len(page) == limit for page in pages[:-1])
+
+def _plan(statement) -> str:
+    """EXPLAIN QUERY PLAN of a router statement, compiled with its parameters inlined."""
+    engine = database.get_engine()
+    sql = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        return " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def test_keyset_queries_use_the_username_index(fresh_db):
+    _seed()
+    query = posts._page_query("bench_user", posts.POST_FIELDS)
+    statements = {
+        "first page": posts._dated_page(query, None, 5),
+        "next page": posts._dated_page(query, (datetime(2025, 1, 1), 9), 5),
+        "undated": posts._undated_page(query, 9, 5),
+    }
+    for name, statement in statements.items():
+        plan = _plan(statement)
+        assert "ix_instagram_posts_username_ts" in plan, f"{name}: {plan}"
+        assert "TEMP B-TREE" not in plan, f"{name}: {plan}"
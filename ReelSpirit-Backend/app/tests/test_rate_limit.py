@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from services.rate_limit import TokenBucket
+
+def test_bucket_serves_the_burst_then_blocks_until_refilled():
+    bucket = TokenBucket("test", rate=20.0, capacity=3)
+
+    async def take(count):
+        stamps = []
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+            stamps.append(time.monotonic() - started)
+        return stamps
+
+    stamps = asyncio.run(take(5))
+    # İlk üçü kovadan, sonrakiler 1/20 s arayla
+    assert stamps[2] < 0.02
+    assert 0.04 <= stamps[3] < 0.09
+    assert 0.09 <= stamps[4] < 0.15
+    assert bucket.waited_seconds > 0.09
+
+def test_bucket_refills_up_to_capacity_while_idle():
+    bucket = TokenBucket("test", rate=50.0, capacity=2)
+
+    async def drain_and_wait():
+        await bucket.acquire(2)
+        assert bucket.snapshot()["available"] < 0.5
+        await asyncio.sleep(0.2)
+
+    asyncio.run(drain_and_wait())
+    # 0.2 s * 50 = 10 jeton, ama kova 2'de durur
+    assert bucket.snapshot()["available"] == 2
+
+def test_concurrent_waiters_are_paced_by_the_rate():
+    bucket = TokenBucket("test", rate=25.0, capacity=1)
+
+    async def many():
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        return time.monotonic() - started
+
+    # Bir jeton hazır, kalan beşi 1/25 s arayla
+    assert 0.19 <= asyncio.run(many()) < 0.35
+
+def test_zero_rate_disables_limiting():
+    bucket = TokenBucket("test", rate=0, capacity=1)
+
+    async def burst():
+        started = time.monotonic()
+        for _ in range(100):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(burst()) < 0.05
+    assert bucket.waited_seconds == 0
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import database
+from config import settings
+from services import post_store, response_cache
+from tests.conftest import app_client
+from tests.fakes import QueryCounter, synthetic_posts
+
+def _seed(rows):
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, rows, "bench_user")
+
+def _get_many(path, count):
+    async def get():
+        async with app_client() as client:
+            responses = [await client.get(path) for _ in range(count)]
+        return responses
+    return asyncio.run(get())
+
+def test_repeated_requests_hit_the_db_once_per_version(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VERSION_TTL_SECONDS", 60.0)
+    _seed(synthetic_posts(30))
+    _get_many("/posts/bench_user", 1)
+
+    for path in ("/posts/bench_user", "/stats/bench_user"):
+        response_cache.bump_version("bench_user")
+        counter = QueryCounter()
+        try:
+            responses = _get_many(path, 100)
+        finally:
+            counter.close()
+        assert all(response.status_code == 200 for response in responses)
+        assert len({response.headers["etag"] for response in responses}) == 1
+        # Bir sürüm okuma + ilk istekteki sorgular; kalan 99 istek önbellekten
+        assert counter.count <= 4, f"{path}: {counter.count} sorgu"
+
+def test_write_from_another_process_is_seen_after_the_version_ttl(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VERSION_TTL_SECONDS", 0.2)
+    rows = synthetic_posts(6)
+    _seed(rows[:3])
+    first, = _get_many("/posts/bench_user", 1)
+    assert len(first.json()) == 3
+
+    # Başka bir süreç (ör. job worker) yazar: bu sürecin önbelleğine haber verilmez
+    monkeypatch.setattr(response_cache, "bump_version", lambda username: None)
+    _seed(rows[3:])
+    cached, = _get_many("/posts/bench_user", 1)
+    assert cached.headers["etag"] == first.headers["etag"]
+
+    time.sleep(0.25)
+    fresh, = _get_many("/posts/bench_user", 1)
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert len(fresh.json()) == 6
+
+def test_processes_issue_the_same_etag(fresh_db):
+    _seed(synthetic_posts(3))
+    first, = _get_many("/posts/bench_user", 1)
+    # Yeni süreç: boş önbellek, aynı DB sürümü
+    response_cache._backend = None
+    second, = _get_many("/posts/bench_user", 1)
+    assert second.headers["etag"] == first.headers["etag"]
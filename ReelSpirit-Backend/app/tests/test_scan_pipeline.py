@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from services import scan_pipeline
+from tests.fakes import FakeGemini, synthetic_posts
+
+_PAGES = 4
+_LATENCY = 0.2
+
+class SlowFetcher:
+    """fetch_instagram_page stand-in: _PAGES pages, each after _LATENCY seconds; can fail on one page."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.spans = {}
+
+    async def __call__(self, username, cursor=None):
+        page = int(cursor[1:]) if cursor else 0
+        started = time.perf_counter()
+        await asyncio.sleep(_LATENCY)
+        if page == self.fail_on:
+            raise RuntimeError("Graph API down")
+        self.spans[page] = (started, time.perf_counter())
+        next_cursor = f"c{page + 1}" if page + 1 < _PAGES else None
+        return synthetic_posts(5, username, offset=page * 5), next_cursor
+
+def _run(fetcher, monkeypatch):
+    monkeypatch.setattr(scan_pipeline, "fetch_instagram_page", fetcher)
+    monkeypatch.setattr(scan_pipeline, "recommended_delay", lambda: 0)
+
+    async def scan():
+        try:
+            return await asyncio.wait_for(scan_pipeline.run_deep_scan("bench_user", None), timeout=10)
+        finally:
+            # Hata olsa da olmasa da hiçbir aşama görevi arkada kalmamalı
+            assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    return asyncio.run(scan())
+
+def test_stages_overlap(offline, monkeypatch):
+    offline.use_gemini(FakeGemini(latency=_LATENCY))
+    fetcher = SlowFetcher()
+    report = _run(fetcher, monkeypatch)
+
+    assert (report.pages, report.posts, report.inserted) == (_PAGES, 20, 20)
+    # Sıralı çalışsaydı: sayfa başına getir + analiz et
+    sequential = _PAGES * 2 * _LATENCY
+    assert report.wall_seconds < sequential * 0.8
+    # Sonraki sayfa, önceki sayfa analiz edilirken zaten getiriliyordu
+    assert fetcher.spans[1][0] < fetcher.spans[0][1] + _LATENCY
+    assert report.stages["fetch"].items == report.stages["persist"].items == _PAGES
+
+def test_fetch_error_stops_the_pipeline(offline, monkeypatch):
+    offline.use_gemini(FakeGemini(latency=_LATENCY))
+    with pytest.raises(RuntimeError, match="Graph API down"):
+        _run(SlowFetcher(fail_on=2), monkeypatch)
+
+def test_analyze_error_stops_the_pipeline(offline, monkeypatch):
+    async def failing_analysis(posts):
+        await asyncio.sleep(_LATENCY)
+        raise ValueError("analysis crashed")
+
+    monkeypatch.setattr(scan_pipeline, "analyze_instagram_posts", failing_analysis)
+    started = time.perf_counter()
+    with pytest.raises(ValueError, match="analysis crashed"):
+        _run(SlowFetcher(), monkeypatch)
+    # Diğer aşamalar kuyrukta beklemeden iptal edilir
+    assert time.perf_counter() - started < _PAGES * 2 * _LATENCY
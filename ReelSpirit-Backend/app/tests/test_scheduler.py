@@ -0,0 +1,49 @@
+import asyncio
+
+import database
+from config import settings
+from services import job_queue, post_store, scheduler
+from tests.conftest import app_client
+from tests.fakes import synthetic_posts
+
+def test_budget_counts_only_scheduler_jobs(fresh_db, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_REFRESHES_PER_HOUR", 3)
+    monkeypatch.setattr(settings, "SCHEDULER_MAX_ACTIVE_JOBS", 100)
+    with database.SessionLocal() as db:
+        # Kullanıcı yenilemeleri ve toplu taramalar zamanlayıcı bütçesinden yemez
+        for i in range(5):
+            job_queue.enqueue_scan(db, f"manual_{i}", None, mode="incremental")
+        job_queue.create_batch(db, [f"batch_{i}" for i in range(5)])
+        assert scheduler.remaining_budget(db) == 3
+
+        scheduler.watch(db, [f"creator_{i}" for i in range(5)])
+        queued = scheduler.schedule_refreshes(db)
+        assert len(queued) == 3
+        assert scheduler.remaining_budget(db) == 0
+        assert scheduler.schedule_refreshes(db) == []
+
+def test_one_view_per_dashboard_load(fresh_db, monkeypatch):
+    monkeypatch.setattr(scheduler, "_pending_views", scheduler.Counter())
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, synthetic_posts(30), "bench_user")
+
+    async def dashboard(client):
+        # results sayfası: ilk sayfa + istatistik, ardından "Load more" ve filtre
+        first = await client.get("/posts/bench_user", params={"limit": 10})
+        stats = await client.get("/stats/bench_user", params={"view": "true"})
+        await client.get("/posts/bench_user", params={"limit": 10, "cursor": first.headers["x-next-cursor"]})
+        await client.get("/posts/bench_user", params={"drink_category": "Gin Cocktail"})
+        # Tarama bitince yenileme (view yok) ve tarayıcının koşullu isteği
+        await client.get("/stats/bench_user")
+        await client.get("/posts/bench_user", headers={"if-none-match": first.headers["etag"]})
+        return stats
+
+    async def run():
+        async with app_client() as client:
+            await client.post("/analyze", json={"instagram_url": "bench_user"})
+            for _ in range(2):
+                stats = await dashboard(client)
+                assert stats.status_code == 200
+
+    asyncio.run(run())
+    assert scheduler._pending_views == {"bench_user": 2}
@@ -0,0 +1,126 @@
+import asyncio
+from argparse import Namespace
+
+from sqlalchemy import text
+
+import database
+import manage
+import models
+from services import post_store
+from tests.conftest import app_client
+from tests.fakes import synthetic_posts
+
+# (caption, ai_summary, drink_category, ai_category) — hepsi "vodka" içerir
+_POSTS = {
+    "bar_a": [
+        ("Espresso martini: vodka, espresso, coffee liqueur", "Vodka espresso cocktail.", "Vodka", "Gastronomy"),
+        ("Sunday brunch with friends, the vodka was fine and the espresso too", "Brunch.", "Vodka", "Lifestyle"),
+        ("Vodka tonic by the sea", "Summer vodka highball.", "Vodka", "Travel"),
+    ],
+    "bar_b": [
+        ("Frozen vodka cocktails", "Vodka slush.", "Vodka", "Gastronomy"),
+        ("Gin or vodka? We pour both", "Gin cocktail and vodka shots.", "Gin Cocktail", "Gastronomy"),
+    ],
+}
+
+def _rows(username, posts):
+    rows = synthetic_posts(len(posts), username=username)
+    for row, (caption, summary, drink, topic) in zip(rows, posts):
+        row.update(caption=caption, ai_summary=summary, drink_category=drink, ai_category=topic)
+    return rows
+
+def _seed():
+    for username, posts in _POSTS.items():
+        _save(_rows(username, posts), username)
+
+def _save(rows, username, policy=None):
+    with database.SessionLocal() as db:
+        return post_store.save_posts_to_db(db, rows, username, policy)
+
+def _search(q, **params):
+    async def get():
+        async with app_client() as client:
+            response = await client.get("/search", params={"q": q, **params})
+            assert response.status_code == 200
+            return response.json()
+    return asyncio.run(get())
+
+def _ids(result):
+    return [item["instagram_id"] for item in result["results"]]
+
+def _fts_rows():
+    with database.SessionLocal() as db:
+        return db.execute(text(f"SELECT count(*) FROM {models.SQLITE_FTS_TABLE}")).scalar()
+
+def test_results_are_ranked_by_relevance(fresh_db):
+    _seed()
+    # "with" bağlaç olarak atılır; her iki terim de eşleşmeli
+    result = _search("vodka with espresso")
+    assert result["terms"] == ["vodka", "espresso"]
+    assert _ids(result) == ["bar_a_0", "bar_a_1"]
+    assert result["results"][0]["score"] > result["results"][1]["score"] > 0
+
+def test_terms_match_as_prefixes(fresh_db):
+    _seed()
+    assert sorted(_ids(_search("cocktail"))) == ["bar_a_0", "bar_b_0", "bar_b_1"]
+
+def test_facets_cover_every_match_and_respect_filters(fresh_db):
+    _seed()
+    result = _search("vodka", limit=2)
+    assert result["total"] == 5 and len(result["results"]) == 2
+    assert result["facets"]["username"] == [{"value": "bar_a", "count": 3}, {"value": "bar_b", "count": 2}]
+    assert result["facets"]["drink_category"] == [
+        {"value": "Vodka", "count": 4}, {"value": "Gin Cocktail", "count": 1}
+    ]
+    assert result["facets"]["ai_category"][0] == {"value": "Gastronomy", "count": 3}
+
+    filtered = _search("vodka", username="bar_b", drink_category="Vodka")
+    assert _ids(filtered) == ["bar_b_0"]
+    assert filtered["facets"]["username"] == [{"value": "bar_b", "count": 1}]
+    assert _search("vodka", ai_category="Travel")["total"] == 1
+
+    # Sayfalama: sayfalar birlikte tüm eşleşmeleri bir kez verir
+    pages = [_ids(_search("vodka", limit=2, offset=offset)) for offset in (0, 2, 4)]
+    assert sorted(i for page in pages for i in page) == sorted(_ids(_search("vodka")))
+
+def test_saving_posts_keeps_the_index_in_step(fresh_db):
+    rows = _rows("bar_a", _POSTS["bar_a"])
+    _save(rows, "bar_a")
+    assert _fts_rows() == 3
+    assert _ids(_search("highball")) == ["bar_a_2"]
+
+    # Yenilenen AI özeti eski kelimeyi indeksten siler, yenisini ekler
+    rows[2]["ai_summary"] = "Seaside aperitivo."
+    assert _save(rows, "bar_a", "always") == {"inserted": 0, "updated": 3}
+    assert _fts_rows() == 3
+    assert _search("highball")["total"] == 0
+    assert _ids(_search("aperitivo")) == ["bar_a_2"]
+
+    # Güncellenmeyen (politika "never") satırlar indekste değişmez
+    rows[2]["ai_summary"] = "Something else."
+    _save(rows + _rows("bar_b", _POSTS["bar_b"]), "bar_a", "never")
+    assert _fts_rows() == 5
+    assert _ids(_search("aperitivo")) == ["bar_a_2"]
+
+def test_rebuild_search_command_restores_the_index(fresh_db, capsys):
+    _seed()
+    # Aramadan önce oluşturulmuş bir veritabanı: FTS tablosu hiç yok
+    with database.SessionLocal() as db:
+        db.execute(text(f"DROP TABLE {models.SQLITE_FTS_TABLE}"))
+        db.commit()
+
+    manage.rebuild_search(Namespace())
+    assert "Search index rebuilt: 5 posts." in capsys.readouterr().out
+    assert _fts_rows() == 5
+    assert _ids(_search("vodka espresso")) == ["bar_a_0", "bar_a_1"]
+
+def test_without_an_index_search_falls_back_to_ilike(fresh_db):
+    _seed()
+    with database.SessionLocal() as db:
+        db.execute(text(f"DROP TABLE {models.SQLITE_FTS_TABLE}"))
+        db.commit()
+
+    result = _search("VODKA espresso", drink_category="Vodka")
+    assert sorted(_ids(result)) == ["bar_a_0", "bar_a_1"]
+    assert all(item["score"] == 0 for item in result["results"])
+    assert result["facets"]["username"] == [{"value": "bar_a", "count": 2}]
@@ -0,0 +1,79 @@
+import asyncio
+
+import database
+import models
+from services import job_queue, post_store, scan_pipeline, sync_state
+from tests.fakes import synthetic_posts
+from utils import parse_timestamp
+
+def _save(rows, username):
+    with database.SessionLocal() as db:
+        post_store.save_posts_to_db(db, rows, username)
+
+def _page_posts(offline, username, cursor=""):
+    return offline.fixtures[username][cursor]["business_discovery"]["media"]["data"]
+
+def test_page_filter_drops_known_ids_and_stops(fresh_db):
+    rows = synthetic_posts(10)
+    _save(rows[5:], "bench_user")
+    page_filter = sync_state.make_page_filter("bench_user", None)
+
+    fresh, stop = asyncio.run(page_filter(rows))
+    assert [p["id"] for p in fresh] == [p["id"] for p in rows[:5]]
+    assert stop
+
+def test_page_filter_stops_at_the_high_water_mark(fresh_db):
+    rows = synthetic_posts(10)
+    mark = parse_timestamp(rows[6]["timestamp"])
+
+    fresh, stop = asyncio.run(sync_state.make_page_filter("bench_user", mark)(rows))
+    # Hiçbiri kayıtlı değil: hepsi işlenir ama daha eski sayfalara geçilmez
+    assert len(fresh) == 10 and stop
+    fresh, stop = asyncio.run(sync_state.make_page_filter("bench_user", mark)(rows[:6]))
+    assert len(fresh) == 6 and not stop
+
+def test_page_filter_without_mark_or_known_posts_keeps_paging(fresh_db):
+    fresh, stop = asyncio.run(sync_state.make_page_filter("bench_user", None)(synthetic_posts(10)))
+    assert len(fresh) == 10 and not stop
+
+def _run_incremental(username):
+    with database.SessionLocal() as db:
+        job_queue.enqueue_scan(db, username, None, mode="incremental")
+        job = job_queue.claim_next_job(db, "worker-a")
+    asyncio.run(job_queue.run_job(job))
+    with database.SessionLocal() as db:
+        return db.get(models.ScanJob, job.id), db.get(models.SyncState, username)
+
+def test_first_incremental_scan_walks_every_page(offline):
+    username = offline.usernames[0]
+    job, state = _run_incremental(username)
+
+    assert (job.status, job.pages_done, job.posts_done) == ("completed", 2, 20)
+    assert offline.graph.requests == 2
+    # Yüksek su işareti en yeni posta taşınır
+    newest = _page_posts(offline, username)[0]
+    assert state.newest_instagram_id == newest["id"]
+    assert state.newest_timestamp == parse_timestamp(newest["timestamp"]).replace(tzinfo=None)
+
+def test_incremental_scan_stops_at_the_high_water_mark(offline):
+    username = offline.usernames[0]
+    # Kayıtlı post yok, yalnızca işaret: durma kararı bilinen id'den değil işaretten gelir
+    mark = parse_timestamp(_page_posts(offline, username)[3]["timestamp"]).replace(tzinfo=None)
+    with database.SessionLocal() as db:
+        db.add(models.SyncState(username=username, newest_timestamp=mark))
+        db.commit()
+
+    job, _ = _run_incremental(username)
+    assert (job.status, job.pages_done, job.posts_done) == ("completed", 1, 10)
+    assert offline.graph.requests == 1
+
+def test_incremental_scan_stops_at_a_known_id(offline):
+    username = offline.usernames[0]
+    first_page = _page_posts(offline, username)
+    _save(first_page[5:], username)
+
+    report = asyncio.run(scan_pipeline.run_deep_scan(
+        username, None, page_filter=sync_state.make_page_filter(username, None)
+    ))
+    assert (report.pages, report.inserted) == (1, 5)
+    assert offline.graph.requests == 1
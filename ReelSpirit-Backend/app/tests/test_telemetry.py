@@ -0,0 +1,80 @@
+import asyncio
+
+from prometheus_client.parser import text_string_to_metric_families
+
+import database
+from services import job_queue, telemetry
+from tests.conftest import app_client
+
+def _scrape(client):
+    """GET /metrics, parsed into {(sample name, sorted labels): value}."""
+    async def scrape():
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        return response.text
+
+    samples = {}
+    for family in text_string_to_metric_families(asyncio.run(scrape())):
+        for sample in family.samples:
+            samples[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return samples
+
+def _total(samples, name, **labels):
+    """Sum of a sample over every label set matching the given labels."""
+    return sum(
+        value for (sample, sample_labels), value in samples.items()
+        if sample == name and labels.items() <= dict(sample_labels).items()
+    )
+
+def _delta(before, after, name, **labels):
+    return _total(after, name, **labels) - _total(before, name, **labels)
+
+def test_analyze_request_shows_up_in_metrics(offline):
+    username = offline.usernames[0]
+    client = app_client()
+    before = _scrape(client)
+
+    async def analyze():
+        return await client.post("/analyze", json={"instagram_url": f"https://instagram.com/{username}"})
+
+    assert asyncio.run(analyze()).status_code == 200
+    after = _scrape(client)
+
+    route = {"method": "POST", "route": "/analyze", "status": "200"}
+    assert _delta(before, after, "reelspirit_http_request_seconds_count", **route) == 1
+    assert _delta(before, after, "reelspirit_instagram_fetch_seconds_count") == 1
+    assert _delta(before, after, "reelspirit_gemini_call_seconds_count") == 1
+    assert _delta(before, after, "reelspirit_db_save_seconds_count") >= 1
+    assert _delta(before, after, "reelspirit_db_rows_total", result="inserted") == 10
+    assert _delta(before, after, "reelspirit_analysis_posts_total") == 10
+    assert _total(after, "reelspirit_http_requests_in_flight") == 1  # yalnızca /metrics isteği
+
+def test_deep_scan_records_every_pipeline_stage(offline):
+    username = offline.usernames[1]
+    client = app_client()
+    before = _scrape(client)
+
+    with database.SessionLocal() as db:
+        # Artımlı ilk tarama en yeni sayfadan başlar: iki sayfanın ikisi de boru hattından geçer
+        job_queue.enqueue_scan(db, username, None, mode="incremental")
+        job = job_queue.claim_next_job(db, "worker-a")
+    asyncio.run(job_queue.run_job(job))
+    after = _scrape(client)
+
+    # Her aşama sayfa başına bir gözlem
+    for stage in ("fetch", "analyze", "persist"):
+        assert _delta(before, after, "reelspirit_pipeline_stage_seconds_count", stage=stage) == 2, stage
+    assert _delta(before, after, "reelspirit_instagram_fetch_seconds_count") == 2
+    assert _delta(before, after, "reelspirit_db_rows_total", result="inserted") == 20
+    assert _total(after, "reelspirit_scans_in_flight") == _total(before, "reelspirit_scans_in_flight")
+
+def test_span_helpers_are_no_ops_without_otel(monkeypatch):
+    monkeypatch.setattr(telemetry, "_tracer", None)
+    monkeypatch.setattr(telemetry.settings, "OTEL_ENABLED", False)
+    telemetry.setup_tracing()
+    assert telemetry._tracer is None
+
+    with telemetry.span("scan.page", username="someone", cursor=None) as current:
+        telemetry.set_span_attribute(current, "posts", 10)
+    assert current is None
+    telemetry.shutdown_tracing()
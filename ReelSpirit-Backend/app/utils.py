@@ -1,5 +1,6 @@
 import re
 import logging
+from datetime import datetime, timezone
 from config import settings
 
 def setup_logger(name: str):
@@ -26,4 +27,22 @@ def extract_username(input_str: str) -> str:
     match = re.search(r"instagram\.com/([a-zA-Z0-9._]+)", clean_str)
     if match:
         return match.group(1)
-    return clean_str.split("/")[0].split("?")[0]
\ No newline at end of file
+    return clean_str.split("/")[0].split("?")[0]
+
+def parse_timestamp(value):
+    """Converts Graph API timestamps (2024-05-01T18:30:00+0000) to naive UTC datetimes."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+        except ValueError:
+            try:
+                dt = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
@@ -2,7 +2,7 @@ import { Component, OnInit, OnDestroy } from '@angular/core'; // <-- 1. OnDestro
 import { CommonModule } from '@angular/common';
 import { ActivatedRoute, Router } from '@angular/router';
 import { ApiService } from '../../services/api.service';
-import { Post, DrinkStats } from '../../models/post.model';
+import { Post, PostPage, DrinkStats } from '../../models/post.model';
 import { interval, Subscription } from 'rxjs';
 import { switchMap, takeWhile } from 'rxjs/operators';
 
@@ -23,6 +23,9 @@ export class ResultsComponent implements OnInit, OnDestroy {
   selectedCategory: string = 'all';
   filteredPosts: Post[] = [];
   availableCategories: string[] = [];
+  // Sonraki sayfanın cursor'u; null ise tüm postlar yüklendi
+  nextCursor: string | null = null;
+  isLoadingMore: boolean = false;
   pollingSubscription: Subscription | null = null;
 
   constructor(
@@ -35,8 +38,8 @@ export class ResultsComponent implements OnInit, OnDestroy {
     this.route.params.subscribe(params => {
       this.username = params['username'];
       if (this.username) {
-        this.loadData(); // <-- 2. İSİM DÜZELTİLDİ (loadPageData -> loadData)
-        this.startPolling(); 
+        this.loadData(true); // <-- 2. İSİM DÜZELTİLDİ (loadPageData -> loadData)
+        this.watchScan();
       }
     });
   }
@@ -45,6 +48,27 @@ export class ResultsComponent implements OnInit, OnDestroy {
     this.stopPolling();
   }
 
+  // Önce SSE akışını dene; tarayıcı/ağ desteklemezse polling'e dön
+  watchScan() {
+    this.stopPolling();
+
+    this.pollingSubscription = this.apiService.streamScanEvents(this.username)
+      .subscribe({
+        next: (event) => {
+          console.log('Tarama Olayı:', event.event, event);
+
+          if (event.event === 'completed') {
+            console.log('Tarama bitti! Sayfa yenileniyor...');
+            this.loadData();
+          }
+        },
+        error: (err) => {
+          console.error('Akış hatası, polling başlatılıyor:', err);
+          this.startPolling();
+        }
+      });
+  }
+
   startPolling() {
     this.stopPolling();
 
@@ -75,17 +99,18 @@ export class ResultsComponent implements OnInit, OnDestroy {
   }
 
   // Fonksiyonun orijinal ismi bu, yukarıdaki çağrıları buna uydurduk.
-  loadData() {
+  // Sadece ilk sayfa ve istatistikler yüklenir; kalan postlar "Load more" ile gelir.
+  // countView: sayfanın ilk açılışı (tarama sonrası yenileme okuma sayılmaz)
+  loadData(countView: boolean = false) {
     this.isLoading = true;
     this.errorMessage = '';
 
     Promise.all([
-      this.apiService.getUserPosts(this.username).toPromise(),
-      this.apiService.getDrinkStats(this.username).toPromise()
-    ]).then(([posts, stats]) => {
-      this.posts = posts || [];
+      this.apiService.getUserPosts(this.username, null, this.categoryFilter()).toPromise(),
+      this.apiService.getDrinkStats(this.username, countView).toPromise()
+    ]).then(([page, stats]) => {
+      this.setFirstPage(page);
       this.stats = stats || null;
-      this.filteredPosts = this.posts;
       this.extractCategories();
       this.isLoading = false;
     }).catch(error => {
@@ -94,26 +119,64 @@ export class ResultsComponent implements OnInit, OnDestroy {
     });
   }
 
+  loadMore() {
+    if (!this.nextCursor || this.isLoadingMore) {
+      return;
+    }
+    this.isLoadingMore = true;
+
+    this.apiService.getUserPosts(this.username, this.nextCursor, this.categoryFilter())
+      .subscribe({
+        next: (page) => {
+          this.posts = this.posts.concat(page.posts);
+          this.filteredPosts = this.posts;
+          this.nextCursor = page.nextCursor;
+          this.isLoadingMore = false;
+        },
+        error: (error) => {
+          this.errorMessage = 'An error occurred while loading the data: ' + error.message;
+          this.isLoadingMore = false;
+        }
+      });
+  }
+
+  private setFirstPage(page: PostPage | undefined) {
+    this.posts = page ? page.posts : [];
+    this.filteredPosts = this.posts;
+    this.nextCursor = page ? page.nextCursor : null;
+  }
+
+  private categoryFilter(): string | null {
+    return this.selectedCategory === 'all' ? null : this.selectedCategory;
+  }
+
+  // Kategoriler istatistiklerden gelir; yüklenmemiş sayfalardaki kategoriler de listelenir
   extractCategories() {
     const categories = new Set<string>();
-    this.posts.forEach(post => {
-      if (post.drink_category && post.drink_category !== 'None' && post.drink_category !== 'Yok') {
-        categories.add(post.drink_category);
+    (this.stats?.categories || []).forEach(category => {
+      if (category.drink_category && category.drink_category !== 'None' && category.drink_category !== 'Yok') {
+        categories.add(category.drink_category);
       }
     });
     this.availableCategories = Array.from(categories).sort();
   }
 
+  // Filtre sunucuda uygulanır (drink_category); ilk sayfadan yeniden başlanır
   filterByCategory(category: string) {
     this.selectedCategory = category;
-    
-    if (category === 'all') {
-      this.filteredPosts = this.posts;
-    } else {
-      this.filteredPosts = this.posts.filter(post => 
-        post.drink_category === category
-      );
-    }
+    this.isLoadingMore = true;
+
+    this.apiService.getUserPosts(this.username, null, this.categoryFilter())
+      .subscribe({
+        next: (page) => {
+          this.setFirstPage(page);
+          this.isLoadingMore = false;
+        },
+        error: (error) => {
+          this.errorMessage = 'An error occurred while loading the data: ' + error.message;
+          this.isLoadingMore = false;
+        }
+      });
   }
 
   goBack() {
@@ -11,6 +11,12 @@ export interface Post {
   drink_category: string | null;
 }
 
+// /posts bir sayfa döner; devamı X-Next-Cursor başlığındaki cursor ile istenir
+export interface PostPage {
+  posts: Post[];
+  nextCursor: string | null;
+}
+
 export interface AnalysisRequest {
   instagram_url: string;
 }
@@ -24,4 +30,17 @@ export interface DrinkStats {
 export interface CategoryCount {
   drink_category: string;
   count: number;
-}
\ No newline at end of file
+}
+
+export interface ScanEvent {
+  event: string;
+  username: string;
+  status?: string;
+  page?: number;
+  posts?: number;
+  inserted?: number;
+  updated?: number;
+  pages_done?: number;
+  posts_done?: number;
+  detail?: string;
+}
@@ -1,8 +1,8 @@
-import { Injectable } from '@angular/core';
+import { Injectable, NgZone } from '@angular/core';
 import { HttpClient, HttpErrorResponse } from '@angular/common/http';
 import { Observable, throwError } from 'rxjs';
-import { catchError } from 'rxjs/operators';
-import { Post, AnalysisRequest, DrinkStats } from '../models/post.model';
+import { catchError, map } from 'rxjs/operators';
+import { Post, PostPage, AnalysisRequest, DrinkStats, ScanEvent } from '../models/post.model';
 
 @Injectable({
   providedIn: 'root'
@@ -10,7 +10,7 @@ import { Post, AnalysisRequest, DrinkStats } from '../models/post.model';
 export class ApiService {
   private apiUrl = 'http://192.168.1.113:8000'; // FastAPI backend URL'in
 
-  constructor(private http: HttpClient) { }
+  constructor(private http: HttpClient, private zone: NgZone) { }
 
   // Profil analizi
   analyzeProfile(instagramUrl: string): Observable<Post[]> {
@@ -21,17 +21,30 @@ export class ApiService {
       );
   }
 
-  // Kullanıcı postlarını getir
-  getUserPosts(username: string): Observable<Post[]> {
-    return this.http.get<Post[]>(`${this.apiUrl}/posts/${username}`)
+  // Kullanıcı postlarından tek bir sayfa getir; sonraki sayfa kullanıcı isteyince nextCursor ile alınır
+  getUserPosts(username: string, cursor: string | null = null, drinkCategory: string | null = null): Observable<PostPage> {
+    const params: { [key: string]: string } = {};
+    if (cursor) {
+      params['cursor'] = cursor;
+    }
+    if (drinkCategory) {
+      params['drink_category'] = drinkCategory;
+    }
+
+    return this.http.get<Post[]>(`${this.apiUrl}/posts/${username}`, { observe: 'response', params })
       .pipe(
+        map(response => ({
+          posts: response.body || [],
+          nextCursor: response.headers.get('X-Next-Cursor')
+        })),
         catchError(this.handleError)
       );
   }
 
-  // İstatistikleri getir
-  getDrinkStats(username: string): Observable<DrinkStats> {
-    return this.http.get<DrinkStats>(`${this.apiUrl}/stats/${username}`)
+  // İstatistikleri getir; countView sadece dashboard'un ilk açılışında true (zamanlayıcı okuma sayacı)
+  getDrinkStats(username: string, countView: boolean = false): Observable<DrinkStats> {
+    const params: { [key: string]: string } = countView ? { view: 'true' } : {};
+    return this.http.get<DrinkStats>(`${this.apiUrl}/stats/${username}`, { params })
       .pipe(
         catchError(this.handleError)
       );
@@ -53,6 +66,41 @@ export class ApiService {
     return throwError(() => new Error(errorMessage));
   }
 
+// Tarama ilerlemesini SSE ile dinle (polling yerine)
+streamScanEvents(username: string): Observable<ScanEvent> {
+  return new Observable<ScanEvent>(observer => {
+    const source = new EventSource(`${this.apiUrl}/analyze/stream/${username}`);
+    const eventTypes = ['page_fetched', 'posts_analyzed', 'posts_saved', 'progress', 'completed', 'error'];
+
+    eventTypes.forEach(type => {
+      source.addEventListener(type, (message: Event) => {
+        const data = (message as MessageEvent).data;
+        // Bağlantı hatalarında da 'error' olayı gelir; onların verisi yoktur
+        if (!data) {
+          return;
+        }
+        this.zone.run(() => {
+          const scanEvent: ScanEvent = JSON.parse(data);
+          observer.next(scanEvent);
+          if (type === 'completed' || type === 'error') {
+            observer.complete();
+          }
+        });
+      });
+    });
+
+    source.onerror = () => {
+      // Sunucu akışı kapattıysa complete zaten çağrıldı; değilse polling'e düşülsün
+      if (!observer.closed) {
+        this.zone.run(() => observer.error(new Error('Scan event stream failed')));
+      }
+      source.close();
+    };
+
+    return () => source.close();
+  });
+}
+
 getScanStatus(username: string): Observable<{ status: string }> {
   // /analyze prefix'ini ekledik
   return this.http.get<{ status: string }>(`${this.apiUrl}/analyze/status/${username}`)